@@ -133,53 +133,56 @@ def speech_to_text(audio_base64: str) -> str:
         if os.path.exists(temp_filename):
             os.remove(temp_filename)
 
+# Generic troubleshooting tips per complaint category
+COMMON_SUGGESTIONS = {
+    "plumbing": [
+        "Check if the water valve is properly open",
+        "Try using a plunger to clear minor blockages",
+        "Run hot water through the drain to clear minor clogs",
+        "Check if the float in the toilet tank is functioning properly"
+    ],
+    "electrical": [
+        "Check if the circuit breaker has tripped",
+        "Try replacing the light bulb or tube light",
+        "Ensure the appliance is properly plugged in",
+        "Check if other outlets in the same area are working"
+    ],
+    "cleaning": [
+        "Use appropriate cleaning supplies for the specific surface",
+        "Ensure regular waste disposal",
+        "Consider using natural cleaners like vinegar and baking soda",
+        "Ventilate the area while cleaning"
+    ],
+    "maintenance": [
+        "Apply lubricant to squeaky hinges",
+        "Tighten loose screws or bolts",
+        "Check if furniture is assembled correctly",
+        "Use wood filler for minor scratches on wooden surfaces"
+    ],
+    "noise": [
+        "Consider using earplugs or white noise machines",
+        "Communicate with noisy neighbors during daytime",
+        "Check if windows and doors are properly sealed",
+        "Use soft furniture and carpets to absorb noise"
+    ],
+    "other": [
+        "Document the issue with photos if applicable",
+        "Be specific about the location and nature of the problem",
+        "Try basic troubleshooting before reporting",
+        "Check online resources for common solutions"
+    ]
+}
+
+GENERAL_SUGGESTION = "Submit detailed information to help maintenance staff resolve the issue faster"
+
 def get_complaint_suggestions(category: str, description: str) -> List[str]:
     """
     Generate suggestions for resolving a complaint based on its category and description
     """
-    common_suggestions = {
-        "plumbing": [
-            "Check if the water valve is properly open",
-            "Try using a plunger to clear minor blockages",
-            "Run hot water through the drain to clear minor clogs",
-            "Check if the float in the toilet tank is functioning properly"
-        ],
-        "electrical": [
-            "Check if the circuit breaker has tripped",
-            "Try replacing the light bulb or tube light",
-            "Ensure the appliance is properly plugged in",
-            "Check if other outlets in the same area are working"
-        ],
-        "cleaning": [
-            "Use appropriate cleaning supplies for the specific surface",
-            "Ensure regular waste disposal",
-            "Consider using natural cleaners like vinegar and baking soda",
-            "Ventilate the area while cleaning"
-        ],
-        "maintenance": [
-            "Apply lubricant to squeaky hinges",
-            "Tighten loose screws or bolts",
-            "Check if furniture is assembled correctly",
-            "Use wood filler for minor scratches on wooden surfaces"
-        ],
-        "noise": [
-            "Consider using earplugs or white noise machines",
-            "Communicate with noisy neighbors during daytime",
-            "Check if windows and doors are properly sealed",
-            "Use soft furniture and carpets to absorb noise"
-        ],
-        "other": [
-            "Document the issue with photos if applicable",
-            "Be specific about the location and nature of the problem",
-            "Try basic troubleshooting before reporting",
-            "Check online resources for common solutions"
-        ]
-    }
-    
     # Get suggestions for the specific category
-    suggestions = common_suggestions.get(category, common_suggestions["other"])
+    suggestions = list(COMMON_SUGGESTIONS.get(category, COMMON_SUGGESTIONS["other"]))
     
     # Add a general suggestion
-    suggestions.append("Submit detailed information to help maintenance staff resolve the issue faster")
+    suggestions.append(GENERAL_SUGGESTION)
     
     return suggestions[:3]  # Return top 3 suggestions
@@ -0,0 +1,155 @@
+import math
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional, Sequence
+
+from sqlalchemy.orm import Session
+
+import models
+
+# Percentiles reported for every group
+PERCENTILES = (50, 90, 99)
+
+# Seconds a computed report is reused for the same window
+CACHE_SECONDS = 5 * 60
+CACHE_SIZE = 64
+
+GROUPINGS = ("hostel", "category", "assignee", "week")
+
+
+def percentiles(values: Sequence[float], points: Sequence[int] = PERCENTILES) -> Dict[str, float]:
+    """Linearly interpolated percentiles of already sorted values."""
+    result = {}
+    last = len(values) - 1
+    for point in points:
+        rank = last * point / 100
+        low = math.floor(rank)
+        high = min(low + 1, last)
+        value = values[low] + (values[high] - values[low]) * (rank - low)
+        result[f"p{point}"] = round(value, 2)
+    return result
+
+
+def hours_between(start: datetime, end: datetime) -> float:
+    """
+    Hours from start to end, both taken on the naive UTC clock complaint
+    timestamps are kept on (aware values are converted first).
+
+    >>> hours_between(datetime(2026, 1, 5, 9), datetime(2026, 1, 5, 10))
+    1.0
+    >>> hours_between(datetime(2026, 1, 5, 9), datetime(2026, 1, 5, 15, 30, tzinfo=timezone(timedelta(hours=5, minutes=30))))
+    1.0
+    """
+    return (_naive(end) - _naive(start)).total_seconds() / 3600
+
+
+def summarize(values: List[float]) -> dict:
+    """Count and percentiles (in hours) for one group of durations."""
+    values.sort()
+    summary = {"count": len(values)}
+    if values:
+        summary.update(percentiles(values))
+    return summary
+
+
+class ResolutionAnalytics:
+    """
+    Time-to-assign and time-to-resolve percentiles for a window of complaints,
+    hot and archived alike. The needed columns are fetched in one bulk query
+    per table and each window's report is cached for a few minutes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+
+    def report(self, db: Session, since: date, until: date, hostel: Optional[str] = None) -> dict:
+        """Percentile report for complaints created between since and until (inclusive)."""
+        key = (since, until, hostel)
+        now = time.monotonic()
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None and now - cached[0] < CACHE_SECONDS:
+                self._cache.move_to_end(key)
+                return cached[1]
+
+        report = self._compute(db, since, until, hostel)
+        with self._lock:
+            self._cache[key] = (now, report)
+            self._cache.move_to_end(key)
+            if len(self._cache) > CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return report
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def _compute(self, db: Session, since: date, until: date, hostel: Optional[str]) -> dict:
+        start = datetime.combine(since, datetime.min.time())
+        end = datetime.combine(until + timedelta(days=1), datetime.min.time())
+
+        # metric -> grouping -> group value -> durations in hours
+        durations = {
+            metric: defaultdict(lambda: defaultdict(list))
+            for metric in ("time_to_assign", "time_to_resolve")
+        }
+        # Complaints whose assignment or resolution is stamped before their
+        # creation, e.g. written on another clock; left out of the percentiles
+        negative = {metric: 0 for metric in durations}
+        for model in (models.Complaint, models.ArchivedComplaint):
+            query = db.query(
+                model.hostel,
+                model.category,
+                model.assigned_to,
+                model.created_at,
+                model.assigned_at,
+                model.resolved_at,
+            ).filter(model.created_at >= start, model.created_at < end)
+            if hostel:
+                query = query.filter(model.hostel == hostel)
+
+            for row_hostel, category, assignee, created_at, assigned_at, resolved_at in query.all():
+                created_at = _naive(created_at)
+                year, week, _ = created_at.isocalendar()
+                groups = {
+                    "hostel": row_hostel or "unknown",
+                    "category": category or "unknown",
+                    "assignee": str(assignee) if assignee is not None else "unassigned",
+                    "week": f"{year}-W{week:02d}",
+                }
+                for metric, finished_at in (("time_to_assign", assigned_at), ("time_to_resolve", resolved_at)):
+                    if finished_at is None:
+                        continue
+                    hours = hours_between(created_at, finished_at)
+                    if hours < 0:
+                        negative[metric] += 1
+                        continue
+                    metric_groups = durations[metric]
+                    metric_groups["overall"]["all"].append(hours)
+                    for grouping, value in groups.items():
+                        metric_groups[grouping][value].append(hours)
+
+        report = {"since": since.isoformat(), "until": until.isoformat(), "hostel": hostel}
+        for metric, metric_groups in durations.items():
+            overall = metric_groups.get("overall", {}).get("all", [])
+            report[metric] = {"overall": summarize(overall), "negative_excluded": negative[metric]}
+            for grouping in GROUPINGS:
+                report[metric][f"by_{grouping}"] = {
+                    value: summarize(values)
+                    for value, values in sorted(metric_groups.get(grouping, {}).items())
+                }
+        return report
+
+
+def _naive(value: Optional[datetime]) -> Optional[datetime]:
+    """Compare SQLite (naive) and aware timestamps on the same footing."""
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+# Shared analytics cache used by the complaint routes
+resolution_analytics = ResolutionAnalytics()
@@ -0,0 +1,171 @@
+import math
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+import models
+import sla
+from events import broker
+
+# Complaints are counted in fixed buckets of this many minutes
+BUCKET_MINUTES = 15
+
+# Weight of the newest bucket in the moving mean and variance
+EWMA_ALPHA = 0.1
+
+# A bucket is a spike when it exceeds the expected count by this many deviations...
+SPIKE_SIGMAS = 3.0
+# ...and holds at least this many complaints, so single stray reports never alert
+MIN_SPIKE_COUNT = 3
+# Floor on the deviation while history is still quiet
+MIN_STDDEV = 1.0
+
+# Recent history replayed at startup so the estimates do not start from zero
+WARMUP_DAYS = 7
+
+# Empty buckets beyond this many leave the estimates effectively at zero
+MAX_CATCHUP_BUCKETS = 1000
+
+BUCKET = timedelta(minutes=BUCKET_MINUTES)
+
+
+class _Rate:
+    __slots__ = ("bucket_start", "count", "mean", "variance", "incident")
+
+    def __init__(self, bucket_start):
+        self.bucket_start = bucket_start
+        self.count = 0
+        self.mean = 0.0
+        self.variance = 0.0
+        self.incident: Optional[dict] = None
+
+    def threshold(self) -> float:
+        return self.mean + SPIKE_SIGMAS * max(math.sqrt(self.variance), MIN_STDDEV)
+
+    def close_bucket(self, count: int):
+        diff = count - self.mean
+        increment = EWMA_ALPHA * diff
+        self.mean += increment
+        self.variance = (1 - EWMA_ALPHA) * (self.variance + diff * increment)
+
+
+class InflowDetector:
+    """
+    Spots sudden bursts of complaints per (hostel, category).
+
+    Complaints are counted per fixed-size bucket, and each closed bucket
+    feeds an exponentially weighted mean and variance, so every key costs a
+    handful of numbers no matter how much history it has. An incident is
+    raised when the open bucket runs well above the expected count, and
+    cleared once a bucket closes back within range.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rates: Dict[Tuple[str, str], _Rate] = {}
+
+    def build(self, db: Session):
+        """Replay the last few days of complaints to seed the estimates."""
+        since = sla.utc_now() - timedelta(days=WARMUP_DAYS)
+        rows = db.query(
+            models.Complaint.hostel,
+            models.Complaint.category,
+            models.Complaint.created_at,
+        ).filter(models.Complaint.created_at >= since).order_by(models.Complaint.created_at).all()
+
+        with self._lock:
+            self._rates.clear()
+            for row in rows:
+                self._record_locked(row.hostel, row.category, _naive(row.created_at))
+            # History should only inform the baseline, not raise alerts at startup
+            for rate in self._rates.values():
+                rate.incident = None
+
+    def record(self, complaint: models.Complaint, at: Optional[datetime] = None):
+        """Count a newly filed complaint and announce any incident it starts."""
+        with self._lock:
+            events = self._record_locked(complaint.hostel, complaint.category, at or sla.utc_now())
+        for event_type, incident in events:
+            _publish(event_type, incident)
+
+    def incidents(self, now: Optional[datetime] = None) -> List[dict]:
+        """Incidents that are still active at the given time."""
+        now = now or sla.utc_now()
+        events = []
+        with self._lock:
+            active = []
+            for key, rate in self._rates.items():
+                events += self._roll_locked(key, rate, now)
+                if rate.incident is not None:
+                    active.append(dict(rate.incident))
+        for event_type, incident in events:
+            _publish(event_type, incident)
+        return sorted(active, key=lambda incident: incident["detected_at"], reverse=True)
+
+    def _record_locked(self, hostel, category, at):
+        key = (hostel or "unknown", category or "other")
+        rate = self._rates.get(key)
+        if rate is None:
+            rate = self._rates[key] = _Rate(_bucket_start(at))
+        events = self._roll_locked(key, rate, at)
+
+        rate.count += 1
+        if rate.count >= MIN_SPIKE_COUNT and rate.count > rate.threshold():
+            if rate.incident is None:
+                rate.incident = {
+                    "hostel": key[0],
+                    "category": key[1],
+                    "detected_at": at.isoformat(),
+                    "window_minutes": BUCKET_MINUTES,
+                    "count": rate.count,
+                    "expected": round(rate.mean, 2),
+                }
+                events.append(("complaint.incident", dict(rate.incident)))
+            else:
+                rate.incident["count"] = max(rate.incident["count"], rate.count)
+        return events
+
+    def _roll_locked(self, key, rate, at) -> List[tuple]:
+        """Close every bucket that ended before at, clearing incidents that have calmed down."""
+        events = []
+        elapsed = int((at - rate.bucket_start) / BUCKET)
+        if elapsed <= 0:
+            return events
+
+        if rate.incident is not None and rate.count <= rate.threshold():
+            events.append(("complaint.incident_cleared", dict(rate.incident)))
+            rate.incident = None
+        rate.close_bucket(rate.count)
+        for _ in range(min(elapsed - 1, MAX_CATCHUP_BUCKETS)):
+            rate.close_bucket(0)
+        if rate.incident is not None and elapsed > 1:
+            # A whole empty bucket means the burst is over
+            events.append(("complaint.incident_cleared", dict(rate.incident)))
+            rate.incident = None
+
+        rate.bucket_start += elapsed * BUCKET
+        rate.count = 0
+        return events
+
+
+def _publish(event_type: str, incident: dict):
+    # Same audience as a complaint in that hostel and category, minus students
+    scope = {"hostel": incident["hostel"], "category": incident["category"], "user_id": None}
+    broker.publish(event_type, incident, visible_to=lambda subscriber: subscriber.can_see(scope))
+
+
+def _bucket_start(at: datetime) -> datetime:
+    return at.replace(minute=at.minute - at.minute % BUCKET_MINUTES, second=0, microsecond=0)
+
+
+def _naive(value: Optional[datetime]) -> Optional[datetime]:
+    """Compare SQLite (naive) and aware timestamps on the same footing."""
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+# Shared detector fed by the complaint routes
+inflow_detector = InflowDetector()
@@ -0,0 +1,72 @@
+import logging
+from datetime import timedelta
+from typing import Optional
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import Session
+
+import models
+import sla
+
+logger = logging.getLogger(__name__)
+
+# Resolved complaints older than this move to the archive table
+ARCHIVE_AFTER_DAYS = 180
+
+# Rows moved per transaction, and transactions per background pass
+ARCHIVE_BATCH_SIZE = 500
+MAX_BATCHES_PER_PASS = 20
+
+# Columns shared by the hot and archive tables
+ARCHIVED_COLUMNS = [
+    column.name for column in models.ArchivedComplaint.__table__.columns
+    if column.name != "archived_at"
+]
+
+
+def archive_resolved(
+    db: Session,
+    older_than_days: int = ARCHIVE_AFTER_DAYS,
+    batch_size: int = ARCHIVE_BATCH_SIZE,
+    max_batches: int = MAX_BATCHES_PER_PASS,
+) -> int:
+    """
+    Move complaints resolved more than older_than_days ago into the archive,
+    one INSERT ... SELECT plus DELETE per batch, each batch in its own short
+    transaction. Returns the number of complaints archived.
+    """
+    cutoff = sla.utc_now() - timedelta(days=older_than_days)
+    complaint = models.Complaint
+    archived = 0
+
+    # SQLite hands out max(id) + 1 for new rows, so never move the newest
+    # complaint: its id could be reused and collide with the archived copy
+    newest_id = db.query(func.max(complaint.id)).scalar()
+    if newest_id is None:
+        return 0
+
+    for _ in range(max_batches):
+        ids = [
+            row.id for row in db.query(complaint.id).filter(
+                complaint.status == "resolved",
+                complaint.resolved_at < cutoff,
+                complaint.id < newest_id,
+            ).order_by(complaint.resolved_at).limit(batch_size)
+        ]
+        if not ids:
+            break
+
+        source = select(*[getattr(complaint, name) for name in ARCHIVED_COLUMNS]).where(complaint.id.in_(ids))
+        db.execute(insert(models.ArchivedComplaint).from_select(ARCHIVED_COLUMNS, source))
+        db.query(complaint).filter(complaint.id.in_(ids)).delete(synchronize_session=False)
+        db.commit()
+        archived += len(ids)
+
+    if archived:
+        logger.info("Archived %d resolved complaints", archived)
+    return archived
+
+
+def find_archived(db: Session, complaint_id: int) -> Optional[models.ArchivedComplaint]:
+    """Look a complaint up in the archive table."""
+    return db.query(models.ArchivedComplaint).filter(models.ArchivedComplaint.id == complaint_id).first()
@@ -0,0 +1,187 @@
+import heapq
+import itertools
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+import models
+
+# Which staff role handles each complaint category
+ROLE_FOR_CATEGORY = {
+    "plumbing": "plumber",
+    "electrical": "electrician",
+    "mess": "mess_vendor",
+    "food": "mess_vendor",
+}
+
+STAFF_ROLES = set(ROLE_FOR_CATEGORY.values())
+
+# Complaints in these states count towards an assignee's workload
+OPEN_STATUSES = ("pending", "in_progress")
+
+
+def is_open(status: Optional[str]) -> bool:
+    """Whether a complaint in this status still needs work."""
+    return status in OPEN_STATUSES
+
+
+class _StaffState:
+    __slots__ = ("user_id", "role", "hostel", "available", "load", "entry_seq")
+
+    def __init__(self, user_id, role, hostel, available, load=0):
+        self.user_id = user_id
+        self.role = role
+        self.hostel = hostel
+        self.available = available
+        self.load = load
+        self.entry_seq = None
+
+
+class AssignmentEngine:
+    """
+    Routes new complaints to the least-loaded eligible staff member.
+
+    Staff are kept in min-heaps keyed by (role, hostel), where a hostel of
+    None means the staff member covers every hostel. Workload changes push a
+    fresh heap entry and leave the old one behind; stale entries are skipped
+    when they surface, so picks and updates are O(log n).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._staff: Dict[int, _StaffState] = {}
+        self._heaps: Dict[Tuple[str, Optional[str]], List[tuple]] = {}
+        self._seq = itertools.count()
+
+    def build(self, db: Session):
+        """Rebuild staff and workload state from the database."""
+        staff = db.query(models.User).filter(models.User.role.in_(STAFF_ROLES)).all()
+        loads = dict(
+            db.query(models.Complaint.assigned_to, func.count(models.Complaint.id))
+            .filter(
+                models.Complaint.assigned_to.isnot(None),
+                models.Complaint.status.in_(OPEN_STATUSES),
+            )
+            .group_by(models.Complaint.assigned_to)
+            .all()
+        )
+
+        with self._lock:
+            self._staff.clear()
+            self._heaps.clear()
+            for user in staff:
+                state = _StaffState(user.id, user.role, user.hostel,
+                                    bool(user.is_active), loads.get(user.id, 0))
+                self._staff[user.id] = state
+                self._push_locked(state)
+
+    def pick(self, category: str, hostel: Optional[str]) -> Optional[int]:
+        """
+        Choose the least-loaded available staff member for a new complaint and
+        count the complaint against them. Returns None if nobody is eligible.
+        """
+        role = ROLE_FOR_CATEGORY.get(category)
+        if role is None:
+            return None
+
+        with self._lock:
+            best = None
+            for key in ((role, hostel), (role, None)):
+                entry = self._peek_locked(key)
+                if entry is not None and (best is None or entry < best):
+                    best = entry
+            if best is None:
+                return None
+
+            state = self._staff[best[2]]
+            state.load += 1
+            self._push_locked(state)
+            return state.user_id
+
+    def complaint_changed(
+        self,
+        old_assignee: Optional[int],
+        old_status: Optional[str],
+        new_assignee: Optional[int],
+        new_status: Optional[str],
+    ):
+        """Apply a complaint's assignee/status transition to the workload counts."""
+        if old_assignee == new_assignee and is_open(old_status) == is_open(new_status):
+            return
+        with self._lock:
+            if old_assignee is not None and is_open(old_status):
+                self._adjust_locked(old_assignee, -1)
+            if new_assignee is not None and is_open(new_status):
+                self._adjust_locked(new_assignee, 1)
+
+    def upsert_staff(self, user: models.User):
+        """Track a new staff member or pick up changes to role, hostel or availability."""
+        with self._lock:
+            state = self._staff.get(user.id)
+            if user.role not in STAFF_ROLES:
+                if state is not None:
+                    del self._staff[user.id]
+                return
+            if state is None:
+                state = _StaffState(user.id, user.role, user.hostel, bool(user.is_active))
+                self._staff[user.id] = state
+            else:
+                state.role = user.role
+                state.hostel = user.hostel
+                state.available = bool(user.is_active)
+            self._push_locked(state)
+
+    def remove_staff(self, user_id: int):
+        """Stop routing complaints to a user."""
+        with self._lock:
+            self._staff.pop(user_id, None)
+
+    def workload(self, user_id: int) -> int:
+        """Number of open complaints currently assigned to a user."""
+        state = self._staff.get(user_id)
+        return state.load if state is not None else 0
+
+    def _adjust_locked(self, user_id, delta):
+        state = self._staff.get(user_id)
+        if state is None:
+            return
+        state.load = max(state.load + delta, 0)
+        self._push_locked(state)
+
+    def _push_locked(self, state):
+        seq = next(self._seq)
+        state.entry_seq = seq
+        heap = self._heaps.setdefault((state.role, state.hostel), [])
+        heapq.heappush(heap, (state.load, seq, state.user_id))
+        # Compact once stale entries dominate so memory stays proportional to staff
+        if len(heap) > 2 * len(self._staff) + 16:
+            self._compact_locked((state.role, state.hostel))
+
+    def _peek_locked(self, key):
+        heap = self._heaps.get(key)
+        while heap:
+            entry = heap[0]
+            if self._is_current(entry, key):
+                return entry
+            heapq.heappop(heap)
+        return None
+
+    def _is_current(self, entry, key):
+        state = self._staff.get(entry[2])
+        return (
+            state is not None
+            and state.available
+            and state.entry_seq == entry[1]
+            and (state.role, state.hostel) == key
+        )
+
+    def _compact_locked(self, key):
+        heap = [entry for entry in self._heaps[key] if self._is_current(entry, key)]
+        heapq.heapify(heap)
+        self._heaps[key] = heap
+
+
+# Shared engine used by the complaint and user routes
+assignment_engine = AssignmentEngine()
@@ -1,14 +1,14 @@
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 from pydantic import ValidationError
 
 import models
 import schemas
-from database import get_db
+from database import get_db, SessionLocal
 
 # Security constants
 SECRET_KEY = "replace_with_secure_secret_key_in_production"
@@ -58,6 +58,37 @@ async def get_current_user(
         raise credentials_exception
     return user
 
+async def get_stream_user(request: Request, token: Optional[str] = None):
+    """
+    Authenticate a long-lived event stream. Browsers' EventSource cannot send
+    headers, so the token may also be passed as a query parameter. Uses its
+    own short-lived session so open streams do not hold database connections.
+    """
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    
+    authorization = request.headers.get("Authorization", "")
+    if authorization.lower().startswith("bearer "):
+        token = authorization[7:]
+    if not token:
+        raise credentials_exception
+    
+    token_data = verify_token(token, credentials_exception)
+    db = SessionLocal()
+    try:
+        user = db.query(models.User).filter(models.User.id == token_data.user_id).first()
+        if user is None:
+            raise credentials_exception
+        if not user.is_active:
+            raise HTTPException(status_code=400, detail="Inactive user")
+        db.expunge(user)
+    finally:
+        db.close()
+    return user
+
 async def get_current_active_user(current_user: models.User = Depends(get_current_user)):
     """Check if user is active"""
     if not current_user.is_active:
@@ -0,0 +1,45 @@
+import asyncio
+import logging
+from typing import Callable, List
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+_tasks: List[asyncio.Task] = []
+
+
+def start_periodic(name: str, interval_seconds: float, job: Callable[[Session], object]):
+    """
+    Run job(db) every interval_seconds on the event loop's thread pool, each
+    time with a fresh database session. Failures are logged and retried on
+    the next tick. Must be called from a running event loop (e.g. startup).
+    """
+    async def runner():
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                await run_in_threadpool(_run_with_session, job)
+            except Exception:
+                logger.exception("Background job %s failed", name)
+
+    _tasks.append(asyncio.get_running_loop().create_task(runner(), name=name))
+
+
+async def stop_all():
+    """Cancel every periodic job (called on application shutdown)."""
+    for task in _tasks:
+        task.cancel()
+    await asyncio.gather(*_tasks, return_exceptions=True)
+    _tasks.clear()
+
+
+def _run_with_session(job):
+    db = SessionLocal()
+    try:
+        job(db)
+    finally:
+        db.close()
@@ -0,0 +1,149 @@
+from collections import Counter, deque
+from typing import Dict, List, Optional, Tuple
+
+
+class CohortStudent:
+    __slots__ = ("user_id", "hostel", "roommates", "floor", "room_type")
+
+    def __init__(self, user_id, hostel, roommates, floor=None, room_type=None):
+        self.user_id = user_id
+        self.hostel = hostel
+        self.roommates = set(roommates or ())
+        self.floor = floor
+        self.room_type = room_type
+
+
+class FreeRoom:
+    __slots__ = ("room_id", "number", "hostel", "floor", "type", "free_beds")
+
+    def __init__(self, room_id, number, hostel, floor, room_type, free_beds):
+        self.room_id = room_id
+        self.number = number
+        self.hostel = hostel
+        self.floor = floor
+        self.type = room_type
+        self.free_beds = sorted(free_beds)
+
+
+class _HostelRooms:
+    """Rooms of one hostel bucketed by (floor, type) and then by free bed count."""
+
+    def __init__(self, rooms: List[FreeRoom]):
+        self.buckets: Dict[tuple, Dict[int, List[FreeRoom]]] = {}
+        self.max_free = 0
+        for room in sorted(rooms, key=lambda room: room.room_id, reverse=True):
+            self._put(room)
+
+    def take(self, size: int, floor: Optional[int], room_type: Optional[str]) -> Optional[FreeRoom]:
+        """
+        Remove and return the room that best fits a group: a preferred floor
+        and type first, then the tightest fit so empty rooms stay free for
+        larger groups.
+        """
+        preferences = []
+        for preference in ((floor, room_type), (floor, None), (None, room_type), (None, None)):
+            if preference not in preferences:
+                preferences.append(preference)
+
+        for want_floor, want_type in preferences:
+            best_key, best_free = None, None
+            for key, by_free in self.buckets.items():
+                if want_floor is not None and key[0] != want_floor:
+                    continue
+                if want_type is not None and key[1] != want_type:
+                    continue
+                for free in range(size, self.max_free + 1):
+                    if by_free.get(free) and (best_free is None or free < best_free):
+                        best_key, best_free = key, free
+                        break
+            if best_key is not None:
+                return self.buckets[best_key][best_free].pop()
+        return None
+
+    def put_back(self, room: FreeRoom):
+        if room.free_beds:
+            self._put(room)
+
+    def _put(self, room: FreeRoom):
+        free = len(room.free_beds)
+        if not free:
+            return
+        self.buckets.setdefault((room.floor, room.type), {}).setdefault(free, []).append(room)
+        self.max_free = max(self.max_free, free)
+
+
+def solve(students: List[CohortStudent], rooms: List[FreeRoom]) -> Tuple[Dict[int, Tuple[FreeRoom, int]], Dict[int, str]]:
+    """
+    Assign cohort students to free beds. Roommate requests within the same
+    hostel are merged into groups that are placed in one room where possible;
+    groups are placed largest first, each in the best-fitting room that meets
+    its floor and room type preferences, falling back to any room with space.
+
+    Returns ({user_id: (room, bed_number)}, {user_id: reason}) for placed and
+    unplaced students.
+    """
+    by_hostel: Dict[str, List[FreeRoom]] = {}
+    for room in rooms:
+        by_hostel.setdefault(room.hostel, []).append(room)
+    hostel_rooms = {hostel: _HostelRooms(hostel_list) for hostel, hostel_list in by_hostel.items()}
+
+    placements: Dict[int, Tuple[FreeRoom, int]] = {}
+    failures: Dict[int, str] = {}
+
+    queue = deque(sorted(
+        _groups(students),
+        key=lambda group: (-len(group), -_constraint_count(group), group[0].user_id),
+    ))
+    while queue:
+        group = queue.popleft()
+        hostel = group[0].hostel
+        available = hostel_rooms.get(hostel)
+        floor = _preferred(student.floor for student in group)
+        room_type = _preferred(student.room_type for student in group)
+
+        room = available.take(len(group), floor, room_type) if available is not None else None
+        if room is not None:
+            for student in group:
+                placements[student.user_id] = (room, room.free_beds.pop(0))
+            available.put_back(room)
+        elif len(group) > 1:
+            # No room can take the whole group; keep halves together instead
+            middle = len(group) // 2
+            queue.appendleft(group[middle:])
+            queue.appendleft(group[:middle])
+        else:
+            failures[group[0].user_id] = f"No free bed left in {hostel}"
+
+    return placements, failures
+
+
+def _groups(students: List[CohortStudent]) -> List[List[CohortStudent]]:
+    """Union students who asked for each other (in either direction) within a hostel."""
+    by_id = {student.user_id: student for student in students}
+    parent = {user_id: user_id for user_id in by_id}
+
+    def find(user_id):
+        while parent[user_id] != user_id:
+            parent[user_id] = parent[parent[user_id]]
+            user_id = parent[user_id]
+        return user_id
+
+    for student in students:
+        for roommate in student.roommates:
+            other = by_id.get(roommate)
+            if other is not None and other.hostel == student.hostel:
+                parent[find(student.user_id)] = find(roommate)
+
+    groups: Dict[int, List[CohortStudent]] = {}
+    for student in students:
+        groups.setdefault(find(student.user_id), []).append(student)
+    return [sorted(group, key=lambda student: student.user_id) for group in groups.values()]
+
+
+def _preferred(values) -> Optional[object]:
+    counts = Counter(value for value in values if value is not None)
+    return counts.most_common(1)[0][0] if counts else None
+
+
+def _constraint_count(group: List[CohortStudent]) -> int:
+    return sum(1 for student in group if student.floor is not None or student.room_type is not None)
@@ -0,0 +1,97 @@
+import random
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from analytics import percentiles
+from hostel_load import hostel_load
+from occupancy import occupancy_summary
+
+HOSTELS = ("lohit_girls", "lohit_boys", "papum_boys", "subhanshiri_boys")
+
+STUDENT_TYPES = ("female", "phd_male", "male")
+
+# Shortfall percentiles reported for every hostel
+OVERFLOW_PERCENTILES = (50, 90, 99)
+
+
+def split_males(count: int, lohit_free: int, papum_free: int) -> Tuple[int, int]:
+    """
+    How count male students divide between Lohit and Papum under
+    allocate_hostel_for_student, which sends each one to Lohit while it has
+    at least as much free capacity as Papum. Returns (to_lohit, to_papum)
+    without replaying the students one by one.
+    """
+    if lohit_free >= papum_free:
+        # Lohit takes students until it is one behind, then the two alternate starting with Papum
+        first = min(count, lohit_free - papum_free + 1)
+        rest = count - first
+        return first + rest // 2, rest - rest // 2
+    # Papum takes students until level, then the two alternate starting with Lohit
+    first = min(count, papum_free - lohit_free)
+    rest = count - first
+    return rest - rest // 2, first + rest // 2
+
+
+def load_state(db: Session) -> Dict[str, dict]:
+    """Beds, resident students and students still waiting for a bed per hostel."""
+    summary = occupancy_summary.get(db)
+    state = {}
+    for hostel in HOSTELS:
+        state[hostel] = dict(
+            hostel_load.load(hostel),
+            waiting=summary["hostels"].get(hostel, {}).get("unallocated_students", 0),
+        )
+    return state
+
+
+def simulate(state: Dict[str, dict], intake: Dict[str, Tuple[float, float]], scenarios: int,
+             seed: Optional[int] = None) -> dict:
+    """
+    Run randomized intake scenarios against a hostel state. Each scenario
+    draws how many students of each type arrive (normal with the given mean
+    and standard deviation), sends them to hostels by the registration
+    rules and counts the students left without a bed in each hostel.
+    """
+    rng = random.Random(seed)
+    draws = {
+        student_type: _draw(rng, *intake.get(student_type, (0, 0)), scenarios)
+        for student_type in STUDENT_TYPES
+    }
+
+    lohit, papum = state["lohit_boys"]["free_capacity"], state["papum_boys"]["free_capacity"]
+    male_split = [split_males(count, lohit, papum) for count in draws["male"]]
+    arrivals = {
+        "lohit_girls": draws["female"],
+        "subhanshiri_boys": draws["phd_male"],
+        "lohit_boys": [to_lohit for to_lohit, _ in male_split],
+        "papum_boys": [to_papum for _, to_papum in male_split],
+    }
+
+    hostels = {}
+    for hostel in HOSTELS:
+        beds = state[hostel]
+        # Residents still waiting are ahead of the new intake for any bed
+        counts = arrivals[hostel]
+        shortfalls = sorted(max(count - beds["free_capacity"], 0) for count in counts)
+        overflowing = sum(1 for shortfall in shortfalls if shortfall)
+        hostels[hostel] = {
+            "capacity": beds["capacity"],
+            "free_beds": beds["free_beds"],
+            "residents": beds["residents"],
+            "free_capacity": beds["free_capacity"],
+            "waiting": beds["waiting"],
+            "expected_intake": round(sum(counts) / scenarios, 2),
+            "overflow_probability": round(overflowing / scenarios, 4),
+            "expected_overflow": round(sum(shortfalls) / scenarios, 2),
+            "overflow": percentiles(shortfalls, OVERFLOW_PERCENTILES),
+        }
+
+    return {"scenarios": scenarios, "seed": seed, "hostels": hostels}
+
+
+def _draw(rng: random.Random, mean: float, stddev: float, scenarios: int) -> List[int]:
+    if stddev <= 0:
+        return [max(round(mean), 0)] * scenarios
+    gauss = rng.gauss
+    return [max(round(gauss(mean, stddev)), 0) for _ in range(scenarios)]
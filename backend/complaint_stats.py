@@ -0,0 +1,129 @@
+import logging
+from collections import Counter
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+import models
+
+logger = logging.getLogger(__name__)
+
+# (hostel, category, status, priority) - the dimensions complaint counters are kept by
+StatsKey = Tuple[Optional[str], Optional[str], Optional[str], Optional[str]]
+
+DIMENSIONS = ("hostel", "category", "status", "priority")
+
+
+def stats_key(complaint) -> StatsKey:
+    """Counter key for a complaint (ORM object or row with the same attributes)."""
+    return (complaint.hostel, complaint.category, complaint.status, complaint.priority)
+
+
+def record_change(db: Session, before: Optional[StatsKey], after: Optional[StatsKey]):
+    """
+    Move one complaint between counters. Pass before=None for a new complaint.
+    Runs inside the caller's transaction, so counters commit with the change.
+    """
+    if before == after:
+        return
+    deltas = Counter()
+    if before is not None:
+        deltas[before] -= 1
+    if after is not None:
+        deltas[after] += 1
+    apply_deltas(db, deltas)
+
+
+def apply_deltas(db: Session, deltas: Dict[StatsKey, int]):
+    """Add per-key deltas to the counters table without committing."""
+    counter = models.ComplaintCounter
+    for key, delta in deltas.items():
+        if delta == 0:
+            continue
+        hostel, category, status, priority = key
+        updated = db.query(counter).filter(
+            _match(counter.hostel, hostel),
+            _match(counter.category, category),
+            _match(counter.status, status),
+            _match(counter.priority, priority),
+        ).update({counter.count: counter.count + delta}, synchronize_session=False)
+        if not updated:
+            db.add(counter(hostel=hostel, category=category, status=status,
+                           priority=priority, count=delta))
+    db.flush()
+
+
+def summarize(db: Session, hostels: Optional[Iterable[str]] = None,
+              categories: Optional[Iterable[str]] = None) -> dict:
+    """
+    Roll the counters up into totals per dimension, optionally restricted to
+    some hostels or categories. Reads at most one row per key combination,
+    independent of how many complaints exist.
+    """
+    counter = models.ComplaintCounter
+    query = db.query(counter).filter(counter.count != 0)
+    if hostels is not None:
+        query = query.filter(counter.hostel.in_(list(hostels)))
+    if categories is not None:
+        query = query.filter(counter.category.in_(list(categories)))
+
+    summary = {"total": 0}
+    for dimension in DIMENSIONS:
+        summary[f"by_{dimension}"] = {}
+    for row in query.all():
+        summary["total"] += row.count
+        for dimension in DIMENSIONS:
+            bucket = summary[f"by_{dimension}"]
+            value = getattr(row, dimension) or "unknown"
+            bucket[value] = bucket.get(value, 0) + row.count
+    return summary
+
+
+def reconcile(db: Session) -> int:
+    """
+    Recount complaints from scratch and repair any counter that drifted.
+    Returns the number of counters that had to be corrected.
+    """
+    counter = models.ComplaintCounter
+    # Archived complaints still count; they have only moved tables
+    actual = Counter()
+    for model in (models.Complaint, models.ArchivedComplaint):
+        for row in db.query(
+            model.hostel,
+            model.category,
+            model.status,
+            model.priority,
+            func.count(model.id).label("count"),
+        ).group_by(
+            model.hostel,
+            model.category,
+            model.status,
+            model.priority,
+        ):
+            actual[(row.hostel, row.category, row.status, row.priority)] += row.count
+
+    corrected = 0
+    seen = set()
+    for row in db.query(counter).all():
+        key = stats_key(row)
+        seen.add(key)
+        expected = actual.get(key, 0)
+        if row.count != expected:
+            row.count = expected
+            corrected += 1
+    for key, count in actual.items():
+        if key not in seen:
+            hostel, category, status, priority = key
+            db.add(counter(hostel=hostel, category=category, status=status,
+                           priority=priority, count=count))
+            corrected += 1
+    db.commit()
+
+    if corrected:
+        logger.warning("Repaired %d drifted complaint counters", corrected)
+    return corrected
+
+
+def _match(column, value):
+    return column.is_(None) if value is None else column == value
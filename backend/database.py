@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
@@ -21,3 +21,26 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def sync_schema(before_indexes=None):
+    """
+    Create missing tables, then add columns and indexes introduced since an
+    existing database was created. Only additive changes are handled.
+    before_indexes(connection) runs first, e.g. to clean up rows that would
+    violate a new unique index.
+    """
+    Base.metadata.create_all(bind=engine)
+    inspector = inspect(engine)
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+        if before_indexes is not None:
+            before_indexes(connection)
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(connection, checkfirst=True)
@@ -0,0 +1,178 @@
+import heapq
+import itertools
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+import models
+import sla
+import complaint_stats
+from assignment import assignment_engine, is_open, OPEN_STATUSES
+from events import broker
+
+logger = logging.getLogger(__name__)
+
+# Priorities from least to most urgent; a missed deadline moves one step along
+ESCALATION_ORDER = sorted(sla.PRIORITY_RANK, key=sla.PRIORITY_RANK.get, reverse=True)
+
+
+def next_priority(priority: Optional[str]) -> Optional[str]:
+    """The priority a complaint escalates to, or None if it is already urgent."""
+    position = ESCALATION_ORDER.index(priority if priority in sla.PRIORITY_RANK else sla.DEFAULT_PRIORITY)
+    if position + 1 < len(ESCALATION_ORDER):
+        return ESCALATION_ORDER[position + 1]
+    return None
+
+
+class EscalationScheduler:
+    """
+    Min-heap of SLA deadlines for open complaints.
+
+    Each check pops only the deadlines that have passed, so its cost follows
+    the number of escalations rather than the size of the complaints table.
+    Rescheduling pushes a fresh entry and leaves the old one behind; stale
+    entries are skipped when they surface.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._heap: List[tuple] = []
+        self._deadlines: Dict[int, int] = {}
+        self._seq = itertools.count()
+
+    def build(self, db: Session):
+        """Load the deadlines of every open complaint."""
+        rows = db.query(models.Complaint.id, models.Complaint.due_at).filter(
+            models.Complaint.status.in_(OPEN_STATUSES),
+            models.Complaint.due_at.isnot(None),
+        ).all()
+
+        with self._lock:
+            self._heap = []
+            self._deadlines.clear()
+            for row in rows:
+                seq = next(self._seq)
+                self._deadlines[row.id] = seq
+                self._heap.append((_naive(row.due_at), seq, row.id))
+            heapq.heapify(self._heap)
+
+    def schedule(self, complaint: models.Complaint):
+        """Track a complaint's current deadline, or stop tracking it once it is closed."""
+        if not is_open(complaint.status) or complaint.due_at is None:
+            self.cancel(complaint.id)
+            return
+        with self._lock:
+            seq = next(self._seq)
+            self._deadlines[complaint.id] = seq
+            heapq.heappush(self._heap, (_naive(complaint.due_at), seq, complaint.id))
+            # Compact once stale entries dominate so memory stays proportional to open complaints
+            if len(self._heap) > 2 * len(self._deadlines) + 64:
+                self._heap = [entry for entry in self._heap if self._deadlines.get(entry[2]) == entry[1]]
+                heapq.heapify(self._heap)
+
+    def cancel(self, complaint_id: int):
+        """Forget a complaint's deadline."""
+        with self._lock:
+            self._deadlines.pop(complaint_id, None)
+
+    def pending(self) -> int:
+        """Number of complaints with a deadline being tracked."""
+        return len(self._deadlines)
+
+    def run_due(self, db: Session, now: Optional[datetime] = None) -> int:
+        """Escalate every complaint whose deadline has passed. Returns how many were escalated."""
+        now = now or sla.utc_now()
+        escalated = 0
+        for complaint_id in self._pop_due(now):
+            complaint = db.query(models.Complaint).filter(models.Complaint.id == complaint_id).first()
+            if complaint is None or not is_open(complaint.status) or complaint.due_at is None:
+                continue
+            if _naive(complaint.due_at) > now:
+                # The deadline moved after this entry was queued
+                self.schedule(complaint)
+                continue
+            try:
+                if self._escalate(db, complaint, now):
+                    escalated += 1
+            except Exception:
+                # Keep the deadline so the next check retries this complaint
+                logger.exception("Failed to escalate complaint %s", complaint_id)
+                db.rollback()
+                self.schedule(complaint)
+
+        if escalated:
+            logger.info("Escalated %d overdue complaints", escalated)
+        return escalated
+
+    def _pop_due(self, now: datetime) -> List[int]:
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                _, seq, complaint_id = heapq.heappop(self._heap)
+                if self._deadlines.get(complaint_id) == seq:
+                    del self._deadlines[complaint_id]
+                    due.append(complaint_id)
+        return due
+
+    def _escalate(self, db: Session, complaint: models.Complaint, now: datetime) -> bool:
+        """
+        Raise an overdue complaint's priority, or hand an overdue urgent
+        complaint to the least-loaded eligible staff member. Either way the
+        SLA clock restarts from now at the new priority.
+        """
+        previous_key = complaint_stats.stats_key(complaint)
+        previous_assignee = complaint.assigned_to
+        priority = next_priority(complaint.priority)
+        reassigned_to = None
+
+        values = {}
+        if priority is not None:
+            values[models.Complaint.priority] = priority
+            values[models.Complaint.priority_rank] = sla.priority_rank(priority)
+        else:
+            priority = complaint.priority
+            reassigned_to = assignment_engine.pick(complaint.category, complaint.hostel)
+            if reassigned_to is not None:
+                values[models.Complaint.assigned_to] = reassigned_to
+                values[models.Complaint.assigned_at] = func.coalesce(models.Complaint.assigned_at, now)
+        values[models.Complaint.due_at] = sla.due_at(priority, now)
+
+        # Skip the complaint if someone changed it since it was loaded
+        updated = db.query(models.Complaint).filter(
+            models.Complaint.id == complaint.id,
+            models.Complaint.status == complaint.status,
+            models.Complaint.due_at == complaint.due_at,
+        ).update(values, synchronize_session=False)
+        if not updated:
+            db.rollback()
+            if reassigned_to is not None:
+                assignment_engine.complaint_changed(reassigned_to, complaint.status, None, complaint.status)
+            return False
+
+        complaint_stats.record_change(
+            db, previous_key, (previous_key[0], previous_key[1], previous_key[2], priority)
+        )
+        db.commit()
+        db.refresh(complaint)
+
+        if reassigned_to is not None:
+            # pick() already counted the complaint against the new assignee
+            assignment_engine.complaint_changed(previous_assignee, complaint.status, None, complaint.status)
+        self.schedule(complaint)
+        broker.publish_complaint("complaint.escalated", complaint)
+        return True
+
+
+def _naive(value: Optional[datetime]) -> Optional[datetime]:
+    """Compare SQLite (naive) and aware timestamps on the same footing."""
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+# Shared scheduler used by the complaint routes and the background job
+escalation_scheduler = EscalationScheduler()
@@ -0,0 +1,136 @@
+import asyncio
+import json
+import logging
+import threading
+from typing import Set
+
+import models
+import schemas
+
+logger = logging.getLogger(__name__)
+
+# Events a connection may fall behind by before it is dropped as a slow consumer
+SUBSCRIBER_QUEUE_SIZE = 100
+
+# Seconds between keep-alive comments on an idle stream
+HEARTBEAT_INTERVAL = 15
+
+WARDEN_HOSTELS = {
+    "warden_lohit_girls": "lohit_girls",
+    "warden_lohit_boys": "lohit_boys",
+    "warden_papum_boys": "papum_boys",
+    "warden_subhanshiri_boys": "subhanshiri_boys"
+}
+
+
+def role_can_see(role: str, user_id: int, complaint: dict) -> bool:
+    """Mirror the per-role filtering applied by get_complaints."""
+    if role == "student":
+        return complaint["user_id"] == user_id
+    if role.startswith("warden_"):
+        return complaint["hostel"] == WARDEN_HOSTELS.get(role)
+    if role == "plumber":
+        return complaint["category"] == "plumbing"
+    if role == "electrician":
+        return complaint["category"] == "electrical"
+    if role == "mess_vendor":
+        return complaint["category"] in ("mess", "food")
+    return True
+
+
+class Subscriber:
+    """One open event stream, with the viewer scope it was opened under."""
+
+    def __init__(self, user: models.User, loop: asyncio.AbstractEventLoop):
+        self.user_id = user.id
+        self.role = user.role
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.evicted = False
+
+    def can_see(self, complaint: dict) -> bool:
+        return role_can_see(self.role, self.user_id, complaint)
+
+
+class EventBroker:
+    """
+    In-process pub/sub fan-out for complaint events.
+
+    Each connection has a bounded queue; publishing never blocks, and a
+    connection whose queue is full is evicted instead of buffering without
+    limit. Idle connections cost nothing but their queue object.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers: Set[Subscriber] = set()
+
+    def subscribe(self, user: models.User) -> Subscriber:
+        subscriber = Subscriber(user, asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def publish(self, event_type: str, payload: dict, visible_to=None):
+        """
+        Deliver an event to every subscriber allowed to see it. visible_to is
+        a predicate over subscribers; by default nobody is filtered out.
+        Safe to call from route handlers and from worker threads.
+        """
+        with self._lock:
+            subscribers = list(self._subscribers)
+        if not subscribers:
+            return
+
+        frame = f"event: {event_type}\ndata: {json.dumps(payload, default=str)}\n\n"
+        for subscriber in subscribers:
+            if visible_to is not None and not visible_to(subscriber):
+                continue
+            if _on_loop(subscriber.loop):
+                self._deliver(subscriber, frame)
+            else:
+                subscriber.loop.call_soon_threadsafe(self._deliver, subscriber, frame)
+
+    def publish_complaint(self, event_type: str, complaint: models.Complaint):
+        """Publish a complaint event to the dashboards allowed to see that complaint."""
+        if not self._subscribers:
+            return
+        payload = schemas.ComplaintResponse.model_validate(complaint, from_attributes=True).model_dump(mode="json")
+        self.publish(event_type, payload, visible_to=lambda subscriber: subscriber.can_see(payload))
+
+    def _deliver(self, subscriber: Subscriber, frame: str):
+        if subscriber.evicted:
+            return
+        try:
+            subscriber.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            logger.info("Dropping slow event subscriber (user %s)", subscriber.user_id)
+            subscriber.evicted = True
+            self.unsubscribe(subscriber)
+
+    async def stream(self, subscriber: Subscriber):
+        """Yield server-sent event frames until the client leaves or is evicted."""
+        try:
+            yield "retry: 5000\n\n"
+            while not subscriber.evicted:
+                try:
+                    yield await asyncio.wait_for(subscriber.queue.get(), HEARTBEAT_INTERVAL)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+        finally:
+            self.unsubscribe(subscriber)
+
+
+def _on_loop(loop: asyncio.AbstractEventLoop) -> bool:
+    try:
+        return asyncio.get_running_loop() is loop
+    except RuntimeError:
+        return False
+
+
+# Shared broker used by the routes
+broker = EventBroker()
@@ -0,0 +1,89 @@
+import csv
+import io
+import json
+from datetime import date, datetime
+from typing import Iterator, List, Sequence
+
+from fastapi import HTTPException, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Query
+
+from database import SessionLocal
+
+# Rows fetched per round trip, and rows written per chunk sent to the client
+EXPORT_CHUNK_SIZE = 1000
+
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def check_format(export_format: str):
+    """Reject export formats we cannot produce."""
+    if export_format not in MEDIA_TYPES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Export format must be one of: {', '.join(MEDIA_TYPES)}",
+        )
+
+
+def export_response(queries: Sequence[Query], columns: List[str], export_format: str,
+                    name: str) -> StreamingResponse:
+    """
+    Stream the rows of one or more column queries as a file download.
+    Queries are run one after another with server-side cursors, so memory
+    use stays flat however many rows are exported.
+    """
+    check_format(export_format)
+    filename = f"{name}-{datetime.now():%Y%m%d}.{export_format}"
+    return StreamingResponse(
+        _stream(queries, columns, export_format),
+        media_type=MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+def _stream(queries, columns, export_format) -> Iterator[str]:
+    # The request session may already be closed by the time the body is sent,
+    # so the rows are read through a session owned by the stream itself
+    db = SessionLocal()
+    try:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer) if export_format == "csv" else None
+        if writer is not None:
+            writer.writerow(columns)
+
+        pending = 0
+        for query in queries:
+            rows = query.with_session(db).execution_options(stream_results=True).yield_per(EXPORT_CHUNK_SIZE)
+            for row in rows:
+                values = [_plain(value) for value in row]
+                if writer is not None:
+                    writer.writerow(values)
+                else:
+                    buffer.write(json.dumps(dict(zip(columns, values))))
+                    buffer.write("\n")
+                pending += 1
+                if pending >= EXPORT_CHUNK_SIZE:
+                    yield _drain(buffer)
+                    pending = 0
+
+        tail = _drain(buffer)
+        if tail:
+            yield tail
+    finally:
+        db.close()
+
+
+def _drain(buffer: io.StringIO) -> str:
+    chunk = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    return chunk
+
+
+def _plain(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
@@ -0,0 +1,74 @@
+import threading
+from collections import Counter
+from typing import Optional, Sequence
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+import models
+from occupancy import OccupancyIndex, occupancy_index
+
+
+class HostelLoadTracker:
+    """
+    Resident students per hostel, counted as students register, change
+    hostel or leave, next to the bed counts of the occupancy index. Free
+    capacity is beds minus residents, so students still waiting for a bed
+    count against their hostel. Hostel allocation balances on it without
+    counting users.
+    """
+
+    def __init__(self, index: OccupancyIndex):
+        self._lock = threading.Lock()
+        self._index = index
+        self._residents: Counter = Counter()
+
+    def build(self, db: Session):
+        """Count the students of every hostel."""
+        rows = db.query(models.User.hostel, func.count(models.User.id)).filter(
+            models.User.role == "student",
+            models.User.hostel.isnot(None)
+        ).group_by(models.User.hostel).all()
+        with self._lock:
+            self._residents = Counter(dict(rows))
+
+    def student_joined(self, hostel: Optional[str]):
+        if hostel:
+            with self._lock:
+                self._residents[hostel] += 1
+
+    def student_left(self, hostel: Optional[str]):
+        if hostel:
+            with self._lock:
+                self._residents[hostel] = max(self._residents[hostel] - 1, 0)
+
+    def join_least_loaded(self, hostels: Sequence[str]) -> str:
+        """
+        Count a new student into whichever hostel has the most free capacity,
+        the first listed on a tie, and return it. Choosing and counting happen
+        together, so concurrent registrations spread out.
+        """
+        with self._lock:
+            hostel = max(hostels, key=lambda hostel: (self._free_capacity_locked(hostel), -hostels.index(hostel)))
+            self._residents[hostel] += 1
+            return hostel
+
+    def load(self, hostel: str) -> dict:
+        """Capacity, free beds, resident students and free capacity of a hostel."""
+        capacity, free_beds = self._index.hostel_beds(hostel)
+        with self._lock:
+            residents = self._residents[hostel]
+        return {
+            "capacity": capacity,
+            "free_beds": free_beds,
+            "residents": residents,
+            "free_capacity": capacity - residents,
+        }
+
+    def _free_capacity_locked(self, hostel: str) -> int:
+        capacity, _ = self._index.hostel_beds(hostel)
+        return capacity - self._residents[hostel]
+
+
+# Shared tracker used by registration and capacity planning
+hostel_load = HostelLoadTracker(occupancy_index)
@@ -0,0 +1,195 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from starlette.datastructures import Headers
+
+# POST endpoints that honour the Idempotency-Key header
+IDEMPOTENT_PATHS = {
+    "/api/complaints/",
+    "/api/complaints/voice",
+    "/api/mess/feedback/",
+    "/api/community/comments/",
+}
+
+# How long a completed response is kept for replay
+IDEMPOTENCY_TTL_SECONDS = 24 * 60 * 60
+
+# A request still marked in progress after this long is assumed to have died
+IN_FLIGHT_TIMEOUT_SECONDS = 120
+
+MAX_ENTRIES = 10000
+MAX_KEY_LENGTH = 255
+
+
+class _Entry:
+    __slots__ = ("expires_at", "fingerprint", "status_code", "content_type", "body")
+
+    def __init__(self, expires_at, fingerprint):
+        self.expires_at = expires_at
+        self.fingerprint = fingerprint
+        self.status_code = None
+        self.content_type = None
+        self.body = None
+
+
+class IdempotencyStore:
+    """
+    Remembers the response to each (caller, path, Idempotency-Key) so a retry
+    gets the original answer instead of running the request again. Entries
+    hold a request digest and the raw response bytes, and expire after a TTL
+    or when the store is full, oldest first.
+    """
+
+    def __init__(self, ttl_seconds: int = IDEMPOTENCY_TTL_SECONDS, max_entries: int = MAX_ENTRIES):
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[tuple, _Entry]" = OrderedDict()
+        self._ttl = ttl_seconds
+        self._max_entries = max_entries
+
+    def begin(self, key: tuple, fingerprint: bytes) -> Tuple[str, Optional[_Entry]]:
+        """
+        Claim a key for a new request. Returns ("new", None), ("replay", entry),
+        ("in_progress", None) or ("mismatch", None).
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._evict_locked(now)
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at > now:
+                if entry.fingerprint != fingerprint:
+                    return "mismatch", None
+                if entry.body is not None:
+                    return "replay", entry
+                return "in_progress", None
+            self._entries[key] = _Entry(now + IN_FLIGHT_TIMEOUT_SECONDS, fingerprint)
+            self._entries.move_to_end(key)
+            return "new", None
+
+    def complete(self, key: tuple, status_code: int, content_type: Optional[str], body: bytes):
+        """Store the response for replay."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            entry.status_code = status_code
+            entry.content_type = content_type
+            entry.body = body
+            entry.expires_at = time.monotonic() + self._ttl
+            self._entries.move_to_end(key)
+
+    def abandon(self, key: tuple):
+        """Release a key whose request failed, so the client can retry it."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def _evict_locked(self, now):
+        # Entries are kept in roughly expiry order, so expired ones sit at the front
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            if entry.expires_at > now and len(self._entries) < self._max_entries:
+                break
+            del self._entries[key]
+
+
+class IdempotencyMiddleware:
+    """
+    ASGI middleware applying the store to IDEMPOTENT_PATHS. A retried request
+    with the same key and body is answered from the store without reaching
+    the route, so sentiment analysis, speech recognition and the insert run
+    once. Only successful responses are kept; failures may be retried.
+    """
+
+    def __init__(self, app, store: Optional[IdempotencyStore] = None):
+        self.app = app
+        self.store = store or idempotency_store
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in IDEMPOTENT_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        idempotency_key = headers.get("idempotency-key")
+        if not idempotency_key:
+            await self.app(scope, receive, send)
+            return
+        if len(idempotency_key) > MAX_KEY_LENGTH:
+            await _send_json(send, 400, {"detail": "Idempotency-Key is too long"})
+            return
+
+        body = b""
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            body += message.get("body", b"")
+            if not message.get("more_body", False):
+                break
+
+        # Keys are scoped to the caller, so one user can never replay another's response
+        caller = hashlib.sha256(headers.get("authorization", "").encode()).digest()
+        key = (caller, scope["path"], idempotency_key)
+        fingerprint = hashlib.sha256(scope.get("query_string", b"") + b"\n" + body).digest()
+
+        state, entry = self.store.begin(key, fingerprint)
+        if state == "replay":
+            await _send(send, entry.status_code, entry.content_type, entry.body, replayed=True)
+            return
+        if state == "in_progress":
+            await _send_json(send, 409, {"detail": "A request with this Idempotency-Key is still being processed"})
+            return
+        if state == "mismatch":
+            await _send_json(send, 422, {"detail": "Idempotency-Key was already used for a different request"})
+            return
+
+        body_sent = False
+
+        async def replay_body():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        response = {"status": 500, "content_type": None, "chunks": []}
+
+        async def capture(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                response["content_type"] = Headers(raw=message.get("headers", [])).get("content-type")
+            elif message["type"] == "http.response.body":
+                response["chunks"].append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, replay_body, capture)
+        except Exception:
+            self.store.abandon(key)
+            raise
+
+        if 200 <= response["status"] < 300:
+            self.store.complete(key, response["status"], response["content_type"], b"".join(response["chunks"]))
+        else:
+            self.store.abandon(key)
+
+
+async def _send(send, status_code: int, content_type: Optional[str], body: bytes, replayed: bool = False):
+    headers = [(b"content-length", str(len(body)).encode())]
+    if content_type:
+        headers.append((b"content-type", content_type.encode()))
+    if replayed:
+        headers.append((b"idempotent-replayed", b"true"))
+    await send({"type": "http.response.start", "status": status_code, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _send_json(send, status_code: int, payload: dict):
+    await _send(send, status_code, "application/json", json.dumps(payload).encode())
+
+
+# Shared store used by the middleware
+idempotency_store = IdempotencyStore()
@@ -1,17 +1,44 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
-from database import engine, Base
+from database import SessionLocal, sync_schema
 import models
+import sla
+import complaint_stats
+import mess_stats
+import mess_menu
+import archive
+import background
 from routes import users, assets, complaints, community, rooms, mess
+from suggestion_index import suggestion_index
+from assignment import assignment_engine
+from escalation import escalation_scheduler
+from anomaly import inflow_detector
+from occupancy import occupancy_index, check_allocation_conflicts, check_room_occupancy
+from waitlist import room_matcher
+from hostel_load import hostel_load
+from idempotency import IdempotencyMiddleware
 
-# Create all database tables
-Base.metadata.create_all(bind=engine)
+# Create all database tables and bring older databases up to date
+sync_schema(before_indexes=check_allocation_conflicts)
+
+# Seconds between full recounts that repair any drift in the complaint counters
+STATS_RECONCILE_INTERVAL = 15 * 60
+
+# Seconds between passes that move old resolved complaints to the archive
+ARCHIVE_INTERVAL = 60 * 60
+
+# Seconds between checks for complaints that have missed their SLA deadline
+ESCALATION_CHECK_INTERVAL = 60
 
 app = FastAPI(title="Hostel Management System API",
               description="API for an AI-enhanced hostel management system",
               version="1.0.0")
 
+# Answer retried create requests from the idempotency store. Added before CORS
+# so that replayed responses still pass through the CORS middleware.
+app.add_middleware(IdempotencyMiddleware)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -32,6 +59,41 @@ app.include_router(rooms.router, prefix="/api", tags=["Rooms"])
 app.include_router(mess.router, prefix="/api", tags=["Mess"])
 
 
+@app.on_event("startup")
+def build_indexes():
+    """Load the in-memory indexes from the database."""
+    db = SessionLocal()
+    try:
+        sla.backfill(db)
+        suggestion_index.build(db)
+        assignment_engine.build(db)
+        escalation_scheduler.build(db)
+        inflow_detector.build(db)
+        check_room_occupancy(db)
+        occupancy_index.build(db)
+        room_matcher.build(db)
+        hostel_load.build(db)
+        complaint_stats.reconcile(db)
+        mess_stats.reconcile(db)
+        mess_menu.ensure_version_row(db)
+    finally:
+        db.close()
+
+
+@app.on_event("startup")
+async def start_background_jobs():
+    """Start periodic maintenance jobs."""
+    background.start_periodic("reconcile_complaint_stats", STATS_RECONCILE_INTERVAL, complaint_stats.reconcile)
+    background.start_periodic("archive_resolved_complaints", ARCHIVE_INTERVAL, archive.archive_resolved)
+    background.start_periodic("escalate_overdue_complaints", ESCALATION_CHECK_INTERVAL, escalation_scheduler.run_due)
+
+
+@app.on_event("shutdown")
+async def stop_background_jobs():
+    """Stop periodic maintenance jobs."""
+    await background.stop_all()
+
+
 @app.get("/", tags=["Root"])
 async def read_root():
     """Root endpoint."""
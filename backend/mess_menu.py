@@ -0,0 +1,157 @@
+import json
+import threading
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy.orm import Session
+
+import models
+import schemas
+
+DAYS = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+
+MEALS = ("breakfast", "lunch", "snacks", "dinner")
+
+# Primary key of the single mess_menu_version row
+VERSION_ROW_ID = 1
+
+
+class MenuDocument:
+    """
+    The whole week's menu as one JSON document, tagged with the menu version
+    that every write bumps. A request costs one primary-key read of the
+    version; the document itself is rebuilt only when the version moved, so
+    writes made by other worker processes are seen at once. Clients send the
+    ETag back in If-None-Match and get a 304 while the menu is unchanged.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._document: Optional[Tuple[int, bytes, str]] = None
+
+    def get(self, db: Session) -> Tuple[bytes, str]:
+        """The serialized document and its ETag."""
+        version = current_version(db)
+        with self._lock:
+            if self._document is not None and self._document[0] == version:
+                return self._document[1:]
+
+        body = self._build(db)
+        etag = version_etag(version)
+        with self._lock:
+            self._document = (version, body, etag)
+        return body, etag
+
+    def replace_week(self, db: Session, items: List[schemas.MessMenuCreate], if_match: Optional[str] = None):
+        """
+        Make the menu exactly the given items in one transaction: existing
+        day and meal slots are updated in place, new ones inserted and slots
+        missing from the list deleted. With if_match, the version bump that
+        opens the transaction only succeeds while the menu still has one of
+        those ETags, so of two writers starting from the same ETag the
+        second gets a 412 instead of overwriting the first.
+        """
+        wanted = {}
+        for item in items:
+            key = (item.day_of_week, item.meal_type)
+            if key in wanted:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Menu for {item.day_of_week} {item.meal_type} appears more than once",
+                )
+            wanted[key] = item.description
+
+        if not bump_version(db, _matching_versions(if_match)):
+            db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_412_PRECONDITION_FAILED,
+                detail="Menu has changed since it was read",
+            )
+        for menu_item in db.query(models.MessMenu).all():
+            key = (menu_item.day_of_week, menu_item.meal_type)
+            if key not in wanted:
+                db.delete(menu_item)
+                continue
+            description = wanted.pop(key)
+            if menu_item.description != description:
+                menu_item.description = description
+        for (day_of_week, meal_type), description in wanted.items():
+            db.add(models.MessMenu(day_of_week=day_of_week, meal_type=meal_type, description=description))
+        db.commit()
+
+    def _build(self, db: Session) -> bytes:
+        rows = sorted(db.query(models.MessMenu).all(), key=_slot_order)
+        items = [
+            schemas.MessMenuResponse.model_validate(row, from_attributes=True).model_dump(mode="json")
+            for row in rows
+        ]
+        week = {}
+        for item in items:
+            week.setdefault(item["day_of_week"], {})[item["meal_type"]] = item["description"]
+        return json.dumps({"week": week, "items": items}, separators=(",", ":")).encode()
+
+
+def ensure_version_row(db: Session):
+    """Create the menu version row if it is missing, so conditional writes can match it."""
+    if db.query(models.MessMenuVersion.id).filter(models.MessMenuVersion.id == VERSION_ROW_ID).first() is None:
+        db.add(models.MessMenuVersion(id=VERSION_ROW_ID, version=0))
+        db.commit()
+
+
+def current_version(db: Session) -> int:
+    version = db.query(models.MessMenuVersion.version).filter(models.MessMenuVersion.id == VERSION_ROW_ID).scalar()
+    return version or 0
+
+
+def bump_version(db: Session, expected: Optional[List[int]] = None) -> bool:
+    """
+    Bump the menu version inside the caller's transaction, which also takes
+    the write lock for the rest of it. With expected, only bump from one of
+    those versions; returns False if the menu was at another.
+    """
+    version = models.MessMenuVersion
+    query = db.query(version).filter(version.id == VERSION_ROW_ID)
+    if expected is not None:
+        query = query.filter(version.version.in_(expected))
+    updated = query.update({version.version: version.version + 1}, synchronize_session=False)
+    if not updated and expected is None:
+        db.add(version(id=VERSION_ROW_ID, version=1))
+        db.flush()
+        return True
+    return bool(updated)
+
+
+def version_etag(version: int) -> str:
+    return f'"menu-{version}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header names the given ETag."""
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
+def _matching_versions(if_match: Optional[str]) -> Optional[List[int]]:
+    """Menu versions named by an If-Match header; None when any version will do."""
+    if not if_match:
+        return None
+    versions = []
+    for tag in if_match.split(","):
+        tag = tag.strip()
+        if tag == "*":
+            return None
+        if tag.startswith('"menu-') and tag.endswith('"') and tag[6:-1].isdigit():
+            versions.append(int(tag[6:-1]))
+    return versions
+
+
+def _slot_order(menu_item: models.MessMenu):
+    day = DAYS.index(menu_item.day_of_week) if menu_item.day_of_week in DAYS else len(DAYS)
+    meal = MEALS.index(menu_item.meal_type) if menu_item.meal_type in MEALS else len(MEALS)
+    return day, meal, menu_item.day_of_week or "", menu_item.meal_type or "", menu_item.id
+
+
+# Shared menu document used by the mess routes
+menu_document = MenuDocument()
@@ -0,0 +1,273 @@
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+import models
+
+logger = logging.getLogger(__name__)
+
+RATINGS = range(1, 6)
+
+# Counted columns of a daily rollup row, in addition to its key
+ROLLUP_FIELDS = ("count",) + tuple(f"rating_{rating}" for rating in RATINGS) + ("sentiment_sum", "sentiment_count")
+
+# (day, meal_type) - the key daily rollups are kept by
+RollupKey = Tuple[date, Optional[str]]
+
+# Days in the trailing moving average of the daily series
+MOVING_AVERAGE_DAYS = 7
+
+# Seconds a computed trend report is reused for the same window
+TREND_CACHE_SECONDS = 5 * 60
+TREND_CACHE_SIZE = 64
+
+
+def record_feedback(db: Session, feedback: models.MessFeedback):
+    """
+    Add one new feedback item to its day's rollup. Runs inside the caller's
+    transaction, so the rollup commits with the feedback.
+    """
+    deltas = {"count": 1}
+    if feedback.rating in RATINGS:
+        deltas[f"rating_{feedback.rating}"] = 1
+    if feedback.sentiment_score is not None:
+        deltas["sentiment_sum"] = feedback.sentiment_score
+        deltas["sentiment_count"] = 1
+
+    rollup = models.MessFeedbackDaily
+    counts = _empty()
+    counts.update(deltas)
+    # One upsert, so two workers posting the first feedback of a day both land
+    statement = sqlite_insert(rollup).values(
+        day=(feedback.created_at or datetime.utcnow()).date(),
+        meal_type=feedback.meal_type,
+        **counts,
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=[rollup.day, rollup.meal_type],
+        set_={field: getattr(rollup, field) + getattr(statement.excluded, field) for field in ROLLUP_FIELDS},
+    )
+    db.execute(statement)
+
+
+def summarize(db: Session, meal_type: Optional[str] = None, days: Optional[int] = None) -> dict:
+    """
+    Feedback statistics for the last `days` days (today included), or all
+    time, in one query over the daily rollups. Reads at most one row per day
+    and meal type, however much feedback there is.
+    """
+    rollup = models.MessFeedbackDaily
+    query = db.query(*[func.coalesce(func.sum(getattr(rollup, field)), 0) for field in ROLLUP_FIELDS])
+    if meal_type:
+        query = query.filter(rollup.meal_type == meal_type)
+    if days:
+        query = query.filter(rollup.day >= datetime.utcnow().date() - timedelta(days=days - 1))
+
+    totals = dict(zip(ROLLUP_FIELDS, query.one()))
+    rating_distribution = {rating: totals[f"rating_{rating}"] for rating in RATINGS}
+    rated = sum(rating_distribution.values())
+    return {
+        "average_rating": sum(rating * count for rating, count in rating_distribution.items()) / rated if rated else 0,
+        "total_feedback": totals["count"],
+        "rating_distribution": rating_distribution,
+        "average_sentiment": totals["sentiment_sum"] / totals["sentiment_count"] if totals["sentiment_count"] else 0,
+    }
+
+
+def reconcile(db: Session) -> int:
+    """
+    Rebuild the daily rollups from the feedback table and repair any row
+    that drifted. Returns the number of rollup rows that had to be corrected.
+    """
+    feedback = models.MessFeedback
+    day = func.date(feedback.created_at)
+    actual: Dict[RollupKey, dict] = defaultdict(_empty)
+    for row in db.query(
+        day.label("day"),
+        feedback.meal_type,
+        feedback.rating,
+        func.count(feedback.id).label("count"),
+        func.coalesce(func.sum(feedback.sentiment_score), 0).label("sentiment_sum"),
+        func.count(feedback.sentiment_score).label("sentiment_count"),
+    ).filter(feedback.created_at.isnot(None)).group_by(day, feedback.meal_type, feedback.rating):
+        totals = actual[(date.fromisoformat(str(row.day)), row.meal_type)]
+        totals["count"] += row.count
+        if row.rating in RATINGS:
+            totals[f"rating_{row.rating}"] += row.count
+        totals["sentiment_sum"] += row.sentiment_sum
+        totals["sentiment_count"] += row.sentiment_count
+
+    rollup = models.MessFeedbackDaily
+    corrected = 0
+    for row in db.query(rollup).all():
+        expected = actual.pop((row.day, row.meal_type), None)
+        if expected is None:
+            db.delete(row)
+            corrected += 1
+            continue
+        # Sentiment sums added in a different order may differ by rounding
+        if any(not math.isclose(getattr(row, field) or 0, value, abs_tol=1e-9) for field, value in expected.items()):
+            for field, value in expected.items():
+                setattr(row, field, value)
+            corrected += 1
+    for (day_value, meal_type), totals in actual.items():
+        db.add(rollup(day=day_value, meal_type=meal_type, **totals))
+        corrected += 1
+    db.commit()
+
+    if corrected:
+        logger.warning("Repaired %d drifted mess feedback rollups", corrected)
+    return corrected
+
+
+class FeedbackTrends:
+    """
+    Daily and weekly rating, volume and sentiment series per meal type, read
+    from the daily rollups with one query per window. Each window's report is
+    cached for a few minutes, so dashboards polling a semester stay cheap.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+
+    def report(self, db: Session, since: date, until: date, meal_type: Optional[str] = None) -> dict:
+        """Trend report for feedback created between since and until (inclusive)."""
+        key = (since, until, meal_type)
+        now = time.monotonic()
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None and now - cached[0] < TREND_CACHE_SECONDS:
+                self._cache.move_to_end(key)
+                return cached[1]
+
+        report = self._compute(db, since, until, meal_type)
+        with self._lock:
+            self._cache[key] = (now, report)
+            self._cache.move_to_end(key)
+            if len(self._cache) > TREND_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return report
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def _compute(self, db: Session, since: date, until: date, meal_type: Optional[str]) -> dict:
+        # Weeks run Monday to Sunday; the week before the first one gives its
+        # week-over-week deltas and the start of the first moving average
+        first_week = since - timedelta(days=since.weekday())
+        start = first_week - timedelta(days=7)
+
+        rollup = models.MessFeedbackDaily
+        query = db.query(rollup).filter(rollup.day >= start, rollup.day <= until)
+        if meal_type:
+            query = query.filter(rollup.meal_type == meal_type)
+
+        # meal type ("all" for the total) -> day -> summed rollup fields
+        days: Dict[str, Dict[date, dict]] = defaultdict(lambda: defaultdict(_empty))
+        for row in query.all():
+            for series in ("all", row.meal_type or "unknown"):
+                totals = days[series][row.day]
+                for field in ROLLUP_FIELDS:
+                    totals[field] += getattr(row, field) or 0
+
+        calendar = [start + timedelta(days=offset) for offset in range((until - start).days + 1)]
+        series = {}
+        for name in ["all"] + sorted(name for name in days if name != "all"):
+            by_day = days.get(name, {})
+            series[name] = {
+                "daily": _daily(by_day, calendar, since),
+                "weekly": _weekly(by_day, since, until, first_week),
+            }
+        return {
+            "since": since.isoformat(),
+            "until": until.isoformat(),
+            "meal_type": meal_type or "all",
+            "moving_average_days": MOVING_AVERAGE_DAYS,
+            "series": series,
+        }
+
+
+def _daily(by_day: Dict[date, dict], calendar: List[date], since: date) -> List[dict]:
+    points = []
+    for index, day in enumerate(calendar):
+        if day < since:
+            continue
+        window = _combine(by_day.get(other) for other in calendar[max(index - MOVING_AVERAGE_DAYS + 1, 0):index + 1])
+        point = {"date": day.isoformat()}
+        point.update(_averages(by_day.get(day) or _empty()))
+        point["moving_average_rating"] = _averages(window)["average_rating"]
+        points.append(point)
+    return points
+
+
+def _weekly(by_day: Dict[date, dict], since: date, until: date, first_week: date) -> List[dict]:
+    """
+    One point per Monday-to-Sunday week, counting only the days inside the
+    window, so the first and last weeks may be partial. Changes compare the
+    covered days with the same weekdays of the week before.
+    """
+    points = []
+    week_start = first_week
+    while week_start <= until:
+        first = max(week_start, since)
+        last = min(week_start + timedelta(days=6), until)
+        covered = [first + timedelta(days=offset) for offset in range((last - first).days + 1)]
+        current = _averages(_combine(by_day.get(day) for day in covered))
+        previous = _averages(_combine(by_day.get(day - timedelta(days=7)) for day in covered))
+
+        year, week, _ = week_start.isocalendar()
+        point = {
+            "week": f"{year}-W{week:02d}",
+            "week_start": week_start.isoformat(),
+            "from": first.isoformat(),
+            "to": last.isoformat(),
+            "days": len(covered),
+            "partial": len(covered) < 7,
+        }
+        point.update(current)
+        for field in ("count", "average_rating", "average_sentiment"):
+            change = None
+            if current[field] is not None and previous[field] is not None:
+                change = round(current[field] - previous[field], 4)
+            point[f"{field}_change"] = change
+        points.append(point)
+        week_start += timedelta(days=7)
+    return points
+
+
+def _combine(rows) -> dict:
+    totals = _empty()
+    for row in rows:
+        if row:
+            for field in ROLLUP_FIELDS:
+                totals[field] += row[field]
+    return totals
+
+
+def _averages(totals: dict) -> dict:
+    """Volume, average rating and average sentiment of summed rollup fields (None when nothing was rated)."""
+    rated = sum(totals[f"rating_{rating}"] for rating in RATINGS)
+    rating_sum = sum(rating * totals[f"rating_{rating}"] for rating in RATINGS)
+    return {
+        "count": totals["count"],
+        "average_rating": round(rating_sum / rated, 4) if rated else None,
+        "average_sentiment": round(totals["sentiment_sum"] / totals["sentiment_count"], 4) if totals["sentiment_count"] else None,
+    }
+
+
+def _empty() -> dict:
+    return {field: 0 for field in ROLLUP_FIELDS}
+
+
+# Shared trend cache used by the mess routes
+feedback_trends = FeedbackTrends()
@@ -1,6 +1,6 @@
-from sqlalchemy import Boolean, Column, DateTime, Enum, ForeignKey, Integer, String, Text, Float
+from sqlalchemy import Boolean, Column, Date, DateTime, Enum, ForeignKey, Index, Integer, String, Text, Float, UniqueConstraint
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, text
 from database import Base
 
 class User(Base):
@@ -51,11 +51,15 @@ class Complaint(Base):
     priority = Column(String, default="medium")  # low, medium, high, urgent
     sentiment_score = Column(Float, nullable=True)  # AI-generated sentiment score
     location = Column(String)
+    floor = Column(Integer, nullable=True)
     hostel = Column(String, index=True)  # lohit_girls, lohit_boys, papum_boys, subhanshiri_boys
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     resolved_at = Column(DateTime(timezone=True), nullable=True)
     assigned_to = Column(Integer, ForeignKey("users.id"), nullable=True)
+    priority_rank = Column(Integer, nullable=True)  # 0 = urgent ... 3 = low, see sla.PRIORITY_RANK
+    due_at = Column(DateTime(timezone=True), nullable=True)  # SLA deadline derived from priority
+    assigned_at = Column(DateTime(timezone=True), nullable=True)  # first time someone was assigned
     
     # Foreign keys
     user_id = Column(Integer, ForeignKey("users.id"))
@@ -64,6 +68,57 @@ class Complaint(Base):
     user = relationship("User", back_populates="complaints", foreign_keys=[user_id])
     assignee = relationship("User", back_populates="assigned_complaints", foreign_keys=[assigned_to])
 
+    __table_args__ = (
+        # Work queue: next complaint per category/status by urgency then deadline
+        Index("ix_complaints_queue", "category", "status", "priority_rank", "due_at"),
+        # Archival passes: resolved complaints by resolution time
+        Index("ix_complaints_status_resolved_at", "status", "resolved_at"),
+        # Analytics windows: complaints by creation time
+        Index("ix_complaints_created_at", "created_at"),
+    )
+
+class ArchivedComplaint(Base):
+    """Resolved complaints moved out of the hot complaints table (see archive.py)."""
+    __tablename__ = "complaints_archive"
+
+    id = Column(Integer, primary_key=True, index=True)
+    title = Column(String)
+    description = Column(Text)
+    category = Column(String, index=True)
+    status = Column(String)
+    priority = Column(String)
+    sentiment_score = Column(Float, nullable=True)
+    location = Column(String)
+    floor = Column(Integer, nullable=True)
+    hostel = Column(String, index=True)
+    created_at = Column(DateTime(timezone=True), index=True)
+    updated_at = Column(DateTime(timezone=True), nullable=True)
+    resolved_at = Column(DateTime(timezone=True), nullable=True)
+    assigned_to = Column(Integer, ForeignKey("users.id"), nullable=True)
+    priority_rank = Column(Integer, nullable=True)
+    due_at = Column(DateTime(timezone=True), nullable=True)
+    assigned_at = Column(DateTime(timezone=True), nullable=True)
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
+    archived_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    # Relationships
+    user = relationship("User", foreign_keys=[user_id])
+    assignee = relationship("User", foreign_keys=[assigned_to])
+
+class ComplaintCounter(Base):
+    __tablename__ = "complaint_counters"
+
+    id = Column(Integer, primary_key=True, index=True)
+    hostel = Column(String, nullable=True)
+    category = Column(String, nullable=True)
+    status = Column(String, nullable=True)
+    priority = Column(String, nullable=True)
+    count = Column(Integer, default=0)
+
+    __table_args__ = (
+        UniqueConstraint("hostel", "category", "status", "priority", name="uq_complaint_counters_key"),
+    )
+
 class CommunityPost(Base):
     __tablename__ = "community_posts"
 
@@ -108,12 +163,19 @@ class Room(Base):
     hostel = Column(String, index=True)  # lohit_girls, lohit_boys, papum_boys, subhanshiri_boys
     type = Column(String)  # single, double, triple, dormitory
     capacity = Column(Integer)
+    occupied = Column(Integer, nullable=False, default=0, server_default="0")  # current allocations
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
     # Relationships
     allocations = relationship("RoomAllocation", back_populates="room")
 
+    __table_args__ = (
+        # Rooms with a free bed, looked up by hostel
+        Index("ix_rooms_hostel_with_space", "hostel",
+              sqlite_where=text("occupied < capacity"), postgresql_where=text("occupied < capacity")),
+    )
+
 class RoomAllocation(Base):
     __tablename__ = "room_allocations"
 
@@ -133,6 +195,60 @@ class RoomAllocation(Base):
     user = relationship("User", back_populates="room_allocation")
     room = relationship("Room", back_populates="allocations")
 
+    __table_args__ = (
+        # At most one current allocation per bed, and per student
+        Index("uq_room_allocations_current_bed", "room_id", "bed_number", unique=True,
+              sqlite_where=text("status = 'current'"), postgresql_where=text("status = 'current'")),
+        Index("uq_room_allocations_current_user", "user_id", unique=True,
+              sqlite_where=text("status = 'current'"), postgresql_where=text("status = 'current'")),
+    )
+
+class RoomWaitlistEntry(Base):
+    __tablename__ = "room_waitlist"
+
+    id = Column(Integer, primary_key=True, index=True)
+    hostel = Column(String, index=True)
+    priority = Column(Integer, default=0)  # higher is served first, ties in order of joining
+    status = Column(String, default="waiting")  # waiting, allocated, cancelled
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    allocated_at = Column(DateTime(timezone=True), nullable=True)
+    
+    # Foreign keys
+    user_id = Column(Integer, ForeignKey("users.id"))
+    allocation_id = Column(Integer, ForeignKey("room_allocations.id"), nullable=True)
+    
+    # Relationships
+    user = relationship("User")
+
+    __table_args__ = (
+        # A student waits in at most one queue at a time
+        Index("uq_room_waitlist_waiting_user", "user_id", unique=True,
+              sqlite_where=text("status = 'waiting'"), postgresql_where=text("status = 'waiting'")),
+    )
+
+class RoomSwapRequest(Base):
+    __tablename__ = "room_swap_requests"
+
+    id = Column(Integer, primary_key=True, index=True)
+    status = Column(String, default="pending")  # pending, completed, cancelled
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    completed_at = Column(DateTime(timezone=True), nullable=True)
+    
+    # Foreign keys
+    user_id = Column(Integer, ForeignKey("users.id"))
+    allocation_id = Column(Integer, ForeignKey("room_allocations.id"))  # the bed being given up
+    target_room_id = Column(Integer, ForeignKey("rooms.id"))
+    
+    # Relationships
+    user = relationship("User")
+    target_room = relationship("Room")
+
+    __table_args__ = (
+        # One open request per student
+        Index("uq_room_swap_requests_pending_user", "user_id", unique=True,
+              sqlite_where=text("status = 'pending'"), postgresql_where=text("status = 'pending'")),
+    )
+
 class MessMenu(Base):
     __tablename__ = "mess_menus"
 
@@ -143,6 +259,13 @@ class MessMenu(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
+class MessMenuVersion(Base):
+    __tablename__ = "mess_menu_version"
+
+    # A single row, bumped in the same transaction as every menu write
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
 class MessFeedback(Base):
     __tablename__ = "mess_feedback"
 
@@ -158,3 +281,24 @@ class MessFeedback(Base):
     
     # Relationships
     user = relationship("User", back_populates="mess_feedback")
+
+class MessFeedbackDaily(Base):
+    __tablename__ = "mess_feedback_daily"
+
+    id = Column(Integer, primary_key=True, index=True)
+    day = Column(Date, nullable=False)  # UTC date the feedback was created
+    meal_type = Column(String, nullable=True)
+    count = Column(Integer, default=0)
+    # Rating histogram
+    rating_1 = Column(Integer, default=0)
+    rating_2 = Column(Integer, default=0)
+    rating_3 = Column(Integer, default=0)
+    rating_4 = Column(Integer, default=0)
+    rating_5 = Column(Integer, default=0)
+    # Over the feedback that has a sentiment score
+    sentiment_sum = Column(Float, default=0)
+    sentiment_count = Column(Integer, default=0)
+
+    __table_args__ = (
+        UniqueConstraint("day", "meal_type", name="uq_mess_feedback_daily_key"),
+    )
@@ -0,0 +1,483 @@
+import argparse
+import heapq
+import logging
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import and_, func, select, update
+from sqlalchemy.orm import Session
+
+import models
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on how stale a cached summary gets when another worker changes occupancy
+SUMMARY_MAX_AGE_SECONDS = 5 * 60
+
+
+class _RoomBeds:
+    __slots__ = ("room_id", "hostel", "capacity", "occupied")
+
+    def __init__(self, room_id, hostel, capacity):
+        self.room_id = room_id
+        self.hostel = hostel
+        self.capacity = capacity or 0
+        # Bit n set means bed n + 1 is taken
+        self.occupied = 0
+
+    def free_mask(self) -> int:
+        return ~self.occupied & ((1 << self.capacity) - 1)
+
+    def free_beds(self) -> List[int]:
+        mask = self.free_mask()
+        return [bed + 1 for bed in range(self.capacity) if mask >> bed & 1]
+
+    def first_free_bed(self) -> Optional[int]:
+        mask = self.free_mask()
+        if not mask:
+            return None
+        return (mask & -mask).bit_length()
+
+
+class OccupancyIndex:
+    """
+    Free-bed bitmaps for every room, plus a min-heap per hostel of the rooms
+    that still have space, so the next free bed is found without any query.
+
+    Rooms are filled in id order. A room leaves its hostel's heap lazily: it
+    is dropped when it surfaces full, and pushed again when a bed frees up.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rooms: Dict[int, _RoomBeds] = {}
+        self._free_rooms: Dict[str, List[int]] = {}
+        # (hostel, room_id) pairs currently sitting in a hostel's heap
+        self._queued: Set[Tuple[Optional[str], int]] = set()
+        # Beds and free beds per hostel, kept in step with the bitmaps
+        self._hostel_capacity: Counter = Counter()
+        self._hostel_free: Counter = Counter()
+        # Bumped on every change so derived caches know when to refresh
+        self.version = 0
+
+    def build(self, db: Session):
+        """Load rooms and current allocations from the database."""
+        rooms = db.query(models.Room.id, models.Room.hostel, models.Room.capacity).all()
+        taken = db.query(models.RoomAllocation.room_id, models.RoomAllocation.bed_number).filter(
+            models.RoomAllocation.status == "current"
+        ).all()
+
+        with self._lock:
+            self._rooms = {row.id: _RoomBeds(row.id, row.hostel, row.capacity) for row in rooms}
+            for room_id, bed_number in taken:
+                room = self._rooms.get(room_id)
+                if room is not None and bed_number:
+                    room.occupied |= 1 << (bed_number - 1)
+            self._free_rooms.clear()
+            self._queued.clear()
+            self._hostel_capacity.clear()
+            self._hostel_free.clear()
+            for room in self._rooms.values():
+                self._requeue_locked(room)
+                self._count_locked(room, 1)
+            self.version += 1
+
+    def upsert_room(self, room: models.Room):
+        """Track a new room or pick up a change to its hostel or capacity."""
+        with self._lock:
+            beds = self._rooms.get(room.id)
+            if beds is None:
+                beds = self._rooms[room.id] = _RoomBeds(room.id, room.hostel, room.capacity)
+            else:
+                self._count_locked(beds, -1)
+            # A move to another hostel leaves a stale entry in the old heap
+            beds.hostel = room.hostel
+            beds.capacity = room.capacity or 0
+            self._count_locked(beds, 1)
+            self._requeue_locked(beds)
+            self.version += 1
+
+    def remove_room(self, room_id: int):
+        with self._lock:
+            beds = self._rooms.pop(room_id, None)
+            if beds is not None:
+                self._count_locked(beds, -1)
+            self.version += 1
+
+    def allocation_changed(self, old: Optional[tuple], new: Optional[tuple]):
+        """
+        Apply an allocation change given (room_id, bed_number, status) before
+        and after; pass None for a created or deleted allocation.
+        """
+        with self._lock:
+            if old is not None and old[2] == "current":
+                self._set_locked(old[0], old[1], False)
+            if new is not None and new[2] == "current":
+                self._set_locked(new[0], new[1], True)
+
+    def claim_bed(self, hostel: Optional[str]) -> Tuple[Optional[int], Optional[int]]:
+        """
+        Reserve the first free bed in the lowest-numbered room with space in a
+        hostel. Returns (room_id, bed_number), or (None, None) if the hostel is
+        full. Call release() if the allocation is not saved after all.
+        """
+        with self._lock:
+            heap = self._free_rooms.get(hostel)
+            while heap:
+                room = self._rooms.get(heap[0])
+                bed = None
+                if room is not None and room.hostel == hostel:
+                    bed = room.first_free_bed()
+                if bed is None:
+                    self._queued.discard((hostel, heapq.heappop(heap)))
+                    continue
+                self._set_locked(room.room_id, bed, True)
+                return room.room_id, bed
+        return None, None
+
+    def release(self, room_id: int, bed_number: int):
+        """Free a bed, e.g. one claimed for an allocation that failed to save."""
+        with self._lock:
+            self._set_locked(room_id, bed_number, False)
+
+    def free_beds(self, room_id: int) -> Optional[List[int]]:
+        """Free bed numbers in a room, or None if the room is unknown."""
+        with self._lock:
+            room = self._rooms.get(room_id)
+            return room.free_beds() if room is not None else None
+
+    def free_beds_many(self, room_ids) -> Dict[int, List[int]]:
+        """Free bed numbers for several rooms at once; unknown rooms are left out."""
+        with self._lock:
+            return {
+                room_id: self._rooms[room_id].free_beds()
+                for room_id in room_ids if room_id in self._rooms
+            }
+
+    def hostel_beds(self, hostel: Optional[str]) -> Tuple[int, int]:
+        """(capacity, free beds) of a hostel."""
+        with self._lock:
+            return self._hostel_capacity[hostel], self._hostel_free[hostel]
+
+    def _set_locked(self, room_id, bed_number, taken):
+        room = self._rooms.get(room_id)
+        if room is None or not bed_number or bed_number < 1:
+            return
+        self.version += 1
+        self._count_locked(room, -1)
+        if taken:
+            room.occupied |= 1 << (bed_number - 1)
+        else:
+            room.occupied &= ~(1 << (bed_number - 1))
+            self._requeue_locked(room)
+        self._count_locked(room, 1)
+
+    def _count_locked(self, room, sign):
+        self._hostel_capacity[room.hostel] += sign * room.capacity
+        self._hostel_free[room.hostel] += sign * bin(room.free_mask()).count("1")
+
+    def _requeue_locked(self, room):
+        if (room.hostel, room.room_id) in self._queued or room.first_free_bed() is None:
+            return
+        self._queued.add((room.hostel, room.room_id))
+        heapq.heappush(self._free_rooms.setdefault(room.hostel, []), room.room_id)
+
+
+class OccupancySummary:
+    """
+    Capacity, occupied and free beds per hostel, floor and room type, plus
+    students still waiting for a bed. Computed with a few GROUP BY queries and
+    reused until the occupancy index changes or a student's hostel does.
+    """
+
+    def __init__(self, index: OccupancyIndex):
+        self._lock = threading.Lock()
+        self._index = index
+        self._summary: Optional[dict] = None
+        self._version = None
+        self._computed_at = 0.0
+
+    def get(self, db: Session) -> dict:
+        with self._lock:
+            if (
+                self._summary is not None
+                and self._version == self._index.version
+                and time.monotonic() - self._computed_at < SUMMARY_MAX_AGE_SECONDS
+            ):
+                return self._summary
+
+        version = self._index.version
+        summary = self._compute(db)
+        with self._lock:
+            self._summary = summary
+            self._version = version
+            self._computed_at = time.monotonic()
+        return summary
+
+    def invalidate(self):
+        """Drop the cached summary, e.g. after a student's hostel or role changed."""
+        with self._lock:
+            self._summary = None
+
+    def _compute(self, db: Session) -> dict:
+        Room, RoomAllocation, User = models.Room, models.RoomAllocation, models.User
+        groups = (Room.hostel, Room.floor, Room.type)
+        rooms = db.query(*groups, func.count(Room.id), func.coalesce(func.sum(Room.capacity), 0)) \
+            .group_by(*groups).all()
+        occupied = {
+            (hostel, floor, room_type): count
+            for hostel, floor, room_type, count in db.query(*groups, func.count(RoomAllocation.id))
+            .join(Room, Room.id == RoomAllocation.room_id)
+            .filter(RoomAllocation.status == "current")
+            .group_by(*groups)
+        }
+        students = db.query(User.hostel, func.count(User.id), func.count(RoomAllocation.id)) \
+            .outerjoin(RoomAllocation, and_(
+                RoomAllocation.user_id == User.id, RoomAllocation.status == "current"
+            )) \
+            .filter(User.role == "student") \
+            .group_by(User.hostel).all()
+
+        hostels: Dict[str, dict] = {}
+        for hostel, floor, room_type, room_count, capacity in rooms:
+            beds = {"rooms": room_count, "capacity": capacity, "occupied": occupied.get((hostel, floor, room_type), 0)}
+            entry = hostels.setdefault(hostel or "unknown", _hostel_entry())
+            for totals in (entry, entry["by_floor"].setdefault(floor, _bed_counts()),
+                           entry["by_type"].setdefault(room_type or "unknown", _bed_counts())):
+                for field, value in beds.items():
+                    totals[field] += value
+
+        summary = _bed_counts()
+        summary.update(students=0, unallocated_students=0, students_without_hostel=0)
+        for hostel, student_count, housed in students:
+            summary["students"] += student_count
+            if hostel is None:
+                summary["students_without_hostel"] += student_count
+                continue
+            entry = hostels.setdefault(hostel, _hostel_entry())
+            entry["students"] += student_count
+            entry["unallocated_students"] += student_count - housed
+            summary["unallocated_students"] += student_count - housed
+
+        for entry in hostels.values():
+            for totals in (entry, *entry["by_floor"].values(), *entry["by_type"].values()):
+                totals["free"] = max(totals["capacity"] - totals["occupied"], 0)
+            for field in ("rooms", "capacity", "occupied", "free"):
+                summary[field] += entry[field]
+        summary["hostels"] = dict(sorted(hostels.items()))
+        return summary
+
+
+def _bed_counts() -> dict:
+    return {"rooms": 0, "capacity": 0, "occupied": 0, "free": 0}
+
+
+def _hostel_entry() -> dict:
+    entry = _bed_counts()
+    entry.update(students=0, unallocated_students=0, by_floor={}, by_type={})
+    return entry
+
+
+def record_allocation_change(db: Session, old: Optional[tuple], new: Optional[tuple]):
+    """
+    Keep rooms.occupied in step with an allocation change, inside the caller's
+    transaction. Takes the same (room_id, bed_number, status) tuples as
+    OccupancyIndex.allocation_changed.
+    """
+    deltas = Counter()
+    if old is not None and old[2] == "current":
+        deltas[old[0]] -= 1
+    if new is not None and new[2] == "current":
+        deltas[new[0]] += 1
+    adjust_occupied(db, deltas)
+
+
+def adjust_occupied(db: Session, deltas: Dict[int, int]):
+    """Add {room_id: delta} to the rooms' occupied counters without committing."""
+    for room_id, delta in deltas.items():
+        if delta:
+            db.execute(
+                update(models.Room)
+                .where(models.Room.id == room_id)
+                .values(occupied=models.Room.occupied + delta)
+                .execution_options(synchronize_session=False)
+            )
+
+
+def check_room_occupancy(db: Session, repair: bool = True) -> List[dict]:
+    """
+    Compare every room's occupied counter with a count of its current
+    allocations and return the rooms that disagree, fixing them if repair
+    is set. Also fills the counter on databases created before it existed.
+    """
+    counts = dict(
+        db.query(models.RoomAllocation.room_id, func.count(models.RoomAllocation.id))
+        .filter(models.RoomAllocation.status == "current")
+        .group_by(models.RoomAllocation.room_id)
+        .all()
+    )
+    drifted = [
+        {"room_id": room.id, "number": room.number, "recorded": room.occupied, "actual": counts.get(room.id, 0)}
+        for room in db.query(models.Room.id, models.Room.number, models.Room.occupied)
+        if room.occupied != counts.get(room.id, 0)
+    ]
+    if drifted and repair:
+        for room in drifted:
+            db.execute(
+                update(models.Room)
+                .where(models.Room.id == room["room_id"])
+                .values(occupied=room["actual"])
+                .execution_options(synchronize_session=False)
+            )
+        db.commit()
+        logger.warning("Repaired the occupied count of %d rooms", len(drifted))
+    return drifted
+
+
+def plan_allocation_repairs(connection) -> List[dict]:
+    """
+    Find current allocations that would break the one-student-per-bed and
+    one-bed-per-student unique indexes, and how each would be repaired: a
+    student's newest allocation wins and older ones end; a bed goes to its
+    earliest allocation and later ones move to a free bed in the same room or
+    hostel, or are cancelled if the hostel is full. Nothing is written.
+    """
+    allocations = models.RoomAllocation.__table__
+    rooms = models.Room.__table__
+    current = connection.execute(
+        select(allocations.c.id, allocations.c.user_id, allocations.c.room_id, allocations.c.bed_number)
+        .where(allocations.c.status == "current")
+        .order_by(allocations.c.id)
+    ).all()
+
+    newest = {}
+    for row in current:
+        newest[row.user_id] = row.id
+
+    repairs = []
+    taken = set()
+    clashes = []
+    for row in current:
+        if newest[row.user_id] != row.id:
+            repairs.append(_repair(row, "end"))
+        elif (row.room_id, row.bed_number) in taken:
+            clashes.append(row)
+        else:
+            taken.add((row.room_id, row.bed_number))
+
+    if clashes:
+        room_rows = connection.execute(
+            select(rooms.c.id, rooms.c.hostel, rooms.c.capacity).order_by(rooms.c.id)
+        ).all()
+        hostel_of = {room.id: room.hostel for room in room_rows}
+        for row in clashes:
+            # Prefer another bed in the same room, then anywhere in the same hostel
+            candidates = sorted(
+                (room for room in room_rows if room.hostel == hostel_of.get(row.room_id)),
+                key=lambda room: room.id != row.room_id,
+            )
+            free_bed = next(
+                ((room.id, bed) for room in candidates for bed in range(1, (room.capacity or 0) + 1)
+                 if (room.id, bed) not in taken),
+                None,
+            )
+            if free_bed is None:
+                repairs.append(_repair(row, "cancel"))
+            else:
+                taken.add(free_bed)
+                repairs.append(_repair(row, "move", *free_bed))
+    return repairs
+
+
+def check_allocation_conflicts(connection):
+    """
+    Refuse to go on while current allocations conflict, so the unique
+    indexes are never created over (or instead of) students' beds silently.
+    """
+    repairs = plan_allocation_repairs(connection)
+    if repairs:
+        raise RuntimeError(
+            f"{len(repairs)} current room allocation(s) conflict with the one-student-per-bed and "
+            "one-bed-per-student indexes, which were not created. List the repairs with "
+            "`python occupancy.py --allocations` and apply them with "
+            "`python occupancy.py --allocations --repair` from backend/."
+        )
+
+
+def resolve_allocation_conflicts(connection) -> List[dict]:
+    """Apply the repairs from plan_allocation_repairs and return them."""
+    allocations = models.RoomAllocation.__table__
+    repairs = plan_allocation_repairs(connection)
+    for repair in repairs:
+        values = {
+            "end": {"status": "past", "end_date": datetime.now()},
+            "cancel": {"status": "cancelled", "end_date": datetime.now()},
+            "move": {"room_id": repair["new_room_id"], "bed_number": repair["new_bed_number"]},
+        }[repair["action"]]
+        connection.execute(update(allocations).where(allocations.c.id == repair["allocation_id"]).values(**values))
+    if repairs:
+        logger.warning("Resolved %d conflicting room allocations", len(repairs))
+    return repairs
+
+
+def _repair(row, action: str, new_room_id: Optional[int] = None, new_bed_number: Optional[int] = None) -> dict:
+    return {
+        "allocation_id": row.id,
+        "user_id": row.user_id,
+        "room_id": row.room_id,
+        "bed_number": row.bed_number,
+        "action": action,
+        "new_room_id": new_room_id,
+        "new_bed_number": new_bed_number,
+    }
+
+
+# Shared index and summary used by the user and room routes
+occupancy_index = OccupancyIndex()
+occupancy_summary = OccupancySummary(occupancy_index)
+
+
+if __name__ == "__main__":
+    # python occupancy.py [--repair]: report rooms whose occupied counter has drifted
+    # python occupancy.py --allocations [--repair]: list (or apply) repairs of conflicting allocations
+    from database import SessionLocal, engine, sync_schema
+    from sqlalchemy import inspect
+
+    parser = argparse.ArgumentParser(description="Check rooms.occupied against current allocations")
+    parser.add_argument("--allocations", action="store_true",
+                        help="check current allocations for double-booked beds and students instead")
+    parser.add_argument("--repair", action="store_true", help="fix what disagrees")
+    args = parser.parse_args()
+
+    if args.allocations:
+        if args.repair:
+            applied = []
+            sync_schema(before_indexes=lambda connection: applied.extend(resolve_allocation_conflicts(connection)))
+            repairs = applied
+        elif inspect(engine).has_table(models.RoomAllocation.__tablename__):
+            with engine.connect() as connection:
+                repairs = plan_allocation_repairs(connection)
+        else:
+            repairs = []
+        for repair in repairs:
+            line = (f"Allocation {repair['allocation_id']} (user {repair['user_id']}, "
+                    f"room id {repair['room_id']} bed {repair['bed_number']}): {repair['action']}")
+            if repair["action"] == "move":
+                line += f" to room id {repair['new_room_id']} bed {repair['new_bed_number']}"
+            print(line)
+        print(f"{len(repairs)} conflicting allocation(s)" + (
+            ", repaired" if repairs and args.repair else ", run with --repair to apply" if repairs else ""))
+        raise SystemExit(0)
+
+    sync_schema(before_indexes=check_allocation_conflicts)
+    db = SessionLocal()
+    try:
+        drifted = check_room_occupancy(db, repair=args.repair)
+    finally:
+        db.close()
+    for room in drifted:
+        print(f"Room {room['number']} (id {room['room_id']}): recorded {room['recorded']}, actual {room['actual']}")
+    print(f"{len(drifted)} room(s) out of step" + (", repaired" if drifted and args.repair else ""))
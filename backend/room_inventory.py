@@ -0,0 +1,259 @@
+import codecs
+import csv
+import json
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import func, insert, update
+from sqlalchemy.orm import Session
+
+import models
+
+# Rooms validated and written per round trip
+IMPORT_BATCH_SIZE = 500
+
+# Errors listed in a report; any beyond this are only counted
+MAX_REPORTED_ERRORS = 100
+
+IMPORT_FORMATS = ("csv", "ndjson", "json")
+
+ROOM_FIELDS = ("number", "floor", "building", "hostel", "type", "capacity")
+
+VALID_HOSTELS = ("lohit_girls", "lohit_boys", "papum_boys", "subhanshiri_boys")
+
+
+def check_import_format(import_format: str):
+    if import_format not in IMPORT_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Import format must be one of: {', '.join(IMPORT_FORMATS)}",
+        )
+
+
+async def read_rows(body: AsyncIterator[bytes], import_format: str) -> AsyncIterator[Tuple[int, object]]:
+    """
+    Yield (row number, row) from an uploaded inventory. CSV (with a header
+    row) and NDJSON are parsed line by line as the body arrives, a CSV
+    record spanning lines when a quoted field holds a newline, and numbered
+    by the line it starts on; JSON is either a list of rooms or the seed
+    file's {hostel: [rooms]} layout.
+    """
+    if import_format == "json":
+        raw = b"".join([chunk async for chunk in body])
+        try:
+            data = json.loads(raw.decode("utf-8-sig") or "null")
+        except ValueError:
+            yield 1, "Invalid JSON"
+            return
+        if isinstance(data, dict):
+            rooms = [
+                dict(room, hostel=hostel) if isinstance(room, dict) else room
+                for hostel, hostel_rooms in data.items() for room in hostel_rooms
+            ]
+        elif isinstance(data, list):
+            rooms = data
+        else:
+            yield 1, "Expected a list of rooms or an object of rooms per hostel"
+            return
+        for row_number, room in enumerate(rooms, start=1):
+            yield row_number, room
+        return
+
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    header = None
+    line_number = 0
+
+    async def lines():
+        nonlocal pending
+        async for chunk in body:
+            pending += decoder.decode(chunk)
+            *complete, pending = pending.split("\n")
+            for line in complete:
+                yield line
+        pending += decoder.decode(b"", final=True)
+        if pending:
+            yield pending
+
+    # A CSV record continues onto the next line while a quoted field is open
+    record: List[str] = []
+    record_start = 0
+
+    async for line in lines():
+        line_number += 1
+        line = line.rstrip("\r")
+        if import_format == "ndjson":
+            if not line.strip():
+                continue
+            try:
+                yield line_number, json.loads(line)
+            except ValueError:
+                yield line_number, "Invalid JSON"
+            continue
+
+        if not record:
+            if not line.strip():
+                continue
+            record_start = line_number
+        record.append(line)
+        # Quotes inside a quoted field are doubled, so an odd count means one is still open
+        if sum(part.count('"') for part in record) % 2:
+            continue
+        values = next(csv.reader([part + "\n" for part in record]))
+        record = []
+        if header is None:
+            header = [value.strip() for value in values]
+            continue
+        yield record_start, dict(zip(header, values))
+
+    if record:
+        yield record_start, "Unterminated quoted field"
+
+
+class RoomImport:
+    """
+    Upsert rooms keyed on their number, a batch at a time: each batch costs
+    one lookup of the existing rooms and their highest allocated beds, then
+    one bulk INSERT and one bulk UPDATE. Everything runs in one transaction
+    that is only committed if no row failed, and never in a dry run.
+    """
+
+    def __init__(self, db: Session, dry_run: bool = False):
+        self.db = db
+        self.dry_run = dry_run
+        self.rows = 0
+        self.created = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.error_count = 0
+        self.errors: List[dict] = []
+        self.changes: List[dict] = []
+        # Numbers of new rooms and rooms that gained beds, for the waitlist
+        self.opened: List[str] = []
+        self._seen = set()
+        self._batch: List[Tuple[int, dict]] = []
+
+    def add(self, row_number: int, row):
+        self.rows += 1
+        room, error = _clean(row)
+        if error is None and room["number"] in self._seen:
+            error = "Room number appears more than once in the file"
+        if error is not None:
+            self._error(row_number, row.get("number") if isinstance(row, dict) else None, error)
+            return
+        self._seen.add(room["number"])
+        self._batch.append((row_number, room))
+        if len(self._batch) >= IMPORT_BATCH_SIZE:
+            self._flush()
+
+    def finish(self) -> dict:
+        """Write the last batch, then commit or roll back, and report."""
+        self._flush()
+        applied = not self.dry_run and not self.error_count
+        if applied:
+            self.db.commit()
+        else:
+            self.db.rollback()
+        return {
+            "dry_run": self.dry_run,
+            "applied": applied,
+            "rows": self.rows,
+            "created": self.created,
+            "updated": self.updated,
+            "unchanged": self.unchanged,
+            "error_count": self.error_count,
+            "errors": self.errors,
+            "changes": self.changes,
+        }
+
+    def _flush(self):
+        if not self._batch:
+            return
+        batch, self._batch = self._batch, []
+        numbers = [room["number"] for _, room in batch]
+        existing = {
+            row.number: row for row in self.db.query(
+                models.Room.id, models.Room.number, models.Room.floor, models.Room.building,
+                models.Room.hostel, models.Room.type, models.Room.capacity, models.Room.occupied
+            ).filter(models.Room.number.in_(numbers))
+        }
+        highest_bed = dict(
+            self.db.query(models.RoomAllocation.room_id, func.max(models.RoomAllocation.bed_number))
+            .filter(
+                models.RoomAllocation.room_id.in_([row.id for row in existing.values()]),
+                models.RoomAllocation.status == "current"
+            )
+            .group_by(models.RoomAllocation.room_id)
+            .all()
+        )
+
+        creates, updates = [], []
+        for row_number, room in batch:
+            current = existing.get(room["number"])
+            if current is None:
+                creates.append(room)
+                self.changes.append({"number": room["number"], "action": "create", "room": room})
+                self.opened.append(room["number"])
+                continue
+
+            diff = {
+                field: [getattr(current, field), room[field]]
+                for field in ROOM_FIELDS if getattr(current, field) != room[field]
+            }
+            if not diff:
+                self.unchanged += 1
+                continue
+
+            in_use = highest_bed.get(current.id, 0) or 0
+            if room["capacity"] < in_use:
+                self._error(row_number, room["number"],
+                            f"Capacity {room['capacity']} is below bed {in_use}, which is currently allocated")
+                continue
+            if "hostel" in diff and current.occupied:
+                self._error(row_number, room["number"],
+                            "Room has current allocations and cannot move to another hostel")
+                continue
+
+            updates.append(dict(room, id=current.id))
+            self.changes.append({"number": room["number"], "action": "update", "changes": diff})
+            if room["capacity"] > (current.capacity or 0):
+                self.opened.append(room["number"])
+
+        self.created += len(creates)
+        self.updated += len(updates)
+        if self.dry_run or self.error_count:
+            return
+        if creates:
+            self.db.execute(insert(models.Room), creates)
+        if updates:
+            self.db.execute(update(models.Room), updates)
+
+    def _error(self, row_number: int, number: Optional[str], error: str):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row_number, "number": number, "error": error})
+
+
+def _clean(row) -> Tuple[Optional[dict], Optional[str]]:
+    """Validate one inventory row and convert it to Room column values."""
+    if isinstance(row, str):
+        return None, row
+    if not isinstance(row, dict):
+        return None, "Expected an object with room fields"
+
+    missing = [field for field in ROOM_FIELDS if row.get(field) in (None, "")]
+    if missing:
+        return None, f"Missing {', '.join(missing)}"
+
+    room: Dict[str, object] = {field: str(row[field]).strip() for field in ("number", "building", "hostel", "type")}
+    try:
+        room["floor"] = int(row["floor"])
+        room["capacity"] = int(row["capacity"])
+    except (TypeError, ValueError):
+        return None, "Floor and capacity must be whole numbers"
+
+    if room["hostel"] not in VALID_HOSTELS:
+        return None, f"Invalid hostel name. Must be one of: {', '.join(VALID_HOSTELS)}"
+    if room["capacity"] < 1:
+        return None, "Capacity must be at least 1"
+    return room, None
@@ -1,23 +1,142 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, or_, update
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from datetime import datetime
+from datetime import datetime, timedelta
+from collections import Counter
 
 import models
 import schemas
 import ai_utils
+import sla
+import complaint_stats
+import archive
+import export
 from database import get_db
+from suggestion_index import suggestion_index
+from assignment import assignment_engine, ROLE_FOR_CATEGORY, STAFF_ROLES
+from escalation import escalation_scheduler
+from analytics import resolution_analytics
+from events import broker, role_can_see
+from anomaly import inflow_detector
 from auth import (
     get_current_active_user, 
     get_staff_or_admin_user, 
     get_hmc_user, 
     get_warden_user, 
     get_maintenance_user,
-    get_mess_vendor_user
+    get_mess_vendor_user,
+    get_stream_user
 )
 
 router = APIRouter()
 
+# How many times a queue claim retries after losing a race to another worker
+QUEUE_CLAIM_ATTEMPTS = 3
+
+COMPLAINT_STATUSES = ("pending", "in_progress", "resolved", "rejected")
+
+# Bulk operations: request size cap and ids per IN (...) clause
+MAX_BULK_COMPLAINTS = 5000
+BULK_CHUNK_SIZE = 500
+
+def _ensure_can_view(complaint: models.Complaint, current_user: models.User):
+    """Raise 403 unless the user's role allows viewing this complaint."""
+    if current_user.role == "student" and complaint.user_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You don't have permission to view this complaint",
+        )
+    elif current_user.role.startswith("warden_"):
+        hostel_mapping = {
+            "warden_lohit_girls": "lohit_girls",
+            "warden_lohit_boys": "lohit_boys",
+            "warden_papum_boys": "papum_boys",
+            "warden_subhanshiri_boys": "subhanshiri_boys"
+        }
+        if complaint.hostel != hostel_mapping[current_user.role]:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="You don't have permission to view complaints from other hostels",
+            )
+    elif current_user.role == "plumber" and complaint.category != "plumbing":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You can only view plumbing complaints",
+        )
+    elif current_user.role == "electrician" and complaint.category != "electrical":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You can only view electrical complaints",
+        )
+    elif current_user.role == "mess_vendor" and complaint.category not in ["mess", "food"]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You can only view mess-related complaints",
+        )
+
+def _filter_complaints(query, model, current_user: models.User, status: Optional[str] = None,
+                       category: Optional[str] = None, priority: Optional[str] = None,
+                       hostel: Optional[str] = None):
+    """Apply role scoping and list filters to a query over complaints or archived complaints."""
+    # Filter by user role
+    if current_user.role == "student":
+        # Students can only see their own complaints
+        query = query.filter(model.user_id == current_user.id)
+    elif current_user.role.startswith("warden_"):
+        # Wardens can only see complaints from their hostel
+        hostel_mapping = {
+            "warden_lohit_girls": "lohit_girls",
+            "warden_lohit_boys": "lohit_boys",
+            "warden_papum_boys": "papum_boys",
+            "warden_subhanshiri_boys": "subhanshiri_boys"
+        }
+        query = query.filter(model.hostel == hostel_mapping[current_user.role])
+    elif current_user.role == "plumber":
+        # Plumbers only see plumbing complaints
+        query = query.filter(model.category == "plumbing")
+    elif current_user.role == "electrician":
+        # Electricians only see electrical complaints
+        query = query.filter(model.category == "electrical")
+    elif current_user.role == "mess_vendor":
+        # Mess vendors only see mess-related complaints
+        query = query.filter(model.category.in_(["mess", "food"]))
+    # Admin and HMC can see all complaints
+    
+    # Apply other filters if provided
+    if status:
+        query = query.filter(model.status == status)
+    if category:
+        query = query.filter(model.category == category)
+    if priority:
+        query = query.filter(model.priority == priority)
+    if hostel:
+        query = query.filter(model.hostel == hostel)
+    
+    return query
+
+def _raise_not_found_or_archived(db: Session, complaint_id: int):
+    """Explain why a complaint missing from the hot table cannot be changed."""
+    if archive.find_archived(db, complaint_id) is not None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Archived complaints cannot be modified",
+        )
+    raise HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail="Complaint not found",
+    )
+
+def _publish_change(complaint: models.Complaint, previous_assignee: Optional[int], previous_status: Optional[str]):
+    """Push a complaint change to the open dashboards that can see it."""
+    if complaint.assigned_to != previous_assignee:
+        broker.publish_complaint("complaint.assigned", complaint)
+    elif complaint.status != previous_status:
+        broker.publish_complaint("complaint.status", complaint)
+    else:
+        broker.publish_complaint("complaint.updated", complaint)
+
 @router.post("/complaints/", response_model=schemas.ComplaintResponse, status_code=status.HTTP_201_CREATED)
 async def create_complaint(
     complaint: schemas.ComplaintCreate,
@@ -53,23 +172,8 @@ async def create_complaint(
                 detail="You can only file complaints for your assigned hostel",
             )
     
-    # Auto-assign complaint to relevant maintenance staff based on category
-    assigned_to = None
-    if complaint.category == "plumbing":
-        # Find a plumber
-        plumber = db.query(models.User).filter(models.User.role == "plumber").first()
-        if plumber:
-            assigned_to = plumber.id
-    elif complaint.category == "electrical":
-        # Find an electrician
-        electrician = db.query(models.User).filter(models.User.role == "electrician").first()
-        if electrician:
-            assigned_to = electrician.id
-    elif complaint.category == "mess" or complaint.category == "food":
-        # Find a mess vendor
-        mess_vendor = db.query(models.User).filter(models.User.role == "mess_vendor").first()
-        if mess_vendor:
-            assigned_to = mess_vendor.id
+    # Auto-assign complaint to the least-loaded staff member for this category
+    assigned_to = assignment_engine.pick(complaint.category, complaint.hostel)
     
     # Create new complaint
     db_complaint = models.Complaint(
@@ -77,17 +181,32 @@ async def create_complaint(
         description=complaint.description,
         category=complaint.category,
         location=complaint.location,
+        floor=complaint.floor,
         hostel=complaint.hostel,
         priority=complaint.priority,
         sentiment_score=sentiment_score,
+        status="pending",
         user_id=current_user.id,
-        assigned_to=assigned_to
+        assigned_to=assigned_to,
+        assigned_at=sla.utc_now() if assigned_to is not None else None
     )
+    sla.apply_priority(db_complaint)
     
     db.add(db_complaint)
-    db.commit()
+    try:
+        complaint_stats.record_change(db, None, complaint_stats.stats_key(db_complaint))
+        db.commit()
+    except Exception:
+        db.rollback()
+        # pick() counted the complaint against the assignee; it was never saved
+        assignment_engine.complaint_changed(assigned_to, "pending", None, "pending")
+        raise
     db.refresh(db_complaint)
     
+    escalation_scheduler.schedule(db_complaint)
+    broker.publish_complaint("complaint.created", db_complaint)
+    inflow_detector.record(db_complaint)
+    
     return db_complaint
 
 @router.post("/complaints/voice", response_model=schemas.ComplaintResponse, status_code=status.HTTP_201_CREATED)
@@ -135,23 +254,8 @@ async def create_voice_complaint(
                 detail="You can only file complaints for your assigned hostel",
             )
     
-    # Auto-assign complaint to relevant maintenance staff based on category
-    assigned_to = None
-    if category == "plumbing":
-        # Find a plumber
-        plumber = db.query(models.User).filter(models.User.role == "plumber").first()
-        if plumber:
-            assigned_to = plumber.id
-    elif category == "electrical":
-        # Find an electrician
-        electrician = db.query(models.User).filter(models.User.role == "electrician").first()
-        if electrician:
-            assigned_to = electrician.id
-    elif category == "mess" or category == "food":
-        # Find a mess vendor
-        mess_vendor = db.query(models.User).filter(models.User.role == "mess_vendor").first()
-        if mess_vendor:
-            assigned_to = mess_vendor.id
+    # Auto-assign complaint to the least-loaded staff member for this category
+    assigned_to = assignment_engine.pick(category, hostel)
     
     # Create new complaint
     db_complaint = models.Complaint(
@@ -162,14 +266,28 @@ async def create_voice_complaint(
         hostel=hostel,
         priority=priority,
         sentiment_score=sentiment_score,
+        status="pending",
         user_id=current_user.id,
-        assigned_to=assigned_to
+        assigned_to=assigned_to,
+        assigned_at=sla.utc_now() if assigned_to is not None else None
     )
+    sla.apply_priority(db_complaint)
     
     db.add(db_complaint)
-    db.commit()
+    try:
+        complaint_stats.record_change(db, None, complaint_stats.stats_key(db_complaint))
+        db.commit()
+    except Exception:
+        db.rollback()
+        # pick() counted the complaint against the assignee; it was never saved
+        assignment_engine.complaint_changed(assigned_to, "pending", None, "pending")
+        raise
     db.refresh(db_complaint)
     
+    escalation_scheduler.schedule(db_complaint)
+    broker.publish_complaint("complaint.created", db_complaint)
+    inflow_detector.record(db_complaint)
+    
     return db_complaint
 
 @router.get("/complaints/", response_model=List[schemas.ComplaintResponse])
@@ -183,111 +301,576 @@ async def get_complaints(
     current_user: models.User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    """Get all complaints with optional filtering."""
-    query = db.query(models.Complaint)
+    """
+    Get all complaints with optional filtering. Recent complaints come from
+    the hot table; once it runs out, older pages continue into the archive.
+    """
+    query = _filter_complaints(db.query(models.Complaint), models.Complaint, current_user,
+                               status, category, priority, hostel)
+    complaints = query.order_by(models.Complaint.created_at.desc()).offset(skip).limit(limit).all()
     
-    # Filter by user role
-    if current_user.role == "student":
-        # Students can only see their own complaints
-        query = query.filter(models.Complaint.user_id == current_user.id)
-    elif current_user.role.startswith("warden_"):
-        # Wardens can only see complaints from their hostel
+    # Only resolved complaints are ever archived
+    if len(complaints) < limit and status in (None, "resolved"):
+        hot_total = skip + len(complaints) if complaints else query.count()
+        archived = _filter_complaints(db.query(models.ArchivedComplaint), models.ArchivedComplaint, current_user,
+                                      status, category, priority, hostel)
+        complaints += archived.order_by(
+            models.ArchivedComplaint.created_at.desc()
+        ).offset(max(skip - hot_total, 0)).limit(limit - len(complaints)).all()
+    
+    return complaints
+
+# Columns written by the complaint export, in file order
+EXPORT_COLUMNS = [
+    "id", "title", "description", "category", "status", "priority", "location", "floor",
+    "hostel", "user_id", "assigned_to", "created_at", "updated_at", "resolved_at", "due_at",
+]
+
+@router.get("/complaints/export")
+async def export_complaints(
+    export_format: str = Query("csv", alias="format"),
+    status: Optional[str] = None,
+    category: Optional[str] = None,
+    priority: Optional[str] = None,
+    hostel: Optional[str] = None,
+    current_user: models.User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Stream every matching complaint as CSV or NDJSON, archived ones included,
+    with the same filters and role scoping as the complaint list.
+    """
+    queries = []
+    for model in (models.Complaint, models.ArchivedComplaint):
+        # Only resolved complaints are ever archived
+        if model is models.ArchivedComplaint and status not in (None, "resolved"):
+            continue
+        query = db.query(*[getattr(model, column) for column in EXPORT_COLUMNS])
+        query = _filter_complaints(query, model, current_user, status, category, priority, hostel)
+        queries.append(query.order_by(model.created_at.desc()))
+    
+    return export.export_response(queries, EXPORT_COLUMNS, export_format, "complaints")
+
+@router.get("/complaints/events")
+async def stream_complaint_events(current_user: models.User = Depends(get_stream_user)):
+    """
+    Server-sent event stream of complaint create, assign and status changes,
+    filtered by the same per-role rules as the complaint list.
+    """
+    subscriber = broker.subscribe(current_user)
+    return StreamingResponse(
+        broker.stream(subscriber),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.get("/complaints/stats")
+async def get_complaint_stats(
+    hostel: Optional[str] = None,
+    current_user: models.User = Depends(get_staff_or_admin_user),
+    db: Session = Depends(get_db)
+):
+    """Get complaint counts by hostel, category, status and priority (staff only)."""
+    hostels = [hostel] if hostel else None
+    categories = None
+    
+    # Scope the counters the same way get_complaints scopes the list
+    if current_user.role.startswith("warden_"):
         hostel_mapping = {
             "warden_lohit_girls": "lohit_girls",
             "warden_lohit_boys": "lohit_boys",
             "warden_papum_boys": "papum_boys",
             "warden_subhanshiri_boys": "subhanshiri_boys"
         }
-        query = query.filter(models.Complaint.hostel == hostel_mapping[current_user.role])
-    elif current_user.role == "plumber":
-        # Plumbers only see plumbing complaints
-        query = query.filter(models.Complaint.category == "plumbing")
-    elif current_user.role == "electrician":
-        # Electricians only see electrical complaints
-        query = query.filter(models.Complaint.category == "electrical")
-    elif current_user.role == "mess_vendor":
-        # Mess vendors only see mess-related complaints
-        query = query.filter(models.Complaint.category.in_(["mess", "food"]))
-    # Admin and HMC can see all complaints
+        hostels = [hostel_mapping[current_user.role]]
+    elif current_user.role in STAFF_ROLES:
+        categories = [category for category, role in ROLE_FOR_CATEGORY.items() if role == current_user.role]
     
-    # Apply other filters if provided
-    if status:
-        query = query.filter(models.Complaint.status == status)
-    if category:
-        query = query.filter(models.Complaint.category == category)
-    if priority:
-        query = query.filter(models.Complaint.priority == priority)
+    return complaint_stats.summarize(db, hostels=hostels, categories=categories)
+
+@router.post("/complaints/stats/reconcile")
+async def reconcile_complaint_stats(
+    current_user: models.User = Depends(get_hmc_user),
+    db: Session = Depends(get_db)
+):
+    """Recount complaints and repair drifted counters (HMC or Admin only)."""
+    corrected = complaint_stats.reconcile(db)
+    return {"corrected": corrected}
+
+@router.get("/complaints/incidents")
+async def get_complaint_incidents(
+    current_user: models.User = Depends(get_staff_or_admin_user)
+):
+    """
+    Active incidents: hostels where complaints in one category are arriving
+    far faster than usual. Scoped like the complaint list.
+    """
+    return [
+        incident for incident in inflow_detector.incidents()
+        if role_can_see(current_user.role, current_user.id, {
+            "hostel": incident["hostel"], "category": incident["category"], "user_id": None
+        })
+    ]
+
+@router.get("/complaints/analytics/resolution")
+async def get_resolution_analytics(
+    days: int = Query(90, ge=1, le=3650),
+    hostel: Optional[str] = None,
+    current_user: models.User = Depends(get_hmc_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Time-to-assign and time-to-resolve percentiles (p50/p90/p99, in hours) by
+    hostel, category, assignee and week, for complaints filed in the last
+    `days` days (HMC or Admin only).
+    """
+    until = sla.utc_now().date()
+    since = until - timedelta(days=days - 1)
+    return resolution_analytics.report(db, since, until, hostel)
+
+def _queue_categories(current_user: models.User) -> List[str]:
+    """Complaint categories that make up the caller's work queue."""
+    categories = [category for category, role in ROLE_FOR_CATEGORY.items() if role == current_user.role]
+    if not categories:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only maintenance staff and mess vendors have a work queue",
+        )
+    return categories
+
+def _queue_query(db: Session, current_user: models.User, hostel: Optional[str] = None, floor: Optional[int] = None):
+    """Pending complaints the caller may take, most urgent first."""
+    query = db.query(models.Complaint).filter(
+        models.Complaint.category.in_(_queue_categories(current_user)),
+        models.Complaint.status == "pending",
+        or_(
+            models.Complaint.assigned_to.is_(None),
+            models.Complaint.assigned_to == current_user.id
+        )
+    )
     if hostel:
         query = query.filter(models.Complaint.hostel == hostel)
+    if floor is not None:
+        query = query.filter(models.Complaint.floor == floor)
     
-    complaints = query.order_by(models.Complaint.created_at.desc()).offset(skip).limit(limit).all()
-    return complaints
+    return query.order_by(
+        models.Complaint.priority_rank,
+        models.Complaint.due_at,
+        models.Complaint.id
+    )
 
-@router.get("/complaints/{complaint_id}", response_model=schemas.ComplaintResponse)
-async def get_complaint(
-    complaint_id: int,
-    current_user: models.User = Depends(get_current_active_user),
+def _claim(db: Session, current_user: models.User, candidates: List[models.Complaint]) -> List[models.Complaint]:
+    """
+    Claim candidate complaints for the caller with one conditional UPDATE.
+    Rows another worker claimed first no longer match and are skipped.
+    """
+    if not candidates:
+        return []
+    
+    ids = [complaint.id for complaint in candidates]
+    unassigned = {complaint.id for complaint in candidates if complaint.assigned_to is None}
+    
+    db.query(models.Complaint).filter(
+        models.Complaint.id.in_(ids),
+        models.Complaint.status == "pending",
+        or_(
+            models.Complaint.assigned_to.is_(None),
+            models.Complaint.assigned_to == current_user.id
+        )
+    ).update(
+        {
+            models.Complaint.assigned_to: current_user.id,
+            models.Complaint.status: "in_progress",
+            models.Complaint.assigned_at: func.coalesce(models.Complaint.assigned_at, sla.utc_now()),
+        },
+        synchronize_session=False
+    )
+    db.expire_all()
+    
+    claimed = db.query(models.Complaint).filter(
+        models.Complaint.id.in_(ids),
+        models.Complaint.assigned_to == current_user.id,
+        models.Complaint.status == "in_progress"
+    ).order_by(
+        models.Complaint.priority_rank,
+        models.Complaint.due_at,
+        models.Complaint.id
+    ).all()
+    
+    # Candidates were all pending, so every claimed row moved pending -> in_progress
+    deltas = Counter()
+    for complaint in claimed:
+        key = complaint_stats.stats_key(complaint)
+        deltas[(key[0], key[1], "pending", key[3])] -= 1
+        deltas[key] += 1
+    complaint_stats.apply_deltas(db, deltas)
+    db.commit()
+    
+    for complaint in claimed:
+        if complaint.id in unassigned:
+            assignment_engine.complaint_changed(None, "pending", current_user.id, "in_progress")
+        broker.publish_complaint("complaint.assigned", complaint)
+    
+    return claimed
+
+@router.get("/complaints/queue", response_model=List[schemas.ComplaintResponse])
+async def get_work_queue(
+    limit: int = Query(20, ge=1, le=100),
+    hostel: Optional[str] = None,
+    floor: Optional[int] = None,
+    current_user: models.User = Depends(get_staff_or_admin_user),
     db: Session = Depends(get_db)
 ):
-    """Get complaint by ID."""
-    complaint = db.query(models.Complaint).filter(models.Complaint.id == complaint_id).first()
+    """Preview the caller's work queue without claiming anything."""
+    return _queue_query(db, current_user, hostel, floor).limit(limit).all()
+
+@router.get("/complaints/queue/next", response_model=schemas.ComplaintResponse)
+async def get_next_queued_complaint(
+    hostel: Optional[str] = None,
+    floor: Optional[int] = None,
+    current_user: models.User = Depends(get_staff_or_admin_user),
+    db: Session = Depends(get_db)
+):
+    """Get the next complaint in the caller's work queue without claiming it."""
+    complaint = _queue_query(db, current_user, hostel, floor).first()
     if complaint is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail="Complaint not found",
+            detail="No complaints waiting in your queue",
         )
+    return complaint
+
+@router.post("/complaints/queue/next", response_model=schemas.ComplaintResponse)
+async def claim_next_queued_complaint(
+    hostel: Optional[str] = None,
+    floor: Optional[int] = None,
+    current_user: models.User = Depends(get_staff_or_admin_user),
+    db: Session = Depends(get_db)
+):
+    """Atomically claim the next complaint in the caller's work queue."""
+    # Retry a few times in case another worker claims the same row first
+    for _ in range(QUEUE_CLAIM_ATTEMPTS):
+        candidate = _queue_query(db, current_user, hostel, floor).first()
+        if candidate is None:
+            break
+        claimed = _claim(db, current_user, [candidate])
+        if claimed:
+            return claimed[0]
     
-    # Check if user has permission to view this complaint
-    if current_user.role == "student" and complaint.user_id != current_user.id:
+    raise HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail="No complaints waiting in your queue",
+    )
+
+@router.post("/complaints/queue/batch", response_model=List[schemas.ComplaintResponse])
+async def claim_queued_complaints_batch(
+    batch: schemas.QueueBatchClaim,
+    current_user: models.User = Depends(get_staff_or_admin_user),
+    db: Session = Depends(get_db)
+):
+    """Atomically claim several queued complaints on one hostel floor."""
+    claimed = []
+    for _ in range(QUEUE_CLAIM_ATTEMPTS):
+        remaining = batch.limit - len(claimed)
+        if remaining <= 0:
+            break
+        candidates = _queue_query(db, current_user, batch.hostel, batch.floor).limit(remaining).all()
+        if not candidates:
+            break
+        claimed.extend(_claim(db, current_user, candidates))
+    
+    return claimed
+
+def _chunks(ids: List[int], size: int = BULK_CHUNK_SIZE):
+    """Split ids into chunks that stay under the database's bound-parameter limit."""
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+def _bulk_targets(db: Session, request: schemas.ComplaintBulkBase):
+    """
+    Resolve the complaints a bulk request refers to.
+    Returns the current rows keyed by id and failure results for unknown ids.
+    """
+    if (request.ids is None) == (request.filter is None):
         raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You don't have permission to view this complaint",
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Provide either a list of ids or a filter",
         )
-    elif current_user.role.startswith("warden_"):
-        hostel_mapping = {
-            "warden_lohit_girls": "lohit_girls",
-            "warden_lohit_boys": "lohit_boys",
-            "warden_papum_boys": "papum_boys",
-            "warden_subhanshiri_boys": "subhanshiri_boys"
-        }
-        if complaint.hostel != hostel_mapping[current_user.role]:
+    
+    columns = (
+        models.Complaint.id,
+        models.Complaint.hostel,
+        models.Complaint.category,
+        models.Complaint.status,
+        models.Complaint.priority,
+        models.Complaint.assigned_to,
+        models.Complaint.created_at,
+    )
+    rows = {}
+    missing = []
+    
+    if request.ids is not None:
+        ids = list(dict.fromkeys(request.ids))
+        if len(ids) > MAX_BULK_COMPLAINTS:
             raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="You don't have permission to view complaints from other hostels",
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"At most {MAX_BULK_COMPLAINTS} complaints can be changed at once",
             )
-    elif current_user.role == "plumber" and complaint.category != "plumbing":
+        for chunk in _chunks(ids):
+            for row in db.query(*columns).filter(models.Complaint.id.in_(chunk)):
+                rows[row.id] = row
+        missing = [
+            schemas.ComplaintBulkResult(id=complaint_id, success=False, detail="Complaint not found")
+            for complaint_id in ids if complaint_id not in rows
+        ]
+    else:
+        criteria = request.filter
+        query = db.query(*columns)
+        if criteria.status:
+            query = query.filter(models.Complaint.status == criteria.status)
+        if criteria.category:
+            query = query.filter(models.Complaint.category == criteria.category)
+        if criteria.priority:
+            query = query.filter(models.Complaint.priority == criteria.priority)
+        if criteria.hostel:
+            query = query.filter(models.Complaint.hostel == criteria.hostel)
+        if criteria.assigned_to is not None:
+            query = query.filter(models.Complaint.assigned_to == criteria.assigned_to)
+        if criteria.created_after:
+            query = query.filter(models.Complaint.created_at >= criteria.created_after)
+        if criteria.created_before:
+            query = query.filter(models.Complaint.created_at < criteria.created_before)
+        
+        matched = query.order_by(models.Complaint.id).limit(MAX_BULK_COMPLAINTS + 1).all()
+        if len(matched) > MAX_BULK_COMPLAINTS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Filter matches more than {MAX_BULK_COMPLAINTS} complaints",
+            )
+        rows = {row.id: row for row in matched}
+    
+    return rows, missing
+
+def _bulk_apply(db: Session, before: dict, ids: List[int], values: dict, per_row: Optional[List[dict]] = None):
+    """
+    Apply one set-based UPDATE per chunk of ids (plus optional per-row values
+    keyed by id) and commit everything in a single transaction.
+    """
+    if ids:
+        for chunk in _chunks(ids):
+            db.query(models.Complaint).filter(
+                models.Complaint.id.in_(chunk)
+            ).update(values, synchronize_session=False)
+        if per_row:
+            db.execute(update(models.Complaint), per_row)
+        
+        # Move every changed complaint between the dashboard counters
+        overrides = {column.key: value for column, value in values.items()}
+        deltas = Counter()
+        for complaint_id in ids:
+            old = before[complaint_id]
+            key = complaint_stats.stats_key(old)
+            deltas[key] -= 1
+            deltas[(
+                key[0],
+                key[1],
+                overrides.get("status", key[2]),
+                overrides.get("priority", key[3]),
+            )] += 1
+        complaint_stats.apply_deltas(db, deltas)
+    db.commit()
+    
+    # Bring the in-memory indexes up to date with the committed rows
+    for chunk in _chunks(ids):
+        changed = db.query(models.Complaint).filter(models.Complaint.id.in_(chunk)).all()
+        for complaint in changed:
+            old = before[complaint.id]
+            assignment_engine.complaint_changed(
+                old.assigned_to, old.status, complaint.assigned_to, complaint.status
+            )
+            if old.status == "resolved" or complaint.status == "resolved":
+                suggestion_index.add(complaint)
+            escalation_scheduler.schedule(complaint)
+            _publish_change(complaint, old.assigned_to, old.status)
+
+def _bulk_response(ok_ids: List[int], failures: List[schemas.ComplaintBulkResult]) -> schemas.ComplaintBulkResponse:
+    """Build the per-id bulk operation report."""
+    results = [schemas.ComplaintBulkResult(id=complaint_id, success=True) for complaint_id in ok_ids]
+    results.extend(failures)
+    results.sort(key=lambda result: result.id)
+    return schemas.ComplaintBulkResponse(updated=len(ok_ids), failed=len(failures), results=results)
+
+@router.post("/complaints/bulk/status", response_model=schemas.ComplaintBulkResponse)
+async def bulk_update_status(
+    request: schemas.ComplaintBulkStatus,
+    current_user: models.User = Depends(get_hmc_user),
+    db: Session = Depends(get_db)
+):
+    """Change the status of many complaints in one transaction (HMC or Admin only)."""
+    if request.status not in COMPLAINT_STATUSES:
         raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You can only view plumbing complaints",
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid status. Must be one of: {', '.join(COMPLAINT_STATUSES)}",
         )
-    elif current_user.role == "electrician" and complaint.category != "electrical":
+    
+    before, failures = _bulk_targets(db, request)
+    ids = sorted(before)
+    values = {models.Complaint.status: request.status}
+    if request.status == "resolved":
+        values[models.Complaint.resolved_at] = sla.utc_now()
+    
+    _bulk_apply(db, before, ids, values)
+    return _bulk_response(ids, failures)
+
+@router.post("/complaints/bulk/assign", response_model=schemas.ComplaintBulkResponse)
+async def bulk_assign(
+    request: schemas.ComplaintBulkAssign,
+    current_user: models.User = Depends(get_hmc_user),
+    db: Session = Depends(get_db)
+):
+    """Reassign many complaints to one staff member in one transaction (HMC or Admin only)."""
+    assignee = db.query(models.User).filter(models.User.id == request.assigned_to).first()
+    if assignee is None:
         raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You can only view electrical complaints",
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Assignee not found",
         )
-    elif current_user.role == "mess_vendor" and complaint.category not in ["mess", "food"]:
+    
+    before, failures = _bulk_targets(db, request)
+    
+    # Validate the assignee's role against every complaint category at once
+    ids = []
+    for complaint_id, row in sorted(before.items()):
+        required_role = ROLE_FOR_CATEGORY.get(row.category)
+        if row.status in ("resolved", "rejected"):
+            failures.append(schemas.ComplaintBulkResult(
+                id=complaint_id, success=False, detail="Closed complaints cannot be reassigned"
+            ))
+        elif required_role is not None and assignee.role != required_role:
+            failures.append(schemas.ComplaintBulkResult(
+                id=complaint_id, success=False,
+                detail=f"{row.category.capitalize()} complaints need an assignee with the {required_role} role"
+            ))
+        else:
+            ids.append(complaint_id)
+    
+    _bulk_apply(db, before, ids, {
+        models.Complaint.assigned_to: assignee.id,
+        models.Complaint.status: "in_progress",
+        models.Complaint.assigned_at: func.coalesce(models.Complaint.assigned_at, sla.utc_now()),
+    })
+    return _bulk_response(ids, failures)
+
+@router.post("/complaints/bulk/priority", response_model=schemas.ComplaintBulkResponse)
+async def bulk_update_priority(
+    request: schemas.ComplaintBulkPriority,
+    current_user: models.User = Depends(get_hmc_user),
+    db: Session = Depends(get_db)
+):
+    """Override the priority of many complaints in one transaction (HMC or Admin only)."""
+    if request.priority not in sla.PRIORITY_RANK:
         raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You can only view mess-related complaints",
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid priority. Must be one of: {', '.join(sla.PRIORITY_RANK)}",
+        )
+    
+    before, failures = _bulk_targets(db, request)
+    ids = sorted(before)
+    
+    # The SLA deadline depends on each complaint's creation time
+    deadlines = [
+        {"id": complaint_id, "due_at": sla.due_at(request.priority, before[complaint_id].created_at)}
+        for complaint_id in ids
+    ]
+    _bulk_apply(db, before, ids, {
+        models.Complaint.priority: request.priority,
+        models.Complaint.priority_rank: sla.priority_rank(request.priority),
+    }, deadlines)
+    return _bulk_response(ids, failures)
+
+@router.post("/complaints/bulk/close", response_model=schemas.ComplaintBulkResponse)
+async def bulk_close(
+    request: schemas.ComplaintBulkClose,
+    current_user: models.User = Depends(get_hmc_user),
+    db: Session = Depends(get_db)
+):
+    """Resolve or reject many open complaints in one transaction (HMC or Admin only)."""
+    if request.status not in ("resolved", "rejected"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Closing status must be either resolved or rejected",
+        )
+    
+    before, failures = _bulk_targets(db, request)
+    ids = []
+    for complaint_id, row in sorted(before.items()):
+        if row.status in ("resolved", "rejected"):
+            failures.append(schemas.ComplaintBulkResult(
+                id=complaint_id, success=False, detail="Complaint is already closed"
+            ))
+        else:
+            ids.append(complaint_id)
+    
+    values = {models.Complaint.status: request.status}
+    if request.status == "resolved":
+        values[models.Complaint.resolved_at] = sla.utc_now()
+    
+    _bulk_apply(db, before, ids, values)
+    return _bulk_response(ids, failures)
+
+@router.get("/complaints/{complaint_id}", response_model=schemas.ComplaintResponse)
+async def get_complaint(
+    complaint_id: int,
+    current_user: models.User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Get complaint by ID, including archived complaints."""
+    complaint = db.query(models.Complaint).filter(models.Complaint.id == complaint_id).first()
+    if complaint is None:
+        complaint = archive.find_archived(db, complaint_id)
+    if complaint is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Complaint not found",
         )
     
+    # Check if user has permission to view this complaint
+    _ensure_can_view(complaint, current_user)
+    
     return complaint
 
-@router.put("/complaints/{complaint_id}", response_model=schemas.ComplaintResponse)
-async def update_complaint(
+@router.get("/complaints/{complaint_id}/suggestions", response_model=List[str])
+async def get_complaint_suggestions(
     complaint_id: int,
-    complaint_update: schemas.ComplaintUpdate,
     current_user: models.User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    """Update complaint by ID."""
+    """Get resolution suggestions drawn from similar resolved complaints."""
     complaint = db.query(models.Complaint).filter(models.Complaint.id == complaint_id).first()
+    if complaint is None:
+        complaint = archive.find_archived(db, complaint_id)
     if complaint is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Complaint not found",
         )
     
+    _ensure_can_view(complaint, current_user)
+    
+    return suggestion_index.suggest(complaint)
+
+@router.put("/complaints/{complaint_id}", response_model=schemas.ComplaintResponse)
+async def update_complaint(
+    complaint_id: int,
+    complaint_update: schemas.ComplaintUpdate,
+    current_user: models.User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Update complaint by ID."""
+    complaint = db.query(models.Complaint).filter(models.Complaint.id == complaint_id).first()
+    if complaint is None:
+        _raise_not_found_or_archived(db, complaint_id)
+    
     # Check if user has permission to update this complaint
     if current_user.role == "student":
         if complaint.user_id != current_user.id:
@@ -336,6 +919,10 @@ async def update_complaint(
             detail="You can only update mess-related complaints",
         )
     
+    was_resolved = complaint.status == "resolved"
+    previous_assignee, previous_status = complaint.assigned_to, complaint.status
+    previous_key = complaint_stats.stats_key(complaint)
+    
     # Update fields if provided
     if complaint_update.title is not None:
         complaint.title = complaint_update.title
@@ -352,17 +939,21 @@ async def update_complaint(
     if complaint_update.location is not None:
         complaint.location = complaint_update.location
     
+    if complaint_update.floor is not None:
+        complaint.floor = complaint_update.floor
+    
     if complaint_update.hostel is not None and current_user.role != "student":
         complaint.hostel = complaint_update.hostel
     
     if complaint_update.priority is not None and current_user.role != "student":
         complaint.priority = complaint_update.priority
+        sla.apply_priority(complaint)
     
     if complaint_update.status is not None and current_user.role != "student":
         # Update status and set resolved_at if resolved
         complaint.status = complaint_update.status
         if complaint_update.status == "resolved":
-            complaint.resolved_at = datetime.now()
+            complaint.resolved_at = sla.utc_now()
     
     if complaint_update.assigned_to is not None:
         # Only HMC and admin can assign complaints
@@ -372,10 +963,25 @@ async def update_complaint(
                 detail="Only HMC and admin can assign complaints",
             )
         complaint.assigned_to = complaint_update.assigned_to
+        if complaint.assigned_at is None:
+            complaint.assigned_at = sla.utc_now()
     
+    complaint_stats.record_change(db, previous_key, complaint_stats.stats_key(complaint))
     db.commit()
     db.refresh(complaint)
     
+    assignment_engine.complaint_changed(
+        previous_assignee, previous_status, complaint.assigned_to, complaint.status
+    )
+    
+    # Keep the suggestion index in step with resolutions and reopenings
+    if was_resolved or complaint.status == "resolved":
+        suggestion_index.add(complaint)
+    
+    # Priority changes move the SLA deadline; resolving stops the clock
+    escalation_scheduler.schedule(complaint)
+    _publish_change(complaint, previous_assignee, previous_status)
+    
     return complaint
 
 @router.post("/complaints/{complaint_id}/assign", response_model=schemas.ComplaintResponse)
@@ -388,10 +994,7 @@ async def assign_complaint(
     """Assign a complaint to a staff member (HMC or Admin only)."""
     complaint = db.query(models.Complaint).filter(models.Complaint.id == complaint_id).first()
     if complaint is None:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Complaint not found",
-        )
+        _raise_not_found_or_archived(db, complaint_id)
     
     # Verify the assignee exists
     assignee = db.query(models.User).filter(models.User.id == assignment.assigned_to).first()
@@ -418,10 +1021,21 @@ async def assign_complaint(
             detail="Mess complaints should be assigned to a mess vendor",
         )
     
+    previous_assignee, previous_status = complaint.assigned_to, complaint.status
+    previous_key = complaint_stats.stats_key(complaint)
     complaint.assigned_to = assignment.assigned_to
+    if complaint.assigned_at is None:
+        complaint.assigned_at = sla.utc_now()
     complaint.status = "in_progress"  # Update status to in_progress when assigned
     
+    complaint_stats.record_change(db, previous_key, complaint_stats.stats_key(complaint))
     db.commit()
     db.refresh(complaint)
     
+    assignment_engine.complaint_changed(
+        previous_assignee, previous_status, complaint.assigned_to, complaint.status
+    )
+    escalation_scheduler.schedule(complaint)
+    _publish_change(complaint, previous_assignee, previous_status)
+    
     return complaint
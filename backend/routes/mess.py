@@ -1,11 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Header, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from datetime import datetime
+from datetime import datetime, timedelta
 
 import models
 import schemas
 import ai_utils
+import export
+import mess_stats
+from mess_stats import feedback_trends
+from mess_menu import menu_document, bump_version, etag_matches
 from database import get_db
 from auth import get_current_active_user, get_staff_or_admin_user
 
@@ -38,6 +42,7 @@ async def create_mess_menu(
     )
     
     db.add(db_menu)
+    bump_version(db)
     db.commit()
     db.refresh(db_menu)
     
@@ -65,6 +70,37 @@ async def get_mess_menu(
     menu_items = query.offset(skip).limit(limit).all()
     return menu_items
 
+@router.get("/mess/menu/week")
+async def get_mess_menu_week(
+    if_none_match: Optional[str] = Header(None),
+    current_user: models.User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    The whole week's menu as one document, with an ETag. Send it back in
+    If-None-Match to get a 304 while the menu is unchanged.
+    """
+    body, etag = menu_document.get(db)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+@router.put("/mess/menu/week")
+async def replace_mess_menu_week(
+    week: schemas.MessMenuWeek,
+    if_match: Optional[str] = Header(None),
+    current_user: models.User = Depends(get_staff_or_admin_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Replace the whole week's menu in one transaction (staff or admin only).
+    With If-Match, the write only happens if the menu still has that ETag.
+    """
+    menu_document.replace_week(db, week.items, if_match=if_match)
+    body, etag = menu_document.get(db)
+    return Response(content=body, media_type="application/json", headers={"ETag": etag, "Cache-Control": "no-cache"})
+
 @router.get("/mess/menu/{menu_id}", response_model=schemas.MessMenuResponse)
 async def get_mess_menu_item(
     menu_id: int,
@@ -120,6 +156,7 @@ async def update_mess_menu_item(
     if menu_update.description is not None:
         menu_item.description = menu_update.description
     
+    bump_version(db)
     db.commit()
     db.refresh(menu_item)
     
@@ -140,6 +177,7 @@ async def delete_mess_menu_item(
         )
     
     db.delete(menu_item)
+    bump_version(db)
     db.commit()
     
     return {"message": "Menu item deleted successfully"}
@@ -166,6 +204,8 @@ async def create_mess_feedback(
     )
     
     db.add(db_feedback)
+    db.flush()
+    mess_stats.record_feedback(db, db_feedback)
     db.commit()
     db.refresh(db_feedback)
     
@@ -193,73 +233,54 @@ async def get_mess_feedback(
     feedback_items = query.order_by(models.MessFeedback.created_at.desc()).offset(skip).limit(limit).all()
     return feedback_items
 
-@router.get("/mess/feedback/stats")
-async def get_mess_feedback_stats(
+# Columns written by the feedback export, in file order
+FEEDBACK_EXPORT_COLUMNS = ["id", "user_id", "meal_type", "rating", "comment", "sentiment_score", "created_at"]
+
+@router.get("/mess/feedback/export")
+async def export_mess_feedback(
+    export_format: str = Query("csv", alias="format"),
     meal_type: Optional[str] = None,
-    days: Optional[int] = 30,
-    current_user: models.User = Depends(get_staff_or_admin_user),
+    current_user: models.User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    """Get statistics on mess feedback (staff or admin only)."""
-    from sqlalchemy import func
-    from datetime import timedelta
+    """Stream all matching mess feedback as CSV or NDJSON."""
+    query = db.query(*[getattr(models.MessFeedback, column) for column in FEEDBACK_EXPORT_COLUMNS])
     
-    # Base query
-    query = db.query(
-        func.avg(models.MessFeedback.rating).label("average_rating"),
-        func.count(models.MessFeedback.id).label("total_feedback")
-    )
+    # Students can only see their own feedback
+    if current_user.role == "student":
+        query = query.filter(models.MessFeedback.user_id == current_user.id)
     
-    # Apply filters
     if meal_type:
         query = query.filter(models.MessFeedback.meal_type == meal_type)
     
-    if days:
-        since_date = datetime.now() - timedelta(days=days)
-        query = query.filter(models.MessFeedback.created_at >= since_date)
-    
-    # Execute query
-    result = query.one()
-    
-    # Calculate rating distribution
-    rating_dist_query = db.query(
-        models.MessFeedback.rating,
-        func.count(models.MessFeedback.id).label("count")
-    ).group_by(models.MessFeedback.rating)
-    
-    # Apply the same filters
-    if meal_type:
-        rating_dist_query = rating_dist_query.filter(models.MessFeedback.meal_type == meal_type)
-    
-    if days:
-        rating_dist_query = rating_dist_query.filter(models.MessFeedback.created_at >= since_date)
-    
-    rating_distribution = {r.rating: r.count for r in rating_dist_query.all()}
-    
-    # Ensure all ratings are represented
-    for i in range(1, 6):
-        if i not in rating_distribution:
-            rating_distribution[i] = 0
-    
-    # Calculate sentiment analysis stats if comments are available
-    sentiment_query = db.query(
-        func.avg(models.MessFeedback.sentiment_score).label("average_sentiment")
-    ).filter(models.MessFeedback.sentiment_score.isnot(None))
-    
-    # Apply the same filters
-    if meal_type:
-        sentiment_query = sentiment_query.filter(models.MessFeedback.meal_type == meal_type)
-    
-    if days:
-        sentiment_query = sentiment_query.filter(models.MessFeedback.created_at >= since_date)
-    
-    sentiment_result = sentiment_query.one()
-    
-    return {
-        "average_rating": float(result.average_rating) if result.average_rating else 0,
-        "total_feedback": result.total_feedback,
-        "rating_distribution": rating_distribution,
-        "average_sentiment": float(sentiment_result.average_sentiment) if sentiment_result.average_sentiment else 0,
-        "meal_type": meal_type or "all",
-        "days": days
-    }
+    query = query.order_by(models.MessFeedback.created_at.desc())
+    return export.export_response([query], FEEDBACK_EXPORT_COLUMNS, export_format, "mess-feedback")
+
+@router.get("/mess/feedback/stats")
+async def get_mess_feedback_stats(
+    meal_type: Optional[str] = None,
+    days: Optional[int] = 30,
+    current_user: models.User = Depends(get_staff_or_admin_user),
+    db: Session = Depends(get_db)
+):
+    """Get statistics on mess feedback (staff or admin only)."""
+    stats = mess_stats.summarize(db, meal_type=meal_type, days=days)
+    stats["meal_type"] = meal_type or "all"
+    stats["days"] = days
+    return stats
+
+@router.get("/mess/feedback/trends")
+async def get_mess_feedback_trends(
+    days: int = Query(90, ge=1, le=366),
+    meal_type: Optional[str] = None,
+    current_user: models.User = Depends(get_staff_or_admin_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Daily and weekly average rating, volume and sentiment per meal type for
+    the last `days` days, with a moving average and week-over-week changes
+    (staff or admin only).
+    """
+    until = datetime.utcnow().date()
+    since = until - timedelta(days=days - 1)
+    return feedback_trends.report(db, since, until, meal_type)
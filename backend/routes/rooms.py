@@ -1,13 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
 from sqlalchemy.orm import Session
-from sqlalchemy import func, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy import insert
 from typing import List, Optional, Dict
 from datetime import datetime
+from collections import Counter
 
 import models
 import schemas
+import export
+import batch_allocation
+import room_inventory
+import capacity_planning
+from occupancy import occupancy_index, occupancy_summary, record_allocation_change, adjust_occupied
+from waitlist import room_matcher, add_to_waitlist
 from database import get_db
-from auth import get_current_active_user, get_staff_or_admin_user
+from auth import get_current_active_user, get_staff_or_admin_user, get_warden_user, get_hmc_user
 
 router = APIRouter()
 
@@ -31,6 +39,7 @@ async def create_room(
         number=room.number,
         floor=room.floor,
         building=room.building,
+        hostel=room.hostel,
         type=room.type,
         capacity=room.capacity
     )
@@ -39,6 +48,9 @@ async def create_room(
     db.commit()
     db.refresh(db_room)
     
+    occupancy_index.upsert_room(db_room)
+    room_matcher.room_opened(db, db_room.id)
+    
     return db_room
 
 @router.get("/rooms", response_model=List[schemas.RoomResponse])
@@ -67,31 +79,372 @@ async def get_rooms(
     if hostel:
         query = query.filter(models.Room.hostel == hostel)
     
-    # Filter for available rooms if requested
+    # Filter for available rooms if requested (served by a partial index)
     if available:
-        # Simpler approach to find available rooms
-        # Get rooms that have fewer allocations than their capacity
-        subquery = db.query(
-            models.RoomAllocation.room_id,
-            func.count(models.RoomAllocation.id).label('allocation_count')
-        ).filter(
-            models.RoomAllocation.status == "current"
-        ).group_by(
-            models.RoomAllocation.room_id
-        ).subquery()
-        
-        query = query.outerjoin(
-            subquery, models.Room.id == subquery.c.room_id
-        ).filter(
-            or_(
-                subquery.c.allocation_count == None,  # No allocations
-                subquery.c.allocation_count < models.Room.capacity  # Has space available
-            )
-        )
+        query = query.filter(models.Room.occupied < models.Room.capacity)
     
     rooms = query.offset(skip).limit(limit).all()
     return rooms
 
+@router.get("/rooms/occupancy")
+async def get_occupancy(
+    current_user: models.User = Depends(get_warden_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Capacity, occupied and free beds per hostel, broken down by floor and room
+    type, with the number of students still waiting for a bed (wardens, HMC
+    or admin). Wardens only see their own hostel.
+    """
+    summary = occupancy_summary.get(db)
+    
+    hostel_mapping = {
+        "warden_lohit_girls": "lohit_girls",
+        "warden_lohit_boys": "lohit_boys",
+        "warden_papum_boys": "papum_boys",
+        "warden_subhanshiri_boys": "subhanshiri_boys"
+    }
+    warden_hostel = hostel_mapping.get(current_user.role)
+    if warden_hostel is not None:
+        hostel = summary["hostels"].get(warden_hostel)
+        return {"hostels": {warden_hostel: hostel} if hostel is not None else {}}
+    
+    return summary
+
+@router.get("/rooms/available-beds", response_model=List[schemas.RoomAvailableBeds])
+async def get_available_beds_for_rooms(
+    hostel: Optional[str] = None,
+    floor: Optional[int] = None,
+    type: Optional[str] = None,
+    building: Optional[str] = None,
+    only_available: bool = False,
+    current_user: models.User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Get available beds for every room matching the filters in one request,
+    e.g. to draw a floor plan. Free beds come from the occupancy index.
+    """
+    query = db.query(
+        models.Room.id, models.Room.number, models.Room.hostel,
+        models.Room.floor, models.Room.type, models.Room.capacity
+    )
+    if hostel:
+        query = query.filter(models.Room.hostel == hostel)
+    if floor is not None:
+        query = query.filter(models.Room.floor == floor)
+    if type:
+        query = query.filter(models.Room.type == type)
+    if building:
+        query = query.filter(models.Room.building == building)
+    rooms = query.order_by(models.Room.id).all()
+    
+    free_beds = occupancy_index.free_beds_many(room.id for room in rooms)
+    
+    # Rooms created by another worker are not in this process's index yet
+    missing = [room.id for room in rooms if room.id not in free_beds]
+    if missing:
+        taken = set(db.query(models.RoomAllocation.room_id, models.RoomAllocation.bed_number).filter(
+            models.RoomAllocation.room_id.in_(missing),
+            models.RoomAllocation.status == "current"
+        ).all())
+        for room in rooms:
+            if room.id not in free_beds:
+                free_beds[room.id] = [
+                    bed for bed in range(1, room.capacity + 1) if (room.id, bed) not in taken
+                ]
+    
+    return [
+        schemas.RoomAvailableBeds(
+            room_id=room.id, number=room.number, hostel=room.hostel, floor=room.floor,
+            type=room.type, capacity=room.capacity, available_beds=free_beds[room.id]
+        )
+        for room in rooms
+        if free_beds[room.id] or not only_available
+    ]
+
+@router.post("/rooms/waitlist", response_model=schemas.RoomWaitlistResponse, status_code=status.HTTP_201_CREATED)
+async def join_room_waitlist(
+    entry: schemas.RoomWaitlistCreate,
+    current_user: models.User = Depends(get_warden_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Put a student without a bed on their hostel's waitlist (wardens, HMC or
+    admin). The student gets the next bed that frees up in the hostel, by
+    priority and then in order of joining; if one is free already it is
+    allocated straight away.
+    """
+    student = db.query(models.User).filter(models.User.id == entry.user_id).first()
+    if student is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found",
+        )
+    
+    if student.role != "student" or not student.hostel:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Only students with a hostel can join the waitlist",
+        )
+    
+    hostel_mapping = {
+        "warden_lohit_girls": "lohit_girls",
+        "warden_lohit_boys": "lohit_boys",
+        "warden_papum_boys": "papum_boys",
+        "warden_subhanshiri_boys": "subhanshiri_boys"
+    }
+    warden_hostel = hostel_mapping.get(current_user.role)
+    if warden_hostel is not None and student.hostel != warden_hostel:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Wardens can only manage students of their own hostel",
+        )
+    
+    user_allocation = db.query(models.RoomAllocation.id).filter(
+        models.RoomAllocation.user_id == student.id,
+        models.RoomAllocation.status == "current"
+    ).first()
+    if user_allocation:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="User already has a room allocation",
+        )
+    
+    return add_to_waitlist(db, student, entry.priority)
+
+@router.get("/rooms/waitlist", response_model=List[schemas.RoomWaitlistResponse])
+async def get_room_waitlist(
+    hostel: Optional[str] = None,
+    status: str = "waiting",
+    current_user: models.User = Depends(get_warden_user),
+    db: Session = Depends(get_db)
+):
+    """Get waitlist entries in the order they will be served (wardens see their own hostel)."""
+    hostel_mapping = {
+        "warden_lohit_girls": "lohit_girls",
+        "warden_lohit_boys": "lohit_boys",
+        "warden_papum_boys": "papum_boys",
+        "warden_subhanshiri_boys": "subhanshiri_boys"
+    }
+    hostel = hostel_mapping.get(current_user.role, hostel)
+    
+    query = db.query(models.RoomWaitlistEntry).filter(models.RoomWaitlistEntry.status == status)
+    if hostel:
+        query = query.filter(models.RoomWaitlistEntry.hostel == hostel)
+    
+    return query.order_by(models.RoomWaitlistEntry.priority.desc(), models.RoomWaitlistEntry.id).all()
+
+@router.delete("/rooms/waitlist/{entry_id}")
+async def leave_room_waitlist(
+    entry_id: int,
+    current_user: models.User = Depends(get_warden_user),
+    db: Session = Depends(get_db)
+):
+    """Take a student off the waitlist (wardens, HMC or admin)."""
+    entry = db.query(models.RoomWaitlistEntry).filter(models.RoomWaitlistEntry.id == entry_id).first()
+    if entry is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Waitlist entry not found",
+        )
+    
+    if entry.status != "waiting":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Student is no longer waiting",
+        )
+    
+    entry.status = "cancelled"
+    db.commit()
+    room_matcher.leave_waitlist(entry_id)
+    
+    return {"message": "Removed from the waitlist"}
+
+@router.post("/rooms/swap-requests", response_model=schemas.RoomSwapRequestResponse, status_code=status.HTTP_201_CREATED)
+async def create_swap_request(
+    swap_request: schemas.RoomSwapRequestCreate,
+    current_user: models.User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Ask to move to another room of the same hostel. The move happens as soon
+    as a bed frees up there, or at once when other requests close a circle
+    (someone in that room wants to move where another student can make room).
+    """
+    allocation = db.query(models.RoomAllocation).filter(
+        models.RoomAllocation.user_id == current_user.id,
+        models.RoomAllocation.status == "current"
+    ).first()
+    if allocation is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="You do not have a room to swap",
+        )
+    
+    target_room = db.query(models.Room).filter(models.Room.id == swap_request.target_room_id).first()
+    if target_room is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Room not found",
+        )
+    
+    if target_room.id == allocation.room_id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="You already live in this room",
+        )
+    
+    if target_room.hostel != allocation.room.hostel:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Swaps are only possible within your hostel",
+        )
+    
+    pending = db.query(models.RoomSwapRequest.id).filter(
+        models.RoomSwapRequest.user_id == current_user.id,
+        models.RoomSwapRequest.status == "pending"
+    ).first()
+    if pending:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="You already have a pending swap request",
+        )
+    
+    db_request = models.RoomSwapRequest(
+        user_id=current_user.id,
+        allocation_id=allocation.id,
+        target_room_id=target_room.id,
+        status="pending"
+    )
+    db.add(db_request)
+    db.commit()
+    db.refresh(db_request)
+    
+    room_matcher.request_swap(db, db_request, allocation)
+    db.refresh(db_request)
+    
+    return db_request
+
+@router.get("/rooms/swap-requests", response_model=List[schemas.RoomSwapRequestResponse])
+async def get_swap_requests(
+    status: Optional[str] = None,
+    current_user: models.User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Get swap requests (students see their own; wardens, HMC and admin see all)."""
+    query = db.query(models.RoomSwapRequest)
+    if current_user.role == "student":
+        query = query.filter(models.RoomSwapRequest.user_id == current_user.id)
+    else:
+        get_warden_user(current_user)
+    if status:
+        query = query.filter(models.RoomSwapRequest.status == status)
+    
+    return query.order_by(models.RoomSwapRequest.id.desc()).all()
+
+@router.delete("/rooms/swap-requests/{request_id}")
+async def cancel_swap_request(
+    request_id: int,
+    current_user: models.User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Withdraw a pending swap request (its owner, wardens, HMC or admin)."""
+    if current_user.role != "student":
+        get_warden_user(current_user)
+    swap_request = db.query(models.RoomSwapRequest).filter(models.RoomSwapRequest.id == request_id).first()
+    if swap_request is None or (current_user.role == "student" and swap_request.user_id != current_user.id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Swap request not found",
+        )
+    
+    if swap_request.status != "pending":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Only pending swap requests can be withdrawn",
+        )
+    
+    swap_request.status = "cancelled"
+    db.commit()
+    room_matcher.cancel_swap(request_id)
+    
+    return {"message": "Swap request withdrawn"}
+
+@router.post("/rooms/capacity-plan")
+async def plan_capacity(
+    plan: schemas.CapacityPlanRequest,
+    current_user: models.User = Depends(get_hmc_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Estimate how an intake would fit (HMC and admin only). Thousands of
+    randomized intakes are sent through the registration rules against
+    current room occupancy, and the chance and size of each hostel's
+    overflow are reported.
+    """
+    state = capacity_planning.load_state(db)
+    intake = {
+        student_type: (estimate.mean, estimate.stddev)
+        for student_type, estimate in (("female", plan.female), ("phd_male", plan.phd_male), ("male", plan.male))
+    }
+    return capacity_planning.simulate(state, intake, plan.scenarios, plan.seed)
+
+ROOM_EXPORT_COLUMNS = ["number", "floor", "building", "hostel", "type", "capacity", "occupied"]
+
+@router.post("/rooms/import")
+async def import_rooms(
+    request: Request,
+    import_format: str = Query("csv", alias="format"),
+    dry_run: bool = False,
+    current_user: models.User = Depends(get_staff_or_admin_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Create or update rooms in bulk from a CSV, NDJSON or JSON inventory sent
+    as the request body, matched on room number (staff or admin only).
+    Nothing is saved if any row is invalid or would shrink a room below a
+    bed that is in use; with dry_run set, only the differences are reported.
+    """
+    room_inventory.check_import_format(import_format)
+    
+    room_import = room_inventory.RoomImport(db, dry_run=dry_run)
+    async for row_number, row in room_inventory.read_rows(request.stream(), import_format):
+        room_import.add(row_number, row)
+    report = room_import.finish()
+    
+    if report["error_count"] and not dry_run:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=dict(report, message="Inventory has errors; no rooms were changed"),
+        )
+    
+    if report["applied"]:
+        occupancy_index.build(db)
+        for start in range(0, len(room_import.opened), room_inventory.IMPORT_BATCH_SIZE):
+            numbers = room_import.opened[start:start + room_inventory.IMPORT_BATCH_SIZE]
+            for (room_id,) in db.query(models.Room.id).filter(models.Room.number.in_(numbers)).all():
+                room_matcher.room_opened(db, room_id)
+    
+    return report
+
+@router.get("/rooms/export")
+async def export_rooms(
+    export_format: str = Query("csv", alias="format"),
+    hostel: Optional[str] = None,
+    building: Optional[str] = None,
+    current_user: models.User = Depends(get_staff_or_admin_user),
+    db: Session = Depends(get_db)
+):
+    """Download the room inventory as CSV or NDJSON, in the layout accepted by the import."""
+    query = db.query(*(getattr(models.Room, column) for column in ROOM_EXPORT_COLUMNS))
+    if hostel:
+        query = query.filter(models.Room.hostel == hostel)
+    if building:
+        query = query.filter(models.Room.building == building)
+    
+    return export.export_response([query.order_by(models.Room.number)], ROOM_EXPORT_COLUMNS, export_format, "rooms")
+
 @router.get("/rooms/{room_id}", response_model=schemas.RoomResponse)
 async def get_room(
     room_id: int,
@@ -150,6 +503,9 @@ async def update_room(
     db.commit()
     db.refresh(room)
     
+    occupancy_index.upsert_room(room)
+    room_matcher.room_opened(db, room.id)
+    
     return room
 
 @router.delete("/rooms/{room_id}")
@@ -181,6 +537,8 @@ async def delete_room(
     db.delete(room)
     db.commit()
     
+    occupancy_index.remove_room(room_id)
+    
     return {"message": "Room deleted successfully"}
 
 @router.get("/rooms/{room_id}/available-beds", response_model=Dict[str, List[int]])
@@ -213,6 +571,38 @@ async def get_available_beds(
     
     return {"available_beds": available_beds}
 
+def _bed_taken_error(db: Session, room: models.Room) -> HTTPException:
+    """400 for an occupied bed, listing the beds still free in the room."""
+    allocated_beds = db.query(models.RoomAllocation.bed_number).filter(
+        models.RoomAllocation.room_id == room.id,
+        models.RoomAllocation.status == "current"
+    ).all()
+    
+    allocated_bed_numbers = [bed[0] for bed in allocated_beds]
+    all_beds = list(range(1, room.capacity + 1))
+    available_beds = [bed for bed in all_beds if bed not in allocated_bed_numbers]
+    
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail={
+            "message": "This bed is already allocated",
+            "available_beds": available_beds
+        },
+    )
+
+def _allocation_conflict_error(db: Session, room: models.Room, user_id: int) -> HTTPException:
+    """Explain which unique allocation index rejected a commit."""
+    user_allocation = db.query(models.RoomAllocation.id).filter(
+        models.RoomAllocation.user_id == user_id,
+        models.RoomAllocation.status == "current"
+    ).first()
+    if user_allocation:
+        return HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="User already has a room allocation",
+        )
+    return _bed_taken_error(db, room)
+
 @router.post("/rooms/allocations/", response_model=schemas.RoomAllocationResponse, status_code=status.HTTP_201_CREATED)
 async def create_room_allocation(
     allocation: schemas.RoomAllocationCreate,
@@ -251,23 +641,7 @@ async def create_room_allocation(
     ).first()
     
     if existing_allocation:
-        # Get all available beds for this room
-        allocated_beds = db.query(models.RoomAllocation.bed_number).filter(
-            models.RoomAllocation.room_id == allocation.room_id,
-            models.RoomAllocation.status == "current"
-        ).all()
-        
-        allocated_bed_numbers = [bed[0] for bed in allocated_beds]
-        all_beds = list(range(1, room.capacity + 1))
-        available_beds = [bed for bed in all_beds if bed not in allocated_bed_numbers]
-        
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail={
-                "message": "This bed is already allocated",
-                "available_beds": available_beds
-            },
-        )
+        raise _bed_taken_error(db, room)
     
     # Check if user already has a current allocation
     user_allocation = db.query(models.RoomAllocation).filter(
@@ -292,11 +666,174 @@ async def create_room_allocation(
     )
     
     db.add(db_allocation)
-    db.commit()
+    record_allocation_change(db, None, (allocation.room_id, allocation.bed_number, allocation.status))
+    try:
+        db.commit()
+    except IntegrityError:
+        # Another request took the bed or housed the user since the checks above
+        db.rollback()
+        raise _allocation_conflict_error(db, room, allocation.user_id)
     db.refresh(db_allocation)
     
+    occupancy_index.allocation_changed(
+        None, (db_allocation.room_id, db_allocation.bed_number, db_allocation.status)
+    )
+    
     return db_allocation
 
+# Plans attempted before a batch gives up on concurrent allocations
+BATCH_ATTEMPTS = 3
+
+def _plan_batch(db: Session, request: schemas.BatchAllocationRequest, warden_hostel: Optional[str]):
+    """Validate the cohort and plan it against the free beds in the occupancy index."""
+    user_ids = [student.user_id for student in request.students]
+    users = {
+        row.id: row for row in db.query(models.User.id, models.User.role, models.User.hostel)
+        .filter(models.User.id.in_(user_ids))
+    }
+    already_allocated = {
+        row.user_id for row in db.query(models.RoomAllocation.user_id).filter(
+            models.RoomAllocation.user_id.in_(user_ids),
+            models.RoomAllocation.status == "current"
+        )
+    }
+    
+    failures = {}
+    cohort = []
+    for student in request.students:
+        user = users.get(student.user_id)
+        if user is None:
+            failures[student.user_id] = "User not found"
+        elif user.role != "student":
+            failures[student.user_id] = "Only students can be allocated rooms in a batch"
+        elif not user.hostel:
+            failures[student.user_id] = "Student has not been allocated a hostel"
+        elif warden_hostel is not None and user.hostel != warden_hostel:
+            failures[student.user_id] = "Wardens can only allocate students of their own hostel"
+        elif student.user_id in already_allocated:
+            failures[student.user_id] = "User already has a room allocation"
+        else:
+            cohort.append(batch_allocation.CohortStudent(
+                student.user_id, user.hostel, student.roommates, student.floor, student.room_type
+            ))
+    
+    # Plan against the free beds in the occupancy index
+    rooms = db.query(
+        models.Room.id, models.Room.number, models.Room.hostel, models.Room.floor, models.Room.type
+    ).filter(models.Room.hostel.in_({student.hostel for student in cohort})).all()
+    free_rooms = [
+        batch_allocation.FreeRoom(row.id, row.number, row.hostel, row.floor, row.type,
+                                  occupancy_index.free_beds(row.id) or [])
+        for row in rooms
+    ]
+    placements, unplaced = batch_allocation.solve(cohort, free_rooms)
+    failures.update(unplaced)
+    
+    return placements, failures
+
+@router.post("/rooms/allocations/batch", response_model=schemas.BatchAllocationResponse)
+async def batch_allocate_rooms(
+    request: schemas.BatchAllocationRequest,
+    current_user: models.User = Depends(get_warden_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Allocate rooms to a whole cohort of students at once (wardens, HMC or admin).
+    Roommate requests and floor/room type preferences are honoured where
+    possible, and every allocation is written in one transaction. With
+    dry_run set, the plan is returned without saving anything.
+    """
+    user_ids = [student.user_id for student in request.students]
+    if len(set(user_ids)) != len(user_ids):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Each student may appear only once in a batch",
+        )
+    
+    # Wardens can only allocate students of their own hostel
+    hostel_mapping = {
+        "warden_lohit_girls": "lohit_girls",
+        "warden_lohit_boys": "lohit_boys",
+        "warden_papum_boys": "papum_boys",
+        "warden_subhanshiri_boys": "subhanshiri_boys"
+    }
+    warden_hostel = hostel_mapping.get(current_user.role)
+    
+    for _ in range(BATCH_ATTEMPTS):
+        placements, failures = _plan_batch(db, request, warden_hostel)
+        if not placements or request.dry_run:
+            break
+        
+        start_date = request.start_date or datetime.now()
+        beds = [(room.room_id, bed_number, "current") for room, bed_number in placements.values()]
+        for bed in beds:
+            occupancy_index.allocation_changed(None, bed)
+        try:
+            db.execute(insert(models.RoomAllocation), [
+                {
+                    "user_id": user_id,
+                    "room_id": room.room_id,
+                    "bed_number": bed_number,
+                    "start_date": start_date,
+                    "status": "current",
+                }
+                for user_id, (room, bed_number) in placements.items()
+            ])
+            adjust_occupied(db, Counter(room.room_id for room, _ in placements.values()))
+            db.commit()
+            break
+        except IntegrityError:
+            # Another worker allocated some of these beds or students meanwhile;
+            # reload occupancy from the database and plan again
+            db.rollback()
+            occupancy_index.build(db)
+        except Exception:
+            db.rollback()
+            for bed in beds:
+                occupancy_index.allocation_changed(bed, None)
+            raise
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Room occupancy kept changing during the batch; please retry",
+        )
+    
+    # Report
+    results = []
+    roommate_requests = honoured = preferences_met = 0
+    for student in request.students:
+        placement = placements.get(student.user_id)
+        if placement is None:
+            results.append(schemas.BatchAllocationResult(
+                user_id=student.user_id, success=False, detail=failures.get(student.user_id)
+            ))
+            continue
+        room, bed_number = placement
+        results.append(schemas.BatchAllocationResult(
+            user_id=student.user_id, success=True,
+            room_id=room.room_id, room_number=room.number, bed_number=bed_number
+        ))
+        for roommate in student.roommates:
+            roommate_requests += 1
+            if roommate in placements and placements[roommate][0] is room:
+                honoured += 1
+        if (student.floor is not None or student.room_type is not None) \
+                and student.floor in (None, room.floor) and student.room_type in (None, room.type):
+            preferences_met += 1
+    roommate_requests += sum(
+        len(student.roommates) for student in request.students if student.user_id not in placements
+    )
+    
+    return schemas.BatchAllocationResponse(
+        allocated=len(placements),
+        failed=len(request.students) - len(placements),
+        roommate_requests=roommate_requests,
+        roommate_requests_honoured=honoured,
+        preferences_met=preferences_met,
+        dry_run=request.dry_run,
+        results=results,
+    )
+
 @router.get("/rooms/allocations/", response_model=List[schemas.RoomAllocationResponse])
 async def get_room_allocations(
     skip: int = 0,
@@ -328,6 +865,36 @@ async def get_room_allocations(
     allocations = query.offset(skip).limit(limit).all()
     return allocations
 
+# Columns written by the allocation export, in file order
+ALLOCATION_EXPORT_COLUMNS = ["id", "user_id", "room_id", "bed_number", "status", "start_date", "end_date", "created_at"]
+
+@router.get("/rooms/allocations/export")
+async def export_room_allocations(
+    export_format: str = Query("csv", alias="format"),
+    room_id: Optional[int] = None,
+    user_id: Optional[int] = None,
+    status: Optional[str] = None,
+    current_user: models.User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Stream all matching room allocations as CSV or NDJSON."""
+    query = db.query(*[getattr(models.RoomAllocation, column) for column in ALLOCATION_EXPORT_COLUMNS])
+    
+    # Students can only see their own allocations
+    if current_user.role == "student":
+        query = query.filter(models.RoomAllocation.user_id == current_user.id)
+    elif user_id is not None:
+        query = query.filter(models.RoomAllocation.user_id == user_id)
+    
+    if room_id is not None:
+        query = query.filter(models.RoomAllocation.room_id == room_id)
+    
+    if status:
+        query = query.filter(models.RoomAllocation.status == status)
+    
+    query = query.order_by(models.RoomAllocation.id)
+    return export.export_response([query], ALLOCATION_EXPORT_COLUMNS, export_format, "room-allocations")
+
 @router.get("/rooms/allocations/{allocation_id}", response_model=schemas.RoomAllocationResponse)
 async def get_room_allocation(
     allocation_id: int,
@@ -366,6 +933,8 @@ async def update_room_allocation(
             detail="Room allocation not found",
         )
     
+    previous = (allocation.room_id, allocation.bed_number, allocation.status)
+    
     # If updating bed number, check if it's valid and available
     if allocation_update.bed_number is not None:
         room = db.query(models.Room).filter(models.Room.id == allocation.room_id).first()
@@ -405,9 +974,22 @@ async def update_room_allocation(
     if allocation_update.status is not None:
         allocation.status = allocation_update.status
     
-    db.commit()
+    record_allocation_change(db, previous, (allocation.room_id, allocation.bed_number, allocation.status))
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        room = db.query(models.Room).filter(models.Room.id == previous[0]).first()
+        raise _allocation_conflict_error(db, room, allocation.user_id)
     db.refresh(allocation)
     
+    occupancy_index.allocation_changed(
+        previous, (allocation.room_id, allocation.bed_number, allocation.status)
+    )
+    if previous[2] == "current" and (allocation.status != "current" or allocation.bed_number != previous[1]):
+        room_matcher.bed_freed(db, previous[0], previous[1])
+        db.refresh(allocation)
+    
     return allocation
 
 @router.delete("/rooms/allocations/{allocation_id}")
@@ -424,7 +1006,13 @@ async def delete_room_allocation(
             detail="Room allocation not found",
         )
     
+    previous = (allocation.room_id, allocation.bed_number, allocation.status)
     db.delete(allocation)
+    record_allocation_change(db, previous, None)
     db.commit()
     
+    occupancy_index.allocation_changed(previous, None)
+    if previous[2] == "current":
+        room_matcher.bed_freed(db, previous[0], previous[1])
+    
     return {"message": "Room allocation deleted successfully"}
@@ -1,15 +1,18 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from typing import List
-import os
-import json
-from datetime import timedelta
+from datetime import datetime, timedelta
 import bcrypt
 
 import models
 import schemas
 from database import get_db
+from assignment import assignment_engine, STAFF_ROLES
+from occupancy import occupancy_index, occupancy_summary, record_allocation_change
+from waitlist import add_to_waitlist
+from hostel_load import hostel_load
 from auth import (
     create_access_token,
     get_current_active_user,
@@ -40,73 +43,82 @@ def authenticate_user(db: Session, email: str, password: str):
     return user
 
 # Function to find an available room for a student
-def assign_room_for_student(db: Session, student: models.User):
-    """Find an available room for a student based on hostel"""
+def assign_room_for_student(student: models.User):
+    """
+    Reserve the next free bed in the student's hostel from the occupancy
+    index. Returns (room_id, bed_number), or (None, None) if nothing is free.
+    """
     if not student.hostel:
         return None, None
+    return occupancy_index.claim_bed(student.hostel)
 
-    # Load room data from JSON
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    base_dir = os.path.dirname(current_dir)
-    json_path = os.path.join(base_dir, 'data', 'hostel_rooms.json')
-    
-    try:
-        with open(json_path, 'r') as f:
-            hostel_rooms = json.load(f)
-    except FileNotFoundError:
-        return None, None
-
-    if student.hostel not in hostel_rooms:
-        return None, None
+# Free beds registration tries before giving up when other requests keep taking them
+BED_CLAIM_ATTEMPTS = 5
 
-    # Get all rooms for this hostel from database
-    rooms = db.query(models.Room).filter(models.Room.hostel == student.hostel).all()
-    
-    # Check each room for available space
-    for room in rooms:
-        # Count current allocations
-        allocations_count = db.query(models.RoomAllocation).filter(
-            models.RoomAllocation.room_id == room.id,
-            models.RoomAllocation.status == "current"
-        ).count()
+def allocate_room_for_student(db: Session, student: models.User):
+    """
+    Allocate the next free bed to a student and return the allocation, or
+    None if the hostel is full. A bed taken meanwhile by another request or
+    worker is rejected by the unique index on current beds; it stays marked
+    as taken and the next free bed is tried. Any other conflict hands the
+    claimed bed back to the occupancy index.
+    """
+    for _ in range(BED_CLAIM_ATTEMPTS):
+        room_id, bed_number = assign_room_for_student(student)
+        if not room_id or not bed_number:
+            return None
         
-        # If room has space
-        if allocations_count < room.capacity:
-            # Find available bed number
-            used_beds = db.query(models.RoomAllocation.bed_number).filter(
-                models.RoomAllocation.room_id == room.id,
+        allocation = models.RoomAllocation(
+            user_id=student.id,
+            room_id=room_id,
+            bed_number=bed_number,
+            start_date=datetime.now(),
+            status="current"
+        )
+        db.add(allocation)
+        record_allocation_change(db, None, (room_id, bed_number, "current"))
+        try:
+            db.commit()
+            return allocation
+        except IntegrityError:
+            db.rollback()
+            bed_taken = db.query(models.RoomAllocation.id).filter(
+                models.RoomAllocation.room_id == room_id,
+                models.RoomAllocation.bed_number == bed_number,
+                models.RoomAllocation.status == "current"
+            ).first()
+            if bed_taken is None:
+                occupancy_index.release(room_id, bed_number)
+            # A concurrent request may have housed this student already
+            housed = db.query(models.RoomAllocation.id).filter(
+                models.RoomAllocation.user_id == student.id,
                 models.RoomAllocation.status == "current"
-            ).all()
-            used_bed_numbers = [bed[0] for bed in used_beds]
-            
-            for bed_number in range(1, room.capacity + 1):
-                if bed_number not in used_bed_numbers:
-                    return room, bed_number
-    
-    return None, None
+            ).first()
+            if housed is not None:
+                return None
+        except Exception:
+            db.rollback()
+            occupancy_index.release(room_id, bed_number)
+            raise
+    return None
 
 # Helper for hostel allocation
-def allocate_hostel_for_student(student_type: str, db: Session):
+def allocate_hostel_for_student(student_type: str):
     """
-    Automatically assign hostel based on student type:
+    Automatically assign hostel based on student type, counting the student
+    into the hostel load tracker:
     - Girls: Lohit Girls Hostel
     - PhD Boys: Subhanshiri Boys Hostel
-    - Remaining Boys: Lohit Boys or Papum Boys Hostel (based on availability)
+    - Remaining Boys: Lohit Boys or Papum Boys Hostel (whichever has more free capacity)
     """
     if student_type == "female":
-        return "lohit_girls"
+        hostel = "lohit_girls"
     elif student_type == "phd_male":
-        return "subhanshiri_boys"
+        hostel = "subhanshiri_boys"
     else:
-        # Count students in each hostel
-        lohit_count = db.query(models.User).filter(models.User.hostel == "lohit_boys").count()
-        papum_count = db.query(models.User).filter(models.User.hostel == "papum_boys").count()
-        
-        # Assign to hostel with fewer students
-        if lohit_count <= papum_count:
-            return "lohit_boys"
-        else:
-            return "papum_boys"
+        return hostel_load.join_least_loaded(("lohit_boys", "papum_boys"))
+    hostel_load.student_joined(hostel)
+    return hostel
 
 # User Endpoints
 @router.post("/users/token", response_model=schemas.Token)
@@ -166,21 +178,23 @@ async def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
     db.commit()
     db.refresh(db_user)
     
-    # Automatically assign a room if it's a student with a hostel
+    if db_user.role in STAFF_ROLES:
+        assignment_engine.upsert_staff(db_user)
+    if db_user.role == "student":
+        hostel_load.student_joined(db_user.hostel)
+    
+    # Automatically assign a room if it's a student with a hostel, or queue
+    # them for the next bed if the hostel is full
     if db_user.role == "student" and db_user.hostel:
-        room, bed_number = assign_room_for_student(db, db_user)
-        if room and bed_number:
-            # Create room allocation
-            from datetime import datetime
-            allocation = models.RoomAllocation(
-                user_id=db_user.id,
-                room_id=room.id,
-                bed_number=bed_number,
-                start_date=datetime.now(),
-                status="current"
-            )
-            db.add(allocation)
-            db.commit()
+        if allocate_room_for_student(db, db_user) is None:
+            housed = db.query(models.RoomAllocation.id).filter(
+                models.RoomAllocation.user_id == db_user.id,
+                models.RoomAllocation.status == "current"
+            ).first()
+            if housed is None:
+                add_to_waitlist(db, db_user)
+    if db_user.role == "student":
+        occupancy_summary.invalidate()
     
     return db_user
 
@@ -273,9 +287,13 @@ async def assign_warden_role(
     }
     
     # Assign warden role
+    if user.role == "student":
+        hostel_load.student_left(user.hostel)
     user.role = warden_role_mapping[hostel]
     db.commit()
     db.refresh(user)
+    assignment_engine.upsert_staff(user)
+    occupancy_summary.invalidate()
     
     return user
 
@@ -313,9 +331,11 @@ async def allocate_student_hostel(
         )
     
     # Allocate hostel
-    user.hostel = allocate_hostel_for_student(student_type, db)
+    hostel_load.student_left(user.hostel)
+    user.hostel = allocate_hostel_for_student(student_type)
     db.commit()
     db.refresh(user)
+    occupancy_summary.invalidate()
     
     return user
 
@@ -422,6 +442,7 @@ async def update_user(
     
     db.commit()
     db.refresh(user)
+    assignment_engine.upsert_staff(user)
     
     return user
 
@@ -439,7 +460,13 @@ async def delete_user(
             detail="User not found",
         )
     
+    was_student, hostel = user.role == "student", user.hostel
     db.delete(user)
     db.commit()
     
+    assignment_engine.remove_staff(user_id)
+    if was_student:
+        hostel_load.student_left(hostel)
+    occupancy_summary.invalidate()
+    
     return {"message": "User deleted successfully"}
@@ -82,6 +82,7 @@ class ComplaintBase(BaseModel):
     location: str
     hostel: str
     priority: Optional[str] = "medium"
+    floor: Optional[int] = None
 
 class ComplaintCreate(ComplaintBase):
     pass
@@ -94,6 +95,7 @@ class ComplaintUpdate(BaseModel):
     description: Optional[str] = None
     category: Optional[str] = None
     location: Optional[str] = None
+    floor: Optional[int] = None
     hostel: Optional[str] = None
     status: Optional[str] = None
     priority: Optional[str] = None
@@ -109,11 +111,54 @@ class ComplaintResponse(ComplaintBase):
     created_at: datetime
     updated_at: Optional[datetime]
     resolved_at: Optional[datetime]
+    due_at: Optional[datetime] = None
     user: UserResponse
 
     class Config:
         orm_mode = True
 
+class QueueBatchClaim(BaseModel):
+    hostel: str
+    floor: int
+    limit: int = Field(5, ge=1, le=50)
+
+# Bulk Complaint Schemas
+class ComplaintFilter(BaseModel):
+    status: Optional[str] = None
+    category: Optional[str] = None
+    priority: Optional[str] = None
+    hostel: Optional[str] = None
+    assigned_to: Optional[int] = None
+    created_after: Optional[datetime] = None
+    created_before: Optional[datetime] = None
+
+class ComplaintBulkBase(BaseModel):
+    # Exactly one of ids or filter selects the complaints to change
+    ids: Optional[List[int]] = None
+    filter: Optional[ComplaintFilter] = None
+
+class ComplaintBulkStatus(ComplaintBulkBase):
+    status: str
+
+class ComplaintBulkAssign(ComplaintBulkBase):
+    assigned_to: int
+
+class ComplaintBulkPriority(ComplaintBulkBase):
+    priority: str
+
+class ComplaintBulkClose(ComplaintBulkBase):
+    status: str = "resolved"  # resolved or rejected
+
+class ComplaintBulkResult(BaseModel):
+    id: int
+    success: bool
+    detail: Optional[str] = None
+
+class ComplaintBulkResponse(BaseModel):
+    updated: int
+    failed: int
+    results: List[ComplaintBulkResult]
+
 # VoiceComplaint Schema
 class VoiceComplaintCreate(BaseModel):
     audio_data: str  # Base64 encoded audio data
@@ -188,6 +233,15 @@ class RoomResponse(RoomBase):
     class Config:
         orm_mode = True
 
+class RoomAvailableBeds(BaseModel):
+    room_id: int
+    number: str
+    hostel: str
+    floor: int
+    type: str
+    capacity: int
+    available_beds: List[int]
+
 # Room Allocation Schemas
 class RoomAllocationBase(BaseModel):
     bed_number: int
@@ -217,6 +271,80 @@ class RoomAllocationResponse(RoomAllocationBase):
     class Config:
         orm_mode = True
 
+# Capacity Planning Schemas
+class IntakeEstimate(BaseModel):
+    mean: float = Field(0, ge=0)  # expected number of students
+    stddev: float = Field(0, ge=0)
+
+class CapacityPlanRequest(BaseModel):
+    female: IntakeEstimate = IntakeEstimate()
+    phd_male: IntakeEstimate = IntakeEstimate()
+    male: IntakeEstimate = IntakeEstimate()
+    scenarios: int = Field(5000, ge=1, le=20000)
+    seed: Optional[int] = None
+
+# Waitlist and Room Swap Schemas
+class RoomWaitlistCreate(BaseModel):
+    user_id: int
+    priority: int = 0  # higher is served first
+
+class RoomWaitlistResponse(BaseModel):
+    id: int
+    user_id: int
+    hostel: str
+    priority: int
+    status: str
+    created_at: datetime
+    allocated_at: Optional[datetime] = None
+    allocation_id: Optional[int] = None
+
+    class Config:
+        orm_mode = True
+
+class RoomSwapRequestCreate(BaseModel):
+    target_room_id: int
+
+class RoomSwapRequestResponse(BaseModel):
+    id: int
+    user_id: int
+    allocation_id: int
+    target_room_id: int
+    status: str
+    created_at: datetime
+    completed_at: Optional[datetime] = None
+
+    class Config:
+        orm_mode = True
+
+# Batch Allocation Schemas
+class BatchAllocationStudent(BaseModel):
+    user_id: int
+    roommates: List[int] = []  # user ids this student asked to share a room with
+    floor: Optional[int] = None
+    room_type: Optional[str] = None  # single, double, triple, dormitory
+
+class BatchAllocationRequest(BaseModel):
+    students: List[BatchAllocationStudent] = Field(..., min_length=1, max_length=5000)
+    start_date: Optional[datetime] = None
+    dry_run: bool = False
+
+class BatchAllocationResult(BaseModel):
+    user_id: int
+    success: bool
+    room_id: Optional[int] = None
+    room_number: Optional[str] = None
+    bed_number: Optional[int] = None
+    detail: Optional[str] = None
+
+class BatchAllocationResponse(BaseModel):
+    allocated: int
+    failed: int
+    roommate_requests: int
+    roommate_requests_honoured: int
+    preferences_met: int
+    dry_run: bool
+    results: List[BatchAllocationResult]
+
 # Mess Menu Schemas
 class MessMenuBase(BaseModel):
     day_of_week: str
@@ -239,6 +367,9 @@ class MessMenuResponse(MessMenuBase):
     class Config:
         orm_mode = True
 
+class MessMenuWeek(BaseModel):
+    items: List[MessMenuCreate] = Field(..., max_length=100)
+
 # Mess Feedback Schemas
 class MessFeedbackBase(BaseModel):
     rating: int
@@ -0,0 +1,64 @@
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import case
+from sqlalchemy.orm import Session
+
+import models
+
+# Work-queue ordering: lower rank is more urgent
+PRIORITY_RANK = {
+    "urgent": 0,
+    "high": 1,
+    "medium": 2,
+    "low": 3,
+}
+
+# Hours allowed between filing a complaint and resolving it, per priority
+SLA_HOURS = {
+    "urgent": 4,
+    "high": 24,
+    "medium": 72,
+    "low": 168,
+}
+
+DEFAULT_PRIORITY = "medium"
+
+
+def utc_now() -> datetime:
+    """
+    The clock complaint timestamps are kept on: naive UTC, as SQLite fills
+    created_at with CURRENT_TIMESTAMP. Deadlines, assignment and resolution
+    times all use it so they compare with created_at directly.
+    """
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def priority_rank(priority: Optional[str]) -> int:
+    """Queue rank for a priority; unknown priorities are treated as medium."""
+    return PRIORITY_RANK.get(priority, PRIORITY_RANK[DEFAULT_PRIORITY])
+
+
+def due_at(priority: Optional[str], created_at: Optional[datetime]) -> datetime:
+    """SLA deadline for a complaint filed at created_at with the given priority."""
+    hours = SLA_HOURS.get(priority, SLA_HOURS[DEFAULT_PRIORITY])
+    return (created_at or utc_now()) + timedelta(hours=hours)
+
+
+def apply_priority(complaint: models.Complaint):
+    """Keep the queue rank and SLA deadline in step with complaint.priority."""
+    complaint.priority_rank = priority_rank(complaint.priority)
+    complaint.due_at = due_at(complaint.priority, complaint.created_at)
+
+
+def backfill(db: Session):
+    """Fill in queue rank and deadline for complaints created before they existed."""
+    rank = case(PRIORITY_RANK, value=models.Complaint.priority, else_=PRIORITY_RANK[DEFAULT_PRIORITY])
+    db.query(models.Complaint).filter(
+        models.Complaint.priority_rank.is_(None)
+    ).update({models.Complaint.priority_rank: rank}, synchronize_session=False)
+
+    missing = db.query(models.Complaint).filter(models.Complaint.due_at.is_(None)).all()
+    for complaint in missing:
+        complaint.due_at = due_at(complaint.priority, complaint.created_at)
+    db.commit()
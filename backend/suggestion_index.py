@@ -0,0 +1,223 @@
+import math
+import re
+import threading
+import heapq
+from collections import Counter, OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+import models
+import ai_utils
+import sla
+
+# Words that carry no signal when matching complaints against each other
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "but", "is", "are", "was", "were", "be", "been",
+    "in", "on", "at", "of", "to", "for", "from", "with", "by", "it", "its", "this",
+    "that", "there", "my", "our", "we", "i", "me", "you", "not", "no", "has", "have",
+    "had", "do", "does", "did", "very", "please", "since", "room", "hostel",
+}
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+MAX_SIMILAR = 3
+CACHE_SIZE = 2048
+
+
+def tokenize(text: str) -> Counter:
+    """Split text into lowercase terms, dropping stopwords and single characters."""
+    return Counter(
+        token for token in TOKEN_PATTERN.findall((text or "").lower())
+        if len(token) > 1 and token not in STOPWORDS
+    )
+
+
+def format_duration(hours: float) -> str:
+    """Human readable duration used in suggestion text."""
+    if hours < 1:
+        return "under an hour"
+    if hours < 48:
+        return f"{int(round(hours))} hours"
+    return f"{int(round(hours / 24))} days"
+
+
+class _ResolvedDoc:
+    __slots__ = ("complaint_id", "title", "terms", "norm", "resolution_hours", "resolved_at")
+
+    def __init__(self, complaint_id, title, terms, resolution_hours, resolved_at):
+        self.complaint_id = complaint_id
+        self.title = title
+        self.terms = terms
+        self.norm = math.sqrt(sum(tf * tf for tf in terms.values())) or 1.0
+        self.resolution_hours = resolution_hours
+        self.resolved_at = resolved_at
+
+
+class SuggestionIndex:
+    """
+    Inverted index over resolved complaints, partitioned by their final category.
+
+    Lookups score candidate past complaints with TF-IDF similarity (slightly
+    favouring recent resolutions) and results are cached per complaint until
+    the index for that category changes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._docs: Dict[str, Dict[int, _ResolvedDoc]] = {}
+        self._postings: Dict[str, Dict[str, Dict[int, int]]] = {}
+        self._category_of: Dict[int, str] = {}
+        self._versions: Dict[str, int] = {}
+        self._cache: "OrderedDict[int, tuple]" = OrderedDict()
+
+    def build(self, db: Session):
+        """Rebuild the index from all resolved complaints, archived ones included."""
+        rows = []
+        for model in (models.Complaint, models.ArchivedComplaint):
+            rows += db.query(
+                model.id,
+                model.title,
+                model.description,
+                model.category,
+                model.created_at,
+                model.resolved_at,
+            ).filter(
+                model.status == "resolved",
+                model.resolved_at.isnot(None),
+            ).all()
+
+        with self._lock:
+            self._docs.clear()
+            self._postings.clear()
+            self._category_of.clear()
+            self._cache.clear()
+            for row in rows:
+                self._add_locked(row.id, row.title, row.description, row.category,
+                                 row.created_at, row.resolved_at)
+            for category in self._docs:
+                self._versions[category] = self._versions.get(category, 0) + 1
+
+    def add(self, complaint: models.Complaint):
+        """Index a newly resolved complaint (or re-index it after an edit)."""
+        if complaint.status != "resolved" or complaint.resolved_at is None:
+            self.remove(complaint.id)
+            return
+        with self._lock:
+            self._remove_locked(complaint.id)
+            self._add_locked(complaint.id, complaint.title, complaint.description,
+                             complaint.category, complaint.created_at, complaint.resolved_at)
+            self._bump_locked(complaint.category)
+            self._cache.pop(complaint.id, None)
+
+    def remove(self, complaint_id: int):
+        """Drop a complaint from the index, e.g. when it is reopened."""
+        with self._lock:
+            category = self._remove_locked(complaint_id)
+            if category is not None:
+                self._bump_locked(category)
+            self._cache.pop(complaint_id, None)
+
+    def suggest(self, complaint: models.Complaint, limit: int = 3) -> List[str]:
+        """Return suggestions for a complaint, reusing the cached answer when still valid."""
+        category = complaint.category or "other"
+        key = (category, hash((complaint.title, complaint.description)))
+        with self._lock:
+            version = self._versions.get(category, 0)
+            cached = self._cache.get(complaint.id)
+            if cached is not None and cached[0] == key and cached[1] == version:
+                self._cache.move_to_end(complaint.id)
+                similar = cached[2]
+            else:
+                similar = self._similar_locked(complaint, category)
+                self._cache[complaint.id] = (key, version, similar)
+                if len(self._cache) > CACHE_SIZE:
+                    self._cache.popitem(last=False)
+
+        suggestions = list(similar)
+        # Pad with the generic category tips when there is not enough history
+        for tip in ai_utils.get_complaint_suggestions(category, complaint.description):
+            if len(suggestions) >= limit:
+                break
+            suggestions.append(tip)
+        return suggestions[:limit]
+
+    def _add_locked(self, complaint_id, title, description, category, created_at, resolved_at):
+        category = category or "other"
+        terms = tokenize(f"{title} {description}")
+        resolution_hours = None
+        if created_at is not None and resolved_at is not None:
+            resolution_hours = max((_naive(resolved_at) - _naive(created_at)).total_seconds() / 3600, 0)
+
+        doc = _ResolvedDoc(complaint_id, title, terms, resolution_hours, _naive(resolved_at))
+        self._docs.setdefault(category, {})[complaint_id] = doc
+        postings = self._postings.setdefault(category, {})
+        for term, tf in terms.items():
+            postings.setdefault(term, {})[complaint_id] = tf
+        self._category_of[complaint_id] = category
+
+    def _remove_locked(self, complaint_id) -> Optional[str]:
+        category = self._category_of.pop(complaint_id, None)
+        if category is None:
+            return None
+        doc = self._docs[category].pop(complaint_id)
+        postings = self._postings[category]
+        for term in doc.terms:
+            term_postings = postings.get(term)
+            if term_postings is not None:
+                term_postings.pop(complaint_id, None)
+                if not term_postings:
+                    del postings[term]
+        return category
+
+    def _bump_locked(self, category):
+        category = category or "other"
+        self._versions[category] = self._versions.get(category, 0) + 1
+
+    def _similar_locked(self, complaint, category) -> List[str]:
+        docs = self._docs.get(category)
+        if not docs:
+            return []
+        postings = self._postings[category]
+        total = len(docs)
+        query_terms = tokenize(f"{complaint.title} {complaint.description}")
+
+        scores: Dict[int, float] = {}
+        for term, query_tf in query_terms.items():
+            term_postings = postings.get(term)
+            if not term_postings:
+                continue
+            idf = math.log(1 + total / len(term_postings))
+            for doc_id, tf in term_postings.items():
+                if doc_id != complaint.id:
+                    scores[doc_id] = scores.get(doc_id, 0.0) + query_tf * tf * idf * idf
+
+        now = sla.utc_now()
+        ranked = []
+        for doc_id, score in scores.items():
+            doc = docs[doc_id]
+            age_days = max((now - doc.resolved_at).days, 0) if doc.resolved_at else 0
+            ranked.append((score / doc.norm / (1 + age_days / 365), doc_id))
+
+        suggestions = []
+        for _, doc_id in heapq.nlargest(MAX_SIMILAR, ranked):
+            doc = docs[doc_id]
+            if doc.resolution_hours is not None:
+                suggestions.append(
+                    f'A similar issue ("{doc.title}") was resolved in {format_duration(doc.resolution_hours)}'
+                )
+            else:
+                suggestions.append(f'A similar issue ("{doc.title}") has been resolved before')
+        return suggestions
+
+
+def _naive(value: Optional[datetime]) -> Optional[datetime]:
+    """Normalise timestamps so SQLite (naive) and aware datetimes compare cleanly."""
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+# Shared index used by the complaint routes
+suggestion_index = SuggestionIndex()
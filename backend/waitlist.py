@@ -0,0 +1,351 @@
+import heapq
+import logging
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+import models
+from occupancy import occupancy_index, record_allocation_change
+
+logger = logging.getLogger(__name__)
+
+# Most students searched for in one circle of swaps (A wants B's room, B wants C's, C wants A's)
+MAX_SWAP_CYCLE = 5
+
+
+class _Swap:
+    __slots__ = ("request_id", "user_id", "allocation_id", "from_room", "from_bed", "target_room")
+
+    def __init__(self, request_id, user_id, allocation_id, from_room, from_bed, target_room):
+        self.request_id = request_id
+        self.user_id = user_id
+        self.allocation_id = allocation_id
+        self.from_room = from_room
+        self.from_bed = from_bed
+        self.target_room = target_room
+
+
+class RoomMatcher:
+    """
+    Hands out beds as they free up. A freed bed goes first to the earliest
+    student who asked to move into that room; the bed they leave is offered
+    on in the same way, and the last bed of the chain goes to the highest
+    priority student on its hostel's waitlist. A swap request that closes a
+    circle of requests is carried out at once.
+
+    Waiting students sit in a max-heap per hostel and swap requests in a
+    FIFO heap per wanted room, with lazy removal, so a freed bed never
+    rescans the full set of requests or rooms.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        # hostel -> heap of (-priority, entry id)
+        self._waiting: Dict[str, List[Tuple[int, int]]] = {}
+        # waiting entry id -> (user_id, hostel)
+        self._entries: Dict[int, Tuple[int, str]] = {}
+        self._swaps: Dict[int, _Swap] = {}
+        # wanted room -> heap of request ids, oldest first
+        self._wanting: Dict[int, List[int]] = {}
+        # current room -> ids of pending requests to leave it
+        self._leaving: Dict[int, Set[int]] = {}
+
+    def build(self, db: Session):
+        """Load waiting students and pending swap requests from the database."""
+        entries = db.query(
+            models.RoomWaitlistEntry.id,
+            models.RoomWaitlistEntry.user_id,
+            models.RoomWaitlistEntry.hostel,
+            models.RoomWaitlistEntry.priority,
+        ).filter(models.RoomWaitlistEntry.status == "waiting").all()
+        swaps = db.query(
+            models.RoomSwapRequest.id,
+            models.RoomSwapRequest.user_id,
+            models.RoomSwapRequest.allocation_id,
+            models.RoomSwapRequest.target_room_id,
+            models.RoomAllocation.room_id,
+            models.RoomAllocation.bed_number,
+        ).join(
+            models.RoomAllocation, models.RoomAllocation.id == models.RoomSwapRequest.allocation_id
+        ).filter(models.RoomSwapRequest.status == "pending").all()
+
+        with self._lock:
+            self._waiting.clear()
+            self._entries.clear()
+            self._swaps.clear()
+            self._wanting.clear()
+            self._leaving.clear()
+            for row in entries:
+                self._push_entry_locked(row.id, row.user_id, row.hostel, row.priority)
+            for row in swaps:
+                self._push_swap_locked(_Swap(
+                    row.id, row.user_id, row.allocation_id, row.room_id, row.bed_number, row.target_room_id
+                ))
+
+    def join_waitlist(self, db: Session, entry: models.RoomWaitlistEntry):
+        """Queue a saved waitlist entry, handing out any bed already free in its hostel."""
+        with self._lock:
+            self._push_entry_locked(entry.id, entry.user_id, entry.hostel, entry.priority or 0)
+            self._fill_locked(db, entry.hostel)
+
+    def leave_waitlist(self, entry_id: int):
+        with self._lock:
+            self._entries.pop(entry_id, None)
+
+    def request_swap(self, db: Session, request: models.RoomSwapRequest, allocation: models.RoomAllocation):
+        """
+        Queue a saved swap request. It is carried out straight away if the
+        wanted room has a free bed or the request completes a circle of swaps.
+        """
+        swap = _Swap(request.id, request.user_id, allocation.id, allocation.room_id,
+                     allocation.bed_number, request.target_room_id)
+        with self._lock:
+            self._push_swap_locked(swap)
+            free_beds = occupancy_index.free_beds(swap.target_room)
+            if free_beds:
+                self._offer_locked(db, swap.target_room, free_beds[0])
+                return
+
+            cycle = self._find_cycle_locked(swap)
+            if cycle is None:
+                return
+            for member in cycle:
+                self._drop_swap_locked(member.request_id)
+            # Everyone moves into the bed of the next student in the circle
+            moves = [
+                (member, cycle[(position + 1) % len(cycle)].from_room, cycle[(position + 1) % len(cycle)].from_bed)
+                for position, member in enumerate(cycle)
+            ]
+            outcome, stale = self._move_locked(db, moves)
+            if outcome != "done":
+                for member in cycle:
+                    if member.request_id not in stale:
+                        self._push_swap_locked(member)
+
+    def cancel_swap(self, request_id: int):
+        with self._lock:
+            self._drop_swap_locked(request_id)
+
+    def bed_freed(self, db: Session, room_id: int, bed_number: int):
+        """Offer a bed whose allocation just ended or moved."""
+        with self._lock:
+            self._offer_locked(db, room_id, bed_number)
+
+    def room_opened(self, db: Session, room_id: int):
+        """Offer every free bed of a new or enlarged room."""
+        with self._lock:
+            if not self._entries and not self._wanting.get(room_id):
+                return
+            for bed_number in occupancy_index.free_beds(room_id) or []:
+                self._offer_locked(db, room_id, bed_number)
+
+    def pending_swaps(self) -> int:
+        with self._lock:
+            return len(self._swaps)
+
+    # Matching
+
+    def _offer_locked(self, db, room_id, bed_number):
+        while True:
+            swap = self._pop_wanting_locked(room_id)
+            if swap is None:
+                break
+            outcome, _ = self._move_locked(db, [(swap, room_id, bed_number)])
+            if outcome == "stale":
+                continue
+            if outcome == "conflict":
+                self._push_swap_locked(swap)
+                return
+            # The mover's old bed is free now; offer it on
+            room_id, bed_number = swap.from_room, swap.from_bed
+
+        hostel = db.query(models.Room.hostel).filter(models.Room.id == room_id).scalar()
+        if hostel is not None:
+            self._allocate_waiting_locked(db, hostel, room_id, bed_number)
+
+    def _fill_locked(self, db, hostel):
+        while self._waiting.get(hostel):
+            room_id, bed_number = occupancy_index.claim_bed(hostel)
+            if room_id is None:
+                return
+            if not self._allocate_waiting_locked(db, hostel, room_id, bed_number):
+                occupancy_index.release(room_id, bed_number)
+                return
+
+    def _allocate_waiting_locked(self, db, hostel, room_id, bed_number) -> bool:
+        """Give a bed to the first eligible waiting student of a hostel."""
+        while True:
+            entry_id = self._pop_waiting_locked(hostel)
+            if entry_id is None:
+                return False
+            entry = db.query(models.RoomWaitlistEntry).filter(models.RoomWaitlistEntry.id == entry_id).first()
+            if entry is None or entry.status != "waiting":
+                continue
+            student = entry.user
+            housed = student is not None and db.query(models.RoomAllocation.id).filter(
+                models.RoomAllocation.user_id == student.id,
+                models.RoomAllocation.status == "current"
+            ).first() is not None
+            if student is None or student.hostel != hostel or housed:
+                # Housed some other way, or moved to another hostel, since joining
+                entry.status = "cancelled"
+                db.commit()
+                continue
+
+            now = datetime.now()
+            allocation = models.RoomAllocation(
+                user_id=student.id, room_id=room_id, bed_number=bed_number, start_date=now, status="current"
+            )
+            db.add(allocation)
+            record_allocation_change(db, None, (room_id, bed_number, "current"))
+            try:
+                db.flush()
+                entry.status = "allocated"
+                entry.allocated_at = now
+                entry.allocation_id = allocation.id
+                db.commit()
+            except IntegrityError:
+                db.rollback()
+                self._push_entry_locked(entry_id, entry.user_id, hostel, entry.priority or 0)
+                logger.warning("Bed %s in room %s was taken before waitlist entry %s got it",
+                               bed_number, room_id, entry_id)
+                return False
+            occupancy_index.allocation_changed(None, (room_id, bed_number, "current"))
+            return True
+
+    def _move_locked(self, db, moves: List[Tuple[_Swap, int, int]]) -> Tuple[str, Set[int]]:
+        """
+        Move each requester into (room_id, bed_number) in one transaction.
+        Returns ("done", ...), ("stale", request ids) when requesters no longer
+        hold the bed they offered (those requests are cancelled), or
+        ("conflict", ...) when a target bed turned out to be taken.
+        """
+        stale = set()
+        allocations = {
+            allocation.id: allocation
+            for allocation in db.query(models.RoomAllocation).filter(
+                models.RoomAllocation.id.in_([swap.allocation_id for swap, _, _ in moves])
+            )
+        }
+        for swap, _, _ in moves:
+            allocation = allocations.get(swap.allocation_id)
+            if allocation is None or allocation.status != "current" \
+                    or (allocation.room_id, allocation.bed_number) != (swap.from_room, swap.from_bed):
+                stale.add(swap.request_id)
+        if stale:
+            db.query(models.RoomSwapRequest).filter(
+                models.RoomSwapRequest.id.in_(stale)
+            ).update({"status": "cancelled"}, synchronize_session=False)
+            db.commit()
+            return "stale", stale
+
+        now = datetime.now()
+        # End every old allocation before adding the new ones, so beds change
+        # hands without tripping the unique bed and student indexes
+        for swap, _, _ in moves:
+            allocation = allocations[swap.allocation_id]
+            allocation.status = "past"
+            allocation.end_date = now
+            record_allocation_change(db, (swap.from_room, swap.from_bed, "current"), None)
+        db.flush()
+        for swap, room_id, bed_number in moves:
+            db.add(models.RoomAllocation(
+                user_id=swap.user_id, room_id=room_id, bed_number=bed_number, start_date=now, status="current"
+            ))
+            record_allocation_change(db, None, (room_id, bed_number, "current"))
+        db.query(models.RoomSwapRequest).filter(
+            models.RoomSwapRequest.id.in_([swap.request_id for swap, _, _ in moves])
+        ).update({"status": "completed", "completed_at": now}, synchronize_session=False)
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            logger.warning("Room swap %s lost a bed to another allocation",
+                           [swap.request_id for swap, _, _ in moves])
+            return "conflict", stale
+
+        for swap, _, _ in moves:
+            occupancy_index.allocation_changed((swap.from_room, swap.from_bed, "current"), None)
+        for _, room_id, bed_number in moves:
+            occupancy_index.allocation_changed(None, (room_id, bed_number, "current"))
+        return "done", stale
+
+    def _find_cycle_locked(self, swap: _Swap) -> Optional[List[_Swap]]:
+        """
+        Breadth-first search from the wanted room, following requests to leave
+        each room, for a path back to the requester's own room.
+        """
+        queue = deque([(swap.target_room, [swap])])
+        seen = {swap.target_room}
+        while queue:
+            room_id, path = queue.popleft()
+            for request_id in sorted(self._leaving.get(room_id, ())):
+                other = self._swaps[request_id]
+                if other.target_room == swap.from_room:
+                    return path + [other]
+                if len(path) + 1 < MAX_SWAP_CYCLE and other.target_room not in seen:
+                    seen.add(other.target_room)
+                    queue.append((other.target_room, path + [other]))
+        return None
+
+    # Queues
+
+    def _push_entry_locked(self, entry_id, user_id, hostel, priority):
+        self._entries[entry_id] = (user_id, hostel)
+        heapq.heappush(self._waiting.setdefault(hostel, []), (-priority, entry_id))
+
+    def _pop_waiting_locked(self, hostel) -> Optional[int]:
+        heap = self._waiting.get(hostel)
+        while heap:
+            _, entry_id = heapq.heappop(heap)
+            if self._entries.pop(entry_id, None) is not None:
+                return entry_id
+        return None
+
+    def _push_swap_locked(self, swap: _Swap):
+        self._swaps[swap.request_id] = swap
+        heapq.heappush(self._wanting.setdefault(swap.target_room, []), swap.request_id)
+        self._leaving.setdefault(swap.from_room, set()).add(swap.request_id)
+
+    def _pop_wanting_locked(self, room_id) -> Optional[_Swap]:
+        heap = self._wanting.get(room_id)
+        while heap:
+            request_id = heapq.heappop(heap)
+            swap = self._drop_swap_locked(request_id)
+            if swap is not None:
+                return swap
+        return None
+
+    def _drop_swap_locked(self, request_id) -> Optional[_Swap]:
+        swap = self._swaps.pop(request_id, None)
+        if swap is not None:
+            leaving = self._leaving.get(swap.from_room)
+            if leaving is not None:
+                leaving.discard(request_id)
+        return swap
+
+
+def add_to_waitlist(db: Session, student: models.User, priority: int = 0) -> models.RoomWaitlistEntry:
+    """Put a student without a bed on their hostel's waitlist (or return their existing entry)."""
+    entry = db.query(models.RoomWaitlistEntry).filter(
+        models.RoomWaitlistEntry.user_id == student.id,
+        models.RoomWaitlistEntry.status == "waiting"
+    ).first()
+    if entry is not None:
+        return entry
+
+    entry = models.RoomWaitlistEntry(user_id=student.id, hostel=student.hostel, priority=priority, status="waiting")
+    db.add(entry)
+    db.commit()
+    db.refresh(entry)
+    room_matcher.join_waitlist(db, entry)
+    db.refresh(entry)
+    return entry
+
+
+# Shared matcher used by the user and room routes
+room_matcher = RoomMatcher()
@@ -8,8 +8,10 @@ import {
   getSuggestions,
   createVoiceComplaint,
   clearComplaintSuccess, 
-  clearComplaintError 
+  clearComplaintError,
+  complaintEventReceived
 } from '../store/complaintsSlice';
+import { subscribeToComplaintEvents } from '../utils/complaintEvents';
 
 const Complaints = () => {
   const dispatch = useDispatch();
@@ -60,6 +62,11 @@ const Complaints = () => {
     dispatch(fetchComplaints(filters));
   }, [dispatch, filters]);
   
+  // Apply pushed complaint changes instead of refetching the list
+  useEffect(() => {
+    return subscribeToComplaintEvents((event) => dispatch(complaintEventReceived(event)));
+  }, [dispatch]);
+  
   // Clear success and error messages after 5 seconds
   useEffect(() => {
     let timer;
@@ -4,7 +4,7 @@ import { Link } from 'react-router-dom';
 import { fetchComplaints } from '../store/complaintsSlice';
 import { fetchPosts } from '../store/communitySlice';
 import { fetchAllocations } from '../store/roomsSlice';
-import { fetchMessMenu } from '../store/messSlice';
+import { fetchMessMenuWeek } from '../store/messSlice';
 import { getUserProfile } from '../store/authSlice';
 
 const Dashboard = () => {
@@ -30,7 +30,7 @@ const Dashboard = () => {
           dispatch(fetchComplaints({ limit: 5 })),
           dispatch(fetchPosts({ limit: 5 })),
           dispatch(fetchAllocations({ status: 'current' })),
-          dispatch(fetchMessMenu())
+          dispatch(fetchMessMenuWeek())
         ]);
       } catch (error) {
         console.error('Error loading dashboard data:', error);
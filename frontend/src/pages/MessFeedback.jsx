@@ -1,12 +1,10 @@
 import React, { useEffect, useState } from 'react';
 import { useDispatch, useSelector } from 'react-redux';
 import { 
-  fetchMessMenu, 
+  fetchMessMenuWeek, 
   fetchMessFeedback, 
   createMessFeedback, 
-  createMessMenuItem,
-  updateMessMenuItem,
-  deleteMessMenuItem,
+  replaceMessMenuWeek,
   fetchMessFeedbackStats,
   clearMessSuccess,
   clearMessError
@@ -67,10 +65,11 @@ const MessFeedback = () => {
     return days[new Date().getDay()];
   }
   
-  // Fetch menu items, feedback, and stats on component mount
+  // Fetch the week's menu, feedback, and stats on component mount; menu
+  // filters are applied when rendering
   useEffect(() => {
-    dispatch(fetchMessMenu(menuFilters));
-  }, [dispatch, menuFilters]);
+    dispatch(fetchMessMenuWeek());
+  }, [dispatch]);
   
   useEffect(() => {
     dispatch(fetchMessFeedback(feedbackFilters));
@@ -167,28 +166,29 @@ const MessFeedback = () => {
     setIsMenuFormOpen(false);
   };
   
-  // Submit the menu form
+  // Menu items in the shape the whole-week save expects
+  const toWeekItems = (items) => items.map(({ day_of_week, meal_type, description }) => ({
+    day_of_week,
+    meal_type,
+    description
+  }));
+  
+  // Submit the menu form, saving the whole week with the item added or changed
   const handleMenuSubmit = (e) => {
     e.preventDefault();
     
-    if (editingMenuItem) {
-      // Update existing menu item
-      dispatch(updateMessMenuItem({
-        id: editingMenuItem.id,
-        menuData: menuFormData
-      }));
-    } else {
-      // Create new menu item
-      dispatch(createMessMenuItem(menuFormData));
-    }
+    const otherItems = editingMenuItem
+      ? menuItems.filter(item => item.id !== editingMenuItem.id)
+      : menuItems;
+    dispatch(replaceMessMenuWeek([...toWeekItems(otherItems), menuFormData]));
     
     closeMenuForm();
   };
   
-  // Delete a menu item
+  // Delete a menu item by saving the whole week without it
   const handleDeleteMenuItem = (menuItemId) => {
     if (window.confirm('Are you sure you want to delete this menu item?')) {
-      dispatch(deleteMessMenuItem(menuItemId));
+      dispatch(replaceMessMenuWeek(toWeekItems(menuItems.filter(item => item.id !== menuItemId))));
     }
   };
   
@@ -24,6 +24,20 @@ const HmcDashboard = () => {
   const [selectedHostel, setSelectedHostel] = useState('');
   const [message, setMessage] = useState({ type: '', text: '' });
 
+  // Fetch occupied and total beds per hostel
+  const fetchOccupancy = async () => {
+    const response = await axios.get(`${API_URL}/api/rooms/occupancy`, {
+      headers: { Authorization: `Bearer ${token}` }
+    });
+    const hostelData = {};
+    Object.keys(hostels).forEach(hostel => {
+      const data = response.data.hostels[hostel] || {};
+      hostelData[hostel] = { students: data.occupied || 0, capacity: data.capacity || 0 };
+    });
+    setHostels(hostelData);
+    return response.data;
+  };
+
   // Fetch users and statistics
   useEffect(() => {
     const fetchData = async () => {
@@ -35,33 +49,20 @@ const HmcDashboard = () => {
         });
         setUsers(usersResponse.data);
 
-        // Count students in each hostel
-        const hostelData = {
-          lohit_girls: { 
-            students: usersResponse.data.filter(u => u.hostel === 'lohit_girls').length,
-            capacity: 100 // Example capacity
-          },
-          lohit_boys: { 
-            students: usersResponse.data.filter(u => u.hostel === 'lohit_boys').length,
-            capacity: 150
-          },
-          papum_boys: { 
-            students: usersResponse.data.filter(u => u.hostel === 'papum_boys').length,
-            capacity: 150
-          },
-          subhanshiri_boys: { 
-            students: usersResponse.data.filter(u => u.hostel === 'subhanshiri_boys').length,
-            capacity: 100
-          }
-        };
-        setHostels(hostelData);
+        // Bed counts are aggregated server-side
+        const occupancy = await fetchOccupancy();
+
+        // Complaint counters are maintained server-side
+        const complaintStatsResponse = await axios.get(`${API_URL}/api/complaints/stats`, {
+          headers: { Authorization: `Bearer ${token}` }
+        });
 
         // Calculate statistics
         const stats = {
-          totalStudents: usersResponse.data.filter(u => u.role === 'student').length,
-          unallocatedStudents: usersResponse.data.filter(u => u.role === 'student' && !u.hostel).length,
-          totalComplaints: 0, // This would need an API call to get actual data
-          pendingComplaints: 0
+          totalStudents: occupancy.students,
+          unallocatedStudents: occupancy.students_without_hostel,
+          totalComplaints: complaintStatsResponse.data.total,
+          pendingComplaints: complaintStatsResponse.data.by_status.pending || 0
         };
         setStats(stats);
       } catch (error) {
@@ -95,10 +96,9 @@ const HmcDashboard = () => {
         // Update the user in the users list
         setUsers(users.map(u => u.id === selectedUser.id ? response.data : u));
         
-        // Update hostel stats
-        const updatedHostels = { ...hostels };
-        updatedHostels[response.data.hostel].students += 1;
-        setHostels(updatedHostels);
+        // Refresh hostel stats
+        const occupancy = await fetchOccupancy();
+        setStats({ ...stats, unallocatedStudents: occupancy.students_without_hostel });
         
         // Reset form
         setSelectedUser(null);
@@ -187,7 +187,7 @@ const HmcDashboard = () => {
                 <div className="w-full bg-gray-200 rounded-full h-2.5 mt-2">
                   <div 
                     className="bg-blue-600 h-2.5 rounded-full" 
-                    style={{ width: `${(data.students / data.capacity) * 100}%` }}
+                    style={{ width: `${data.capacity ? (data.students / data.capacity) * 100 : 0}%` }}
                   ></div>
                 </div>
               </div>
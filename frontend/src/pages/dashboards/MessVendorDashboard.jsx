@@ -26,11 +26,11 @@ const MessVendorDashboard = () => {
     const fetchData = async () => {
       setLoading(true);
       try {
-        // Get mess menu items
-        const menuResponse = await axios.get(`${API_URL}/api/mess-menu/`, {
+        // Get the week's mess menu
+        const menuResponse = await axios.get(`${API_URL}/api/mess/menu/week`, {
           headers: { Authorization: `Bearer ${token}` }
         });
-        setMessMenu(menuResponse.data);
+        setMessMenu(menuResponse.data.items);
 
         // Get mess feedback
         const feedbackResponse = await axios.get(`${API_URL}/api/mess-feedback/`, {
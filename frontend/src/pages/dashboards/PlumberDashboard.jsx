@@ -6,6 +6,7 @@ import axios from 'axios';
 import DashboardCard from '../../components/DashboardCard';
 import LoadingSpinner from '../../components/LoadingSpinner';
 import { API_URL } from '../../utils/constants';
+import { subscribeToComplaintEvents } from '../../utils/complaintEvents';
 
 const PlumberDashboard = () => {
   const { user, token } = useSelector(state => state.auth);
@@ -54,6 +55,18 @@ const PlumberDashboard = () => {
     fetchComplaints();
   }, [token]);
 
+  // Keep the list current from pushed complaint events instead of refetching
+  useEffect(() => {
+    return subscribeToComplaintEvents(({ type, complaint }) => {
+      setComplaints(current => {
+        if (current.some(c => c.id === complaint.id)) {
+          return current.map(c => c.id === complaint.id ? complaint : c);
+        }
+        return type === 'complaint.created' ? [complaint, ...current] : current;
+      });
+    });
+  }, []);
+
   // Handle complaint status update
   const handleUpdateStatus = async (complaintId, newStatus) => {
     try {
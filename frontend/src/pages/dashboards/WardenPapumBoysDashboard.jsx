@@ -6,6 +6,7 @@ import axios from 'axios';
 import DashboardCard from '../../components/DashboardCard';
 import LoadingSpinner from '../../components/LoadingSpinner';
 import { API_URL } from '../../utils/constants';
+import { subscribeToComplaintEvents } from '../../utils/complaintEvents';
 
 const WardenPapumBoysDashboard = () => {
   const { user, token } = useSelector(state => state.auth);
@@ -41,12 +42,17 @@ const WardenPapumBoysDashboard = () => {
         });
         setAssets(assetsResponse.data);
 
+        // Complaint counts come from the server-side counters, not the current list page
+        const complaintStatsResponse = await axios.get(`${API_URL}/api/complaints/stats`, {
+          headers: { Authorization: `Bearer ${token}` }
+        });
+
         // Calculate statistics
         const stats = {
           totalStudents: studentsResponse.data.length,
-          totalComplaints: complaintsResponse.data.length,
-          pendingComplaints: complaintsResponse.data.filter(c => c.status === 'pending').length,
-          resolvedComplaints: complaintsResponse.data.filter(c => c.status === 'resolved').length
+          totalComplaints: complaintStatsResponse.data.total,
+          pendingComplaints: complaintStatsResponse.data.by_status.pending || 0,
+          resolvedComplaints: complaintStatsResponse.data.by_status.resolved || 0
         };
         setStats(stats);
       } catch (error) {
@@ -60,6 +66,18 @@ const WardenPapumBoysDashboard = () => {
     fetchData();
   }, [token, hostel]);
 
+  // Keep the list current from pushed complaint events instead of refetching
+  useEffect(() => {
+    return subscribeToComplaintEvents(({ type, complaint }) => {
+      setComplaints(current => {
+        if (current.some(c => c.id === complaint.id)) {
+          return current.map(c => c.id === complaint.id ? complaint : c);
+        }
+        return type === 'complaint.created' ? [complaint, ...current] : current;
+      });
+    });
+  }, []);
+
   // Handle complaint status update
   const handleUpdateComplaintStatus = async (complaintId, newStatus) => {
     try {
@@ -73,12 +91,15 @@ const WardenPapumBoysDashboard = () => {
         setMessage({ type: 'success', text: `Complaint status updated to ${newStatus}` });
         
         // Update the complaint in the complaints list
+        const previousStatus = complaints.find(c => c.id === complaintId)?.status;
         setComplaints(complaints.map(c => c.id === complaintId ? response.data : c));
         
-        // Update stats
+        // Update stats by moving this complaint between status counts
         const updatedStats = { ...stats };
-        updatedStats.pendingComplaints = complaints.filter(c => c.id !== complaintId && c.status === 'pending').length + (newStatus === 'pending' ? 1 : 0);
-        updatedStats.resolvedComplaints = complaints.filter(c => c.id !== complaintId && c.status === 'resolved').length + (newStatus === 'resolved' ? 1 : 0);
+        if (previousStatus === 'pending') updatedStats.pendingComplaints -= 1;
+        if (previousStatus === 'resolved') updatedStats.resolvedComplaints -= 1;
+        if (newStatus === 'pending') updatedStats.pendingComplaints += 1;
+        if (newStatus === 'resolved') updatedStats.resolvedComplaints += 1;
         setStats(updatedStats);
       }
     } catch (error) {
@@ -1,5 +1,5 @@
 import { createSlice, createAsyncThunk } from '@reduxjs/toolkit';
-import api from '../utils/api';
+import api, { postIdempotent } from '../utils/api';
 
 // Async thunks
 export const fetchPosts = createAsyncThunk(
@@ -71,7 +71,7 @@ export const createComment = createAsyncThunk(
   'community/createComment',
   async (commentData, { rejectWithValue }) => {
     try {
-      const response = await api.post('/api/community/comments/', commentData);
+      const response = await postIdempotent('/api/community/comments/', commentData);
       return response.data;
     } catch (error) {
       return rejectWithValue(error.response.data);
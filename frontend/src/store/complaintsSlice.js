@@ -1,5 +1,5 @@
 import { createSlice, createAsyncThunk } from '@reduxjs/toolkit';
-import api from '../utils/api';
+import api, { postIdempotent } from '../utils/api';
 
 // Async thunks
 export const fetchComplaints = createAsyncThunk(
@@ -37,7 +37,7 @@ export const createComplaint = createAsyncThunk(
   'complaints/createComplaint',
   async (complaintData, { rejectWithValue }) => {
     try {
-      const response = await api.post('/api/complaints/', complaintData);
+      const response = await postIdempotent('/api/complaints/', complaintData);
       return response.data;
     } catch (error) {
       return rejectWithValue(error.response.data);
@@ -85,7 +85,7 @@ export const createVoiceComplaint = createAsyncThunk(
   'complaints/createVoiceComplaint',
   async (audioData, { rejectWithValue }) => {
     try {
-      const response = await api.post('/api/complaints/voice', { audio_data: audioData });
+      const response = await postIdempotent('/api/complaints/voice', { audio_data: audioData });
       return response.data;
     } catch (error) {
       return rejectWithValue(error.response.data);
@@ -118,6 +118,18 @@ const complaintsSlice = createSlice({
     },
     clearCurrentComplaint: (state) => {
       state.currentComplaint = null;
+    },
+    complaintEventReceived: (state, action) => {
+      const { type, complaint } = action.payload;
+      const index = state.complaints.findIndex(c => c.id === complaint.id);
+      if (index !== -1) {
+        state.complaints[index] = complaint;
+      } else if (type === 'complaint.created') {
+        state.complaints.unshift(complaint);
+      }
+      if (state.currentComplaint && state.currentComplaint.id === complaint.id) {
+        state.currentComplaint = complaint;
+      }
     }
   },
   extraReducers: (builder) => {
@@ -241,5 +253,5 @@ const complaintsSlice = createSlice({
   },
 });
 
-export const { clearComplaintSuccess, clearComplaintError, clearCurrentComplaint } = complaintsSlice.actions;
+export const { clearComplaintSuccess, clearComplaintError, clearCurrentComplaint, complaintEventReceived } = complaintsSlice.actions;
 export default complaintsSlice.reducer;
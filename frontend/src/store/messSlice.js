@@ -1,5 +1,5 @@
 import { createSlice, createAsyncThunk } from '@reduxjs/toolkit';
-import api from '../utils/api';
+import api, { postIdempotent } from '../utils/api';
 
 // Async thunks for mess menu
 export const fetchMessMenu = createAsyncThunk(
@@ -20,6 +20,31 @@ export const fetchMessMenu = createAsyncThunk(
   }
 );
 
+// Whole week in one request; the browser revalidates it with the ETag
+export const fetchMessMenuWeek = createAsyncThunk(
+  'mess/fetchMessMenuWeek',
+  async (_, { rejectWithValue }) => {
+    try {
+      const response = await api.get('/api/mess/menu/week');
+      return response.data;
+    } catch (error) {
+      return rejectWithValue(error.response.data);
+    }
+  }
+);
+
+export const replaceMessMenuWeek = createAsyncThunk(
+  'mess/replaceMessMenuWeek',
+  async (items, { rejectWithValue }) => {
+    try {
+      const response = await api.put('/api/mess/menu/week', { items });
+      return response.data;
+    } catch (error) {
+      return rejectWithValue(error.response.data);
+    }
+  }
+);
+
 export const fetchMessMenuItem = createAsyncThunk(
   'mess/fetchMessMenuItem',
   async (id, { rejectWithValue }) => {
@@ -90,7 +115,7 @@ export const createMessFeedback = createAsyncThunk(
   'mess/createMessFeedback',
   async (feedbackData, { rejectWithValue }) => {
     try {
-      const response = await api.post('/api/mess/feedback/', feedbackData);
+      const response = await postIdempotent('/api/mess/feedback/', feedbackData);
       return response.data;
     } catch (error) {
       return rejectWithValue(error.response.data);
@@ -114,12 +139,29 @@ export const fetchMessFeedbackStats = createAsyncThunk(
   }
 );
 
+export const fetchMessFeedbackTrends = createAsyncThunk(
+  'mess/fetchMessFeedbackTrends',
+  async (filters = {}, { rejectWithValue }) => {
+    try {
+      const params = new URLSearchParams();
+      if (filters.meal_type) params.append('meal_type', filters.meal_type);
+      if (filters.days) params.append('days', filters.days);
+      
+      const response = await api.get(`/api/mess/feedback/trends?${params.toString()}`);
+      return response.data;
+    } catch (error) {
+      return rejectWithValue(error.response.data);
+    }
+  }
+);
+
 // Initial state
 const initialState = {
   menuItems: [],
   currentMenuItem: null,
   feedback: [],
   feedbackStats: null,
+  feedbackTrends: null,
   loading: false,
   error: null,
   success: false,
@@ -157,6 +199,37 @@ const messSlice = createSlice({
       state.error = action.payload?.detail || 'Failed to fetch mess menu';
     });
     
+    // Fetch whole-week mess menu
+    builder.addCase(fetchMessMenuWeek.pending, (state) => {
+      state.loading = true;
+      state.error = null;
+    });
+    builder.addCase(fetchMessMenuWeek.fulfilled, (state, action) => {
+      state.loading = false;
+      state.menuItems = action.payload.items;
+    });
+    builder.addCase(fetchMessMenuWeek.rejected, (state, action) => {
+      state.loading = false;
+      state.error = action.payload?.detail || 'Failed to fetch mess menu';
+    });
+    
+    // Replace whole-week mess menu
+    builder.addCase(replaceMessMenuWeek.pending, (state) => {
+      state.loading = true;
+      state.error = null;
+      state.success = false;
+    });
+    builder.addCase(replaceMessMenuWeek.fulfilled, (state, action) => {
+      state.loading = false;
+      state.menuItems = action.payload.items;
+      state.success = true;
+      state.message = 'Menu saved successfully';
+    });
+    builder.addCase(replaceMessMenuWeek.rejected, (state, action) => {
+      state.loading = false;
+      state.error = action.payload?.detail || 'Failed to save menu';
+    });
+    
     // Fetch mess menu item
     builder.addCase(fetchMessMenuItem.pending, (state) => {
       state.loading = true;
@@ -274,6 +347,20 @@ const messSlice = createSlice({
       state.loading = false;
       state.error = action.payload?.detail || 'Failed to fetch feedback statistics';
     });
+    
+    // Fetch mess feedback trends
+    builder.addCase(fetchMessFeedbackTrends.pending, (state) => {
+      state.loading = true;
+      state.error = null;
+    });
+    builder.addCase(fetchMessFeedbackTrends.fulfilled, (state, action) => {
+      state.loading = false;
+      state.feedbackTrends = action.payload;
+    });
+    builder.addCase(fetchMessFeedbackTrends.rejected, (state, action) => {
+      state.loading = false;
+      state.error = action.payload?.detail || 'Failed to fetch feedback trends';
+    });
   },
 });
 
@@ -43,4 +43,30 @@ api.interceptors.response.use(
   }
 );
 
+// Create requests are retried with the same Idempotency-Key, so the server
+// applies them at most once even when a response is lost on a flaky network.
+const IDEMPOTENT_RETRIES = 2;
+const IDEMPOTENT_RETRY_DELAY_MS = 1000;
+
+const newIdempotencyKey = () =>
+  window.crypto && window.crypto.randomUUID
+    ? window.crypto.randomUUID()
+    : `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+
+export const postIdempotent = async (url, data) => {
+  const headers = { 'Idempotency-Key': newIdempotencyKey() };
+  for (let attempt = 0; ; attempt += 1) {
+    try {
+      return await api.post(url, data, { headers });
+    } catch (error) {
+      // Retry only if no response arrived or the first attempt is still running
+      const retryable = !error.response || error.response.status === 409;
+      if (!retryable || attempt >= IDEMPOTENT_RETRIES) {
+        throw error;
+      }
+      await new Promise((resolve) => setTimeout(resolve, IDEMPOTENT_RETRY_DELAY_MS));
+    }
+  }
+};
+
 export default api;
@@ -0,0 +1,30 @@
+import { API_URL } from './constants';
+
+const COMPLAINT_EVENTS = [
+  'complaint.created',
+  'complaint.assigned',
+  'complaint.status',
+  'complaint.updated',
+  'complaint.escalated',
+];
+
+// Subscribe to server-pushed complaint changes. The server only sends
+// complaints the current user is allowed to see. Returns an unsubscribe function.
+export const subscribeToComplaintEvents = (onEvent) => {
+  const token = localStorage.getItem('token');
+  if (!token || typeof EventSource === 'undefined') {
+    return () => {};
+  }
+
+  const source = new EventSource(
+    `${API_URL}/api/complaints/events?token=${encodeURIComponent(token)}`
+  );
+
+  COMPLAINT_EVENTS.forEach((type) => {
+    source.addEventListener(type, (event) => {
+      onEvent({ type, complaint: JSON.parse(event.data) });
+    });
+  });
+
+  return () => source.close();
+};